@@ -14,7 +14,8 @@ Usage: python3 scan_package.py
 ═══════════════════════════════════════════════════════════════════════════════
 """
 
-import pickle
+import sys
+from pathlib import Path
 import requests
 import re
 import os
@@ -25,20 +26,23 @@ from datetime import datetime, timezone
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from forest_engine import top_contributions
+from model_artifact import load_scoring_model, ArtifactError
+
 # Load trained model
 print("🔄 Loading trained security model...")
 try:
-    with open('security_model.pkl', 'rb') as f:
-        model_data = pickle.load(f)
-    model = model_data['model']
-    scaler = model_data['scaler']
-    feature_cols = model_data['feature_columns']
+    model_data = load_scoring_model(Path('security_model'))
+    engine = model_data['engine']
+    schema = model_data['schema']
+    feature_cols = schema.columns
     explanations = model_data['feature_explanations']
     metrics = model_data['metrics']
     print("✅ Model loaded successfully!")
     print(f"   Accuracy: {metrics['accuracy']:.1%} | F1: {metrics['f1_score']:.1%}\n")
-except FileNotFoundError:
-    print("❌ Model not found! Run train_model.py first.")
+except ArtifactError as e:
+    print(f"❌ Model not found! Run train_model.py first. ({e})")
     exit(1)
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -422,32 +426,29 @@ def build_features(pkg_info, code_patterns):
 
 def predict_package(features):
     """Make prediction using trained model"""
-    feature_vector = [features.get(col, 0) for col in feature_cols]
-    feature_scaled = scaler.transform([feature_vector])[0]
-    
-    prediction = model.predict([feature_scaled])[0]
-    probability = model.predict_proba([feature_scaled])[0]
+    feature_vector = schema.vectorize([features])
+    proba, _, contrib = engine.contributions(feature_vector)
+    malicious_prob = float(proba[0])
+    is_malicious = malicious_prob > 0.5
     
-    # Get top contributing features
-    importances = model.feature_importances_
-    contributions = []
-    for name, value, imp in zip(feature_cols, feature_vector, importances):
-        if value > 0:
-            contributions.append({
-                'feature': name,
-                'value': value,
-                'contribution': value * imp,
-                'explanation': explanations.get(name, name)
-            })
-    
-    contributions = sorted(contributions, key=lambda x: x['contribution'], reverse=True)
+    # Features that pushed this package towards malicious, by tree-path contribution
+    top, values = top_contributions(contrib, 7)
+    contributions = [
+        {
+            'feature': feature_cols[j],
+            'value': float(feature_vector[0, j]),
+            'contribution': v,
+            'explanation': explanations.get(feature_cols[j], feature_cols[j])
+        }
+        for j, v in zip(top[0].tolist(), values[0].tolist()) if v > 0
+    ]
     
     return {
-        'is_malicious': bool(prediction),
-        'confidence': probability[1] if prediction else probability[0],
-        'malicious_prob': probability[1],
-        'genuine_prob': probability[0],
-        'reasons': contributions[:7]
+        'is_malicious': is_malicious,
+        'confidence': malicious_prob if is_malicious else 1 - malicious_prob,
+        'malicious_prob': malicious_prob,
+        'genuine_prob': 1 - malicious_prob,
+        'reasons': contributions
     }
 
 # ═══════════════════════════════════════════════════════════════════════════════
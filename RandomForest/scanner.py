@@ -1,27 +1,30 @@
 # Supply Chain Security Scanner v2.0
-import pickle
+import sys
 import requests
 import json
 import re
 import os
+from pathlib import Path
 from datetime import datetime, timezone
 import warnings
 warnings.filterwarnings('ignore')
 
 
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from model_artifact import load_scoring_model, ArtifactError
+
 print("🔄 Loading Security Model...")
 try:
-    with open('security_model.pkl', 'rb') as f:
-        model_data = pickle.load(f)
-    model = model_data['model']
-    scaler = model_data['scaler']
-    feature_cols = model_data['feature_columns']
+    model_data = load_scoring_model(Path('security_model'))
+    engine = model_data['engine']
+    schema = model_data['schema']
+    feature_cols = schema.columns
     explanations = model_data['feature_explanations']
     metrics = model_data['metrics']
     print(" Model Loaded!")
-except FileNotFoundError:
-    print(" Model not found! Run train_model.py first.")
+except ArtifactError as e:
+    print(f" Model not found! Run train_model.py first. ({e})")
     exit(1)
 
 
@@ -400,10 +403,8 @@ def build_features(pkg_info, violations, json_data=None):
 
 def predict(features):
     """Make ML prediction"""
-    vec = [features.get(c, 0) for c in feature_cols]
-    scaled = scaler.transform([vec])[0]
-    pred = model.predict([scaled])[0]
-    prob = model.predict_proba([scaled])[0]
+    prob = engine.predict_proba(schema.vectorize([features]))[0]
+    pred = engine.classes[prob.argmax()]
     return bool(pred), prob[1], prob[0]
  
 
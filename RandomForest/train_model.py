@@ -18,7 +18,9 @@ Provides: Accuracy, Precision, Recall, F1-Score, ROC-AUC, Confusion Matrix
 import pandas as pd
 import numpy as np
 import pickle
-from sklearn.model_selection import train_test_split, cross_val_score
+import sys
+from pathlib import Path
+from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import (
@@ -28,6 +30,12 @@ from sklearn.metrics import (
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from feature_schema import FeatureSchema
+from model_artifact import export_model
+from forest_engine import ForestEngine, top_contributions
+from training_pipeline import feature_matrix, parallel_cv_scores
+
 print("═" * 70)
 print("🛡️  SUPPLY CHAIN SECURITY - ML MODEL TRAINING")
 print("═" * 70)
@@ -38,12 +46,13 @@ print("═" * 70)
 
 print("\n📊 STEP 1: Loading dataset...")
 
-df = pd.read_csv('security_packages_dataset.csv')
+# Parsed once, then memory-mapped from the matrix cache (see training_pipeline.py)
+X, y, feature_cols = feature_matrix(Path('security_packages_dataset.csv'))
 
-print(f"   ✅ Loaded: {len(df)} samples")
-print(f"   Malicious: {len(df[df['is_malicious'] == 1])}")
-print(f"   Genuine: {len(df[df['is_malicious'] == 0])}")
-print(f"   Features: {len(df.columns)}")
+print(f"   ✅ Loaded: {len(X)} samples")
+print(f"   Malicious: {int((y == 1).sum())}")
+print(f"   Genuine: {int((y == 0).sum())}")
+print(f"   Features: {len(feature_cols)}")
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # STEP 2: PREPARE FEATURES
@@ -51,13 +60,7 @@ print(f"   Features: {len(df.columns)}")
 
 print("\n🔧 STEP 2: Preparing features...")
 
-# Exclude non-numeric columns
-exclude_cols = ['package_name', 'version', 'ecosystem', 'is_malicious']
-feature_cols = [c for c in df.columns if c not in exclude_cols]
-
-X = df[feature_cols]
-y = df['is_malicious']
-
+# Non-numeric columns (package_name, version, ecosystem) and the label are excluded
 print(f"   ✅ Features selected: {len(feature_cols)}")
 print(f"   Feature categories:")
 print(f"      • Encoding: base64_imports, base64_decode_calls, base64_encoded_strings")
@@ -114,7 +117,7 @@ model.fit(X_train, y_train)
 print("   ✅ Model training completed!")
 
 # Cross-validation
-cv_scores = cross_val_score(model, X_scaled, y, cv=5, scoring='accuracy')
+cv_scores = parallel_cv_scores(model, X_scaled, y, folds=5)
 print(f"\n   5-Fold Cross-Validation:")
 print(f"      Scores: {[f'{s:.2%}' for s in cv_scores]}")
 print(f"      Mean: {cv_scores.mean():.2%} (+/- {cv_scores.std() * 2:.2%})")
@@ -280,6 +283,7 @@ model_data = {
     'model': model,
     'scaler': scaler,
     'feature_columns': feature_cols,
+    'feature_schema': FeatureSchema(feature_cols).to_dict(),
     'feature_explanations': FEATURE_EXPLANATIONS,
     'metrics': {
         'accuracy': accuracy,
@@ -297,40 +301,42 @@ with open('security_model.pkl', 'wb') as f:
 
 print("   ✅ Model saved: security_model.pkl")
 
+# Pickle-free, memory-mapped artifact used for scoring (see model_artifact.py)
+print(f"   ✅ Model artifact exported: {export_model(Path('security_model.pkl'))}")
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # STEP 8: TEST PREDICTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
 
 print("\n🧪 STEP 8: Testing predictions with explanations...")
 
+engine = ForestEngine.from_sklearn(model, scaler)
+
 def predict_and_explain(features_dict):
     """Make prediction and explain why"""
-    feature_vector = [features_dict.get(col, 0) for col in feature_cols]
-    feature_scaled = scaler.transform([feature_vector])[0]
-    
-    prediction = model.predict([feature_scaled])[0]
-    probability = model.predict_proba([feature_scaled])[0]
-    
-    # Get top contributing features
-    importances = model.feature_importances_
-    contributions = []
-    for name, value, imp in zip(feature_cols, feature_vector, importances):
-        if value > 0:
-            contributions.append({
-                'feature': name,
-                'value': value,
-                'contribution': value * imp,
-                'explanation': FEATURE_EXPLANATIONS.get(name, name)
-            })
+    feature_vector = np.array([[features_dict.get(col, 0) for col in feature_cols]], dtype=np.float64)
+    proba, _, contrib = engine.contributions(feature_vector)
+    malicious_prob = float(proba[0])
+    prediction = malicious_prob > 0.5
     
-    contributions = sorted(contributions, key=lambda x: x['contribution'], reverse=True)
+    # Features that pushed this prediction towards malicious, by tree-path contribution
+    top, values = top_contributions(contrib, 5)
+    contributions = [
+        {
+            'feature': feature_cols[j],
+            'value': float(feature_vector[0, j]),
+            'contribution': v,
+            'explanation': FEATURE_EXPLANATIONS.get(feature_cols[j], feature_cols[j])
+        }
+        for j, v in zip(top[0].tolist(), values[0].tolist()) if v > 0
+    ]
     
     return {
-        'is_malicious': bool(prediction),
-        'confidence': probability[1] if prediction else probability[0],
-        'malicious_prob': probability[1],
-        'genuine_prob': probability[0],
-        'top_reasons': contributions[:5]
+        'is_malicious': prediction,
+        'confidence': malicious_prob if prediction else 1 - malicious_prob,
+        'malicious_prob': malicious_prob,
+        'genuine_prob': 1 - malicious_prob,
+        'top_reasons': contributions
     }
 
 # Test with suspicious package
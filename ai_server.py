@@ -7,7 +7,6 @@ Provides REST API for package analysis using ML model and feature extraction
 import json
 import os
 import sys
-import pickle
 import warnings
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
@@ -15,6 +14,8 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+from model_artifact import load_scoring_model
+
 warnings.filterwarnings('ignore')
 
 # Load environment variables
@@ -31,35 +32,34 @@ CORS(app)
 def load_security_model():
     """Load pre-trained security model and scaler."""
     model_paths = [
-        Path(__file__).parent / "data" / "security_model.pkl",
-        Path(__file__).parent / "RandomForest" / "security_model.pkl",
+        Path(__file__).parent / "data" / "security_model",
+        Path(__file__).parent / "RandomForest" / "security_model",
     ]
     
     for path in model_paths:
-        if path.exists():
+        if path.is_dir():
             try:
-                with open(path, 'rb') as f:
-                    model_data = pickle.load(f)
+                model_data = load_scoring_model(path)
                 print(f"✅ Model loaded from: {path}")
                 return model_data
             except Exception as e:
                 print(f"⚠️  Failed to load from {path}: {e}", file=sys.stderr)
     
-    print("❌ Could not find security_model.pkl", file=sys.stderr)
-    raise FileNotFoundError("security_model.pkl not found")
+    print("❌ Could not find a security_model artifact", file=sys.stderr)
+    raise FileNotFoundError("security_model artifact not found; export it with model_artifact.py")
 
 # Load model at startup
 try:
     MODEL_DATA = load_security_model()
-    MODEL = MODEL_DATA.get('model')
-    SCALER = MODEL_DATA.get('scaler')
-    FEATURE_COLS = MODEL_DATA.get('feature_columns', [])
+    MODEL = MODEL_DATA.get('engine')
+    SCHEMA = MODEL_DATA['schema']
+    FEATURE_COLS = SCHEMA.columns
     METRICS = MODEL_DATA.get('metrics', {})
     print(f"📊 Model Accuracy: {METRICS.get('accuracy', 0):.1%}")
 except Exception as e:
     print(f"❌ Error loading model: {e}")
     MODEL = None
-    SCALER = None
+    SCHEMA = None
 
 # ════════════════════════════════════════════════════════════════════════════════
 # FEATURE EXTRACTION AND ANALYSIS
@@ -138,19 +138,16 @@ def analyze_code_content(code_content: str) -> Dict[str, int]:
     
     return patterns
 
-def predict_risk(features: List[float]) -> Tuple[str, float, float]:
+def predict_risk(features) -> Tuple[str, float, float]:
     """Predict risk using ML model."""
-    if MODEL is None or SCALER is None:
+    if MODEL is None:
         # Fallback if model not loaded
         return 'unknown', 0.5, 0.5
     
     try:
-        # Scale features
-        features_scaled = SCALER.transform([features])
-        
-        # Predict
-        prediction = MODEL.predict(features_scaled)[0]
-        probabilities = MODEL.predict_proba(features_scaled)[0]
+        # Predict on raw features: the scaler is folded into the compiled forest
+        probabilities = MODEL.predict_proba([features])[0]
+        prediction = MODEL.classes[probabilities.argmax()]
         
         # Get class labels (assuming 0=safe, 1=malicious)
         malicious_prob = probabilities[1] if len(probabilities) > 1 else probabilities[0]
@@ -313,12 +310,10 @@ def analyze_packages():
                 code_patterns['suspicious_name_pattern'] = pattern_score
             
             # Build feature vector for ML model
-            feature_vector = []
-            for col in FEATURE_COLS:
-                feature_vector.append(features_dict.get(col, 0.0))
+            feature_vector = SCHEMA.vectorize([features_dict])[0] if SCHEMA is not None else None
             
             # Predict risk
-            label, malicious_prob, safe_prob = predict_risk(feature_vector) if feature_vector else ('unknown', 0.5, 0.5)
+            label, malicious_prob, safe_prob = predict_risk(feature_vector) if feature_vector is not None else ('unknown', 0.5, 0.5)
             
             # Calculate comprehensive risk score with features
             risk_score, risk_level, issues = calculate_risk_score(label, malicious_prob, code_patterns, features_dict)
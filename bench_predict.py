@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Prediction Benchmark
+Times scanner_predictor.predict_rows on synthetic extracted rows, split into
+its phases (vectorize, forest scoring with per-row contributions, labels,
+reasons and result dicts).
+
+    python bench_predict.py [rows=10000] [repeat=5]
+"""
+
+import sys
+import time
+import random
+import warnings
+
+warnings.filterwarnings("ignore")
+
+from scanner_predictor import base_row, load_model, predict_rows
+
+
+def synthetic_rows(n: int, seed: int = 7):
+    """base_row-shaped rows with count-like features, as the extractors emit"""
+    rng = random.Random(seed)
+    template = base_row("", "")
+    numeric = [k for k, v in template.items() if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    rows = []
+    for i in range(n):
+        row = base_row(f"pkg-{i}", "npm" if i % 3 else "pypi")
+        row["version"] = f"1.{i % 40}.{i % 7}"
+        for k in rng.sample(numeric, 12):
+            row[k] = rng.choice((0, 1, 2, 5, 20, 300)) if rng.random() < 0.8 else round(rng.random(), 3)
+        rows.append(row)
+    return rows
+
+
+def best_of(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, min(times), sorted(times)[len(times) // 2]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    art = load_model()
+    schema, engine = art["schema"], art["engine"]
+    rows = synthetic_rows(n)
+
+    X, vec_best, vec_med = best_of(lambda: schema.vectorize(rows), repeat)
+    _, score_best, score_med = best_of(lambda: engine.contributions(X), repeat)
+    results, total_best, total_med = best_of(lambda: predict_rows(rows), repeat)
+
+    print(f"predict_rows on {n:,} rows, best/median of {repeat}")
+    print(f"  vectorize        {vec_best * 1000:8.1f} ms  {vec_med * 1000:8.1f} ms")
+    print(f"  scoring + contr. {score_best * 1000:8.1f} ms  {score_med * 1000:8.1f} ms")
+    rest_best = total_best - vec_best - score_best
+    print(f"  labels + reasons {rest_best * 1000:8.1f} ms")
+    print(f"  total            {total_best * 1000:8.1f} ms  {total_med * 1000:8.1f} ms"
+          f"  ({n / total_best:,.0f} rows/s)")
+    labels = {}
+    for r in results:
+        labels[r["label"]] = labels.get(r["label"], 0) + 1
+    print(f"  labels           {labels}")
+
+
+if __name__ == "__main__":
+    main()
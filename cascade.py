@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Two-Stage Cascade
+Stage one is a small, shallow forest over package metadata only: manifest
+fields, documentation files and install hooks, nothing that needs a
+package's code read or hashed. Packages it scores at or below its
+calibrated safe threshold are labelled SAFE from that alone; every other
+package is escalated to the full code scan and the full forest.
+
+The threshold comes from out-of-fold probabilities on the training data:
+the highest one that still escalates at least --min-recall of the
+malicious packages. Packages with install scripts are always escalated.
+
+Stage one trains only on dataset_builder.py output, where the metadata
+columns were extracted by the scanner itself; the shipped CSV's are not,
+and a threshold calibrated on them means nothing for real packages. No
+stage-one model ships, so the cascade stays off until one is trained:
+
+    python cascade.py train --csv dataset/ [--out data/cascade_model] [--min-recall 1.0]
+    python cascade.py bench <project_dir> [--repeat 3]
+
+SCG_CASCADE_MODEL points the scanner at another stage-one artifact; one
+not trained from a dataset_builder.py directory is ignored.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+
+from feature_schema import FeatureSchema, ECOSYSTEM_COLUMNS
+from forest_engine import ForestEngine
+from install_scripts import FULL_SCAN
+from model_artifact import save_artifact, load_artifact, ArtifactError, MANIFEST
+from training_pipeline import load_training_data, _dataset_record
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+CASCADE_PATH = Path(os.environ.get("SCG_CASCADE_MODEL") or SCRIPT_DIR / "data" / "cascade_model")
+
+# SCG_CASCADE=0 (or SCG_FULL_SCAN=1) escalates every package: no metadata fast path
+CASCADE = os.environ.get("SCG_CASCADE", "") != "0"
+
+# Filled by the scanner from package.json / METADATA / RECORD without reading code
+METADATA_COLUMNS = [
+    "maintainers_count", "dependencies_count",
+    "version_major", "version_minor", "version_patch", "is_prerelease",
+    "has_readme", "has_license", "has_tests", "has_changelog", "documentation_score",
+    "has_install_scripts", "has_postinstall_hook",
+    "eco_is_npm", "eco_is_pypi",
+]
+
+# Shallow and small: a single-row score costs a fraction of the full forest's
+STAGE_ONE_PARAMS = {"n_estimators": 20, "max_depth": 4, "min_samples_leaf": 5, "random_state": 42}
+
+_stage_one: Dict[str, Any] = {}
+
+
+# ---------------- training ----------------
+def available_columns(path: Path) -> List[str]:
+    """METADATA_COLUMNS the dataset_builder.py dataset has (or can derive, for eco_is_*)"""
+    from dataset_builder import DATASET_FILE
+    have = FeatureSchema.from_dict(json.loads((Path(path) / DATASET_FILE).read_text(encoding="utf-8"))["feature_schema"]).columns
+    have = set(have) | set(ECOSYSTEM_COLUMNS)
+    return [c for c in METADATA_COLUMNS if c in have]
+
+
+def calibrate(proba: np.ndarray, y: np.ndarray, min_recall: float = 1.0) -> Dict[str, Any]:
+    """
+    Highest safe threshold (fast path: proba <= threshold) that escalates at
+    least min_recall of the malicious rows, and what it does on this data.
+    None when no benign row can be fast-pathed at that recall.
+    """
+    proba, y = np.asarray(proba, dtype=np.float64), np.asarray(y)
+    malicious = np.sort(proba[y == 1])
+    benign = proba[y == 0]
+    # Malicious rows allowed through the fast path
+    allowed = int(np.floor((1 - min_recall) * len(malicious) + 1e-9))
+    limit = malicious[allowed] if allowed < len(malicious) else np.inf
+    below = benign[benign < limit]
+    threshold = float(below.max()) if len(below) else None
+
+    fast = proba <= threshold if threshold is not None else np.zeros(len(proba), dtype=bool)
+    return {
+        "safe_threshold": threshold,
+        "min_recall": min_recall,
+        "escalation_recall": float(1 - fast[y == 1].mean()) if (y == 1).any() else 1.0,
+        "benign_fast_path_rate": float(fast[y == 0].mean()) if (y == 0).any() else 0.0,
+        "fast_path_rate": float(fast.mean()) if len(fast) else 0.0,
+    }
+
+
+def train_stage_one(path: Path, out_dir: Path = CASCADE_PATH, min_recall: float = 1.0, folds: int = 5) -> Dict[str, Any]:
+    """Fit the stage-one forest, calibrate its safe threshold and save it as an artifact"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    if not Path(path).is_dir():
+        raise ValueError(f"Stage one trains only on a dataset_builder.py directory, not {path}")
+    start = time.perf_counter()
+    X, y, columns = load_training_data(path, available_columns(path))
+    print(f"[Cascade] {len(X)} rows x {len(columns)} metadata features")
+    model = RandomForestClassifier(n_jobs=1, **STAGE_ONE_PARAMS)
+    cv = StratifiedKFold(folds, shuffle=True, random_state=STAGE_ONE_PARAMS["random_state"])
+    proba = cross_val_predict(model, X, y, cv=cv, method="predict_proba", n_jobs=min(folds, os.cpu_count() or 1))[:, 1]
+    calibration = calibrate(proba, y, min_recall)
+    model.fit(X, y)
+
+    engine = ForestEngine.from_sklearn(model)
+    save_artifact(engine, out_dir, {
+        "feature_columns": columns,
+        "feature_schema": FeatureSchema(columns).to_dict(),
+        "cascade": calibration,
+        "dataset": _dataset_record(Path(path), len(X)),
+    })
+    print(f"[Cascade] Saved {out_dir} ({time.perf_counter() - start:.2f}s)")
+    return calibration
+
+
+# ---------------- scoring ----------------
+def load_stage_one(path: Path = None) -> Dict[str, Any] | None:
+    """
+    The stage-one artifact, loaded once per process; None when absent,
+    disabled, or not trained from a dataset_builder.py directory.
+    """
+    if "art" not in _stage_one:
+        path = Path(path or CASCADE_PATH)
+        art = None
+        if CASCADE and (path / MANIFEST).exists():
+            try:
+                art = load_artifact(path)
+                art["schema"] = FeatureSchema.from_model(art)
+            except ArtifactError as e:
+                print(f"[Cascade] Ignoring {path}: {e}", file=sys.stderr)
+                art = None
+            if art is not None and "shards" not in art.get("dataset", {}):
+                print(f"[Cascade] Ignoring {path}: not trained from dataset_builder.py output", file=sys.stderr)
+                art = None
+            if art is not None and art["cascade"]["safe_threshold"] is None:
+                art = None
+        _stage_one["art"] = art
+    return _stage_one["art"]
+
+
+def fast_path_probability(row: Dict[str, Any]) -> float | None:
+    """
+    Stage-one malicious probability of a metadata-only row when it is
+    confidently safe, None when the package has to be escalated.
+    """
+    if not CASCADE or FULL_SCAN or row.get("has_install_scripts"):
+        return None
+    art = load_stage_one()
+    if art is None:
+        return None
+    p = float(art["engine"].predict_proba(art["schema"].vectorize([row]))[0, 1])
+    return p if p <= art["cascade"]["safe_threshold"] else None
+
+
+# ---------------- throughput ----------------
+def _timed(fn, cascade: bool, repeat: int):
+    """Best-of-`repeat` (result, seconds) of fn() on a cold feature cache"""
+    global CASCADE
+    import scanner_predictor
+
+    best = None
+    saved = CASCADE, scanner_predictor.FEATURE_CACHE_DIR
+    try:
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                # Cold, so every run extracts every package it does not fast-path
+                CASCADE, scanner_predictor.FEATURE_CACHE_DIR = cascade, Path(tmp)
+                scanner_predictor._file_counts_cache.clear()
+                start = time.perf_counter()
+                result = fn()
+                seconds = time.perf_counter() - start
+            if best is None or seconds < best[1]:
+                best = (result, seconds)
+    finally:
+        CASCADE, scanner_predictor.FEATURE_CACHE_DIR = saved
+    return best
+
+
+def bench(project: str, repeat: int = 3) -> Dict[str, Any]:
+    """
+    A project's installed packages extracted and scored with and without
+    the cascade, and the whole scan_and_predict (which adds the project-wide
+    source scan the cascade does not touch).
+    """
+    import scanner_predictor as sp
+
+    sp.load_model()
+    load_stage_one()
+    root = Path(project)
+    npm, dists = sp.list_npm_installed(root), sp.list_pypi_distributions(root)
+
+    def packages():
+        rows = [sp.build_npm_row(name, d) for name, d in npm] + [sp.build_pypi_dist_row(d) for d in dists]
+        return sp.predict_rows(rows)
+
+    def scan():
+        return sp.scan_and_predict(project)
+
+    # Warm the page cache so neither side pays for the first read of the tree
+    _timed(scan, False, 1)
+    full, full_s = _timed(packages, False, repeat)
+    fast, fast_s = _timed(packages, True, repeat)
+    _, scan_full_s = _timed(scan, False, repeat)
+    _, scan_fast_s = _timed(scan, True, repeat)
+
+    flagged = {r["package_name"] for r in full if r["label"] != "SAFE"}
+    return {
+        "packages": len(full),
+        "fast_pathed": sum(1 for r in fast if r["scan_depth"] == "metadata"),
+        "full_seconds": full_s,
+        "cascade_seconds": fast_s,
+        "speedup": full_s / max(fast_s, 1e-9),
+        "scan_full_seconds": scan_full_s,
+        "scan_cascade_seconds": scan_fast_s,
+        # Flagged by the full pipeline, SAFE through the fast path
+        "missed": sorted(flagged - {r["package_name"] for r in fast if r["label"] != "SAFE"}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the metadata stage of the cascade, or measure its throughput gain")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train")
+    train.add_argument("--csv", required=True, help="dataset_builder.py output directory")
+    train.add_argument("--out", default=str(CASCADE_PATH))
+    train.add_argument("--min-recall", type=float, default=1.0, help="share of malicious training packages that must be escalated")
+    train.add_argument("--folds", type=int, default=5)
+    b = sub.add_parser("bench")
+    b.add_argument("project")
+    b.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        if not Path(args.csv).is_dir():
+            parser.error(f"--csv must be a dataset_builder.py directory: {args.csv}")
+        c = train_stage_one(Path(args.csv), Path(args.out), args.min_recall, args.folds)
+        if c["safe_threshold"] is None:
+            print(f"❌ No benign package can take the fast path at recall {args.min_recall:.3f}; the cascade stays off")
+            return 1
+        print(f"✅ Safe threshold {c['safe_threshold']:.4f}: {c['benign_fast_path_rate']:.1%} of benign packages "
+              f"take the fast path, {c['escalation_recall']:.1%} of malicious ones are escalated (out-of-fold)")
+        return 0
+
+    r = bench(args.project, args.repeat)
+    print(f"📊 {r['packages']} installed packages, {r['fast_pathed']} through the metadata fast path")
+    print(f"   full       {r['full_seconds']:.2f}s ({r['packages'] / r['full_seconds']:.0f} packages/s)")
+    print(f"   cascade    {r['cascade_seconds']:.2f}s ({r['packages'] / r['cascade_seconds']:.0f} packages/s), "
+          f"{r['speedup']:.1f}x throughput")
+    print(f"   whole scan {r['scan_full_seconds']:.2f}s -> {r['scan_cascade_seconds']:.2f}s "
+          f"(project-wide source scan included)")
+    if r["missed"]:
+        print(f"⚠️  Flagged by the full scan but fast-pathed: {', '.join(r['missed'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Byte-level code statistics for obfuscation features.
+
+One NumPy pass over a file's bytes yields additive raw statistics
+(sliding-window entropy, byte histogram, identifier and line-length
+histograms). Raw stats of several files can be merged and are turned into
+model features by finalize_stats().
+"""
+
+from typing import Dict
+
+import numpy as np
+
+# ---------------- Parameters ----------------
+WINDOW = 1024                 # entropy window (bytes)
+STRIDE = WINDOW // 2          # windows overlap by half
+CHUNK = 1 << 20               # bytes per bincount pass, bounds memory on big bundles
+ENTROPY_BINS = 32             # 0.25-bit buckets over 0..8 bits
+HIGH_ENTROPY = 5.5            # bits/byte; base64 blobs sit near 6, source code around 4-5
+MAX_IDENT_LEN = 64            # identifier lengths are clipped here
+SHORT_IDENT = 2
+LONG_IDENT = 16
+
+# Line-length histogram edges (bucket i holds edges[i] <= len < edges[i+1])
+LINE_EDGES = np.array([
+    0, 16, 32, 48, 64, 80, 100, 120, 160, 200, 300, 500, 1000,
+    2000, 5000, 20000, 100000, 1 << 40,
+], dtype=np.int64)
+
+STAT_FEATURES = [
+    "byte_entropy",
+    "entropy_mean",
+    "entropy_max",
+    "high_entropy_ratio",
+    "alpha_ratio",
+    "digit_ratio",
+    "whitespace_ratio",
+    "symbol_ratio",
+    "non_ascii_ratio",
+    "identifier_len_mean",
+    "short_identifier_ratio",
+    "long_identifier_ratio",
+    "line_len_p50",
+    "line_len_p95",
+    "line_len_max",
+]
+
+# ---------------- Lookup tables ----------------
+def _table(chars: bytes) -> np.ndarray:
+    t = np.zeros(256, dtype=bool)
+    t[np.frombuffer(chars, dtype=np.uint8)] = True
+    return t
+
+_DIGIT = _table(b"0123456789")
+_LOWER = _table(bytes(range(ord("a"), ord("z") + 1)))
+_ALPHA = _LOWER | _table(bytes(range(ord("A"), ord("Z") + 1)))
+_WORD = _ALPHA | _DIGIT | _table(b"_")
+_SPACE = _table(b" \t\r\n\f\v")
+_NON_ASCII = np.arange(256) >= 128
+_SYMBOL = ~(_WORD | _SPACE | _NON_ASCII)
+
+# c * log2(c) for every possible count inside a window
+_CLOG = np.zeros(WINDOW + 1)
+_CLOG[1:] = np.arange(1, WINDOW + 1) * np.log2(np.arange(1, WINDOW + 1))
+
+
+def _as_bytes(data) -> np.ndarray:
+    if isinstance(data, str):
+        data = data.encode("utf-8", errors="ignore")
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def _window_entropies(buf: np.ndarray):
+    """
+    Shannon entropy (bits/byte) of every WINDOW-byte window at STRIDE steps,
+    plus the byte histogram of the whole buffer (a by-product of the counts).
+    """
+    halves = len(buf) // STRIDE
+    if halves < 2:
+        # Shorter than one window: the whole buffer is the only window
+        counts = np.bincount(buf, minlength=256)
+        return np.array([np.log2(len(buf)) - _CLOG[counts].sum() / len(buf)]), counts
+
+    out = []
+    byte_hist = np.zeros(256, dtype=np.int64)
+    carry = None
+    usable = halves * STRIDE
+    for start in range(0, usable, CHUNK):
+        part = buf[start:min(start + CHUNK, usable)]
+        h = len(part) // STRIDE
+        # Per half-window byte counts in one bincount: row i holds bytes of half i
+        idx = part.reshape(h, STRIDE).astype(np.int32) + (np.arange(h, dtype=np.int32) * 256)[:, None]
+        half = np.bincount(idx.ravel(), minlength=h * 256).reshape(h, 256)
+        byte_hist += half.sum(axis=0)
+        if carry is not None:
+            half = np.vstack([carry, half])
+        windows = half[:-1] + half[1:]
+        out.append(np.log2(WINDOW) - _CLOG[windows].sum(axis=1) / WINDOW)
+        carry = half[-1:]
+
+    if usable < len(buf):
+        byte_hist += np.bincount(buf[usable:], minlength=256)
+    return np.concatenate(out), byte_hist
+
+
+def empty_stats() -> Dict:
+    return {
+        "bytes": 0,
+        "byte_hist": np.zeros(256, dtype=np.int64),
+        "windows": 0,
+        "entropy_sum": 0.0,
+        "entropy_max": 0.0,
+        "entropy_hist": np.zeros(ENTROPY_BINS, dtype=np.int64),
+        "words": 0,
+        "single_lower_words": 0,
+        "ident_hist": np.zeros(MAX_IDENT_LEN + 1, dtype=np.int64),
+        "lines": 0,
+        "line_len_sum": 0,
+        "line_len_max": 0,
+        "line_hist": np.zeros(len(LINE_EDGES) - 1, dtype=np.int64),
+    }
+
+
+def raw_stats(data) -> Dict:
+    """Additive statistics of one text or byte buffer"""
+    buf = _as_bytes(data)
+    stats = empty_stats()
+    if len(buf) == 0:
+        return stats
+
+    stats["bytes"] = len(buf)
+    entropies, stats["byte_hist"] = _window_entropies(buf)
+    stats["windows"] = len(entropies)
+    stats["entropy_sum"] = float(entropies.sum())
+    stats["entropy_max"] = float(entropies.max())
+    bins = np.minimum((entropies * (ENTROPY_BINS / 8)).astype(np.int64), ENTROPY_BINS - 1)
+    stats["entropy_hist"] = np.bincount(bins, minlength=ENTROPY_BINS)
+
+    # Word runs ([A-Za-z0-9_] and UTF-8 bytes, like \w); identifiers are the runs
+    # not starting with a digit. uint8 arithmetic wraps, so one compare per class
+    # avoids a table lookup per byte
+    digit = (buf - 48) < 10
+    word = (((buf | 32) - 97) < 26) | digit | (buf == 95) | (buf >= 128)
+    edges = np.diff(word.view(np.int8), prepend=np.int8(0), append=np.int8(0))
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    first = buf[starts]
+    stats["words"] = len(lengths)
+    stats["single_lower_words"] = int(np.count_nonzero((lengths == 1) & _LOWER[first]))
+    ident = np.minimum(lengths[~digit[starts]], MAX_IDENT_LEN)
+    stats["ident_hist"] = np.bincount(ident, minlength=MAX_IDENT_LEN + 1)
+
+    newlines = np.flatnonzero(buf == 10)
+    line_ends = np.append(newlines, len(buf))
+    line_lens = line_ends - np.concatenate(([0], newlines + 1))
+    stats["lines"] = len(line_lens)
+    stats["line_len_sum"] = int(line_lens.sum())
+    stats["line_len_max"] = int(line_lens.max())
+    stats["line_hist"] = np.bincount(
+        np.searchsorted(LINE_EDGES, line_lens, side="right") - 1,
+        minlength=len(LINE_EDGES) - 1,
+    )
+    return stats
+
+
+def merge_stats(a: Dict, b: Dict) -> Dict:
+    """Combine the raw stats of two buffers (e.g. files of one package)"""
+    out = {}
+    for key, value in a.items():
+        if key.endswith("_max"):
+            out[key] = max(value, b[key])
+        else:
+            out[key] = value + b[key]
+    return out
+
+
+def _hist_percentile(hist: np.ndarray, q: float) -> float:
+    """Approximate percentile of the line lengths behind a LINE_EDGES histogram"""
+    total = hist.sum()
+    if total == 0:
+        return 0.0
+    cum = np.cumsum(hist)
+    target = q * total
+    i = int(np.searchsorted(cum, target))
+    lo, hi = LINE_EDGES[i], min(LINE_EDGES[i + 1], LINE_EDGES[-2] * 4)
+    before = cum[i - 1] if i > 0 else 0
+    frac = (target - before) / hist[i] if hist[i] else 0.0
+    return float(lo + frac * (hi - lo))
+
+
+def finalize_stats(stats: Dict) -> Dict[str, float]:
+    """Model features from raw (possibly merged) stats"""
+    total = stats["bytes"]
+    if total == 0:
+        return {name: 0.0 for name in STAT_FEATURES}
+
+    hist = stats["byte_hist"]
+    p = hist[hist > 0] / total
+    windows = max(stats["windows"], 1)
+    high_bin = int(HIGH_ENTROPY * ENTROPY_BINS / 8)
+
+    ident = stats["ident_hist"]
+    idents = ident.sum()
+    lengths = np.arange(MAX_IDENT_LEN + 1)
+
+    features = {
+        "byte_entropy": float(-(p * np.log2(p)).sum()),
+        "entropy_mean": stats["entropy_sum"] / windows,
+        "entropy_max": stats["entropy_max"],
+        "high_entropy_ratio": float(stats["entropy_hist"][high_bin:].sum() / windows),
+        "alpha_ratio": float(hist[_ALPHA].sum() / total),
+        "digit_ratio": float(hist[_DIGIT].sum() / total),
+        "whitespace_ratio": float(hist[_SPACE].sum() / total),
+        "symbol_ratio": float(hist[_SYMBOL].sum() / total),
+        "non_ascii_ratio": float(hist[_NON_ASCII].sum() / total),
+        "identifier_len_mean": float((ident * lengths).sum() / idents) if idents else 0.0,
+        "short_identifier_ratio": float(ident[:SHORT_IDENT + 1].sum() / idents) if idents else 0.0,
+        "long_identifier_ratio": float(ident[LONG_IDENT:].sum() / idents) if idents else 0.0,
+        "line_len_p50": float(min(_hist_percentile(stats["line_hist"], 0.50), stats["line_len_max"])),
+        "line_len_p95": float(min(_hist_percentile(stats["line_hist"], 0.95), stats["line_len_max"])),
+        "line_len_max": float(stats["line_len_max"]),
+    }
+    return {k: round(v, 4) for k, v in features.items()}
+
+
+def code_stats(data) -> Dict[str, float]:
+    """Statistics features of a single text or byte buffer"""
+    return finalize_stats(raw_stats(data))
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    import time
+
+    if len(sys.argv) < 2:
+        print("Usage: code_stats.py <file> [file ...]")
+        sys.exit(1)
+
+    merged = empty_stats()
+    start = time.perf_counter()
+    for path in sys.argv[1:]:
+        with open(path, "rb") as f:
+            merged = merge_stats(merged, raw_stats(f.read()))
+    elapsed = time.perf_counter() - start
+    print(json.dumps(finalize_stats(merged), indent=2))
+    print(f"{merged['bytes']:,} bytes in {elapsed * 1000:.1f} ms", file=sys.stderr)
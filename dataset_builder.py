@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Dataset Builder
+Builds a labelled training set by running the scanner's own extractors
+(scanner_predictor.build_npm_row / build_pypi_row) over local corpora of
+malicious and benign packages; no network access.
+
+A corpus is a directory tree of packages: unpacked package directories,
+npm tarballs (.tgz), sdists (.tar.gz, .zip) and wheels (.whl). Encrypted
+zips, as malware corpora ship them, open with --zip-password.
+
+Output is a directory of columnar .npy shards:
+
+    dataset/
+        dataset.json            feature schema of every shard
+        shard-00000.X.npy       float64 (rows, features)
+        shard-00000.y.npy       int8 labels, 1 = malicious
+        shard-00000.json        per-row package/version/ecosystem/source,
+                                written last: a shard without it is not done
+
+Re-running the same command resumes: samples recorded in finished shards
+are skipped, and unfinished shard files are overwritten.
+
+    python dataset_builder.py dataset/ --malicious corpora/malicious \\
+        --benign corpora/npm-top corpora/pypi-top [--zip-password infected]
+
+Train on it with: python training_pipeline.py --csv dataset/
+"""
+
+import os
+import sys
+import json
+import time
+import tarfile
+import zipfile
+import tempfile
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Sequence, Tuple
+
+import numpy as np
+
+from feature_schema import FeatureSchema, ECOSYSTEM_COLUMNS
+from scanner_predictor import base_row, build_npm_row, build_pypi_row, _version_fields
+
+DATASET_FILE = "dataset.json"
+DATASET_VERSION = 1
+
+# Every numeric column the extractors fill: base_row plus the install stage
+DATASET_COLUMNS = [
+    k for k, v in base_row("", "").items() if isinstance(v, (int, float)) and not isinstance(v, bool)
+] + ["has_install_scripts", "has_postinstall_hook"]
+
+ARCHIVE_SUFFIXES = (".tgz", ".tar.gz", ".tar", ".zip", ".whl")
+NPM_MARKERS = ("package.json",)
+PYPI_MARKERS = ("setup.py", "pyproject.toml", "setup.cfg", "PKG-INFO")
+
+Sample = Tuple[str, int]   # (path, label)
+
+
+# ---------------- corpus discovery ----------------
+def _is_archive(p: Path) -> bool:
+    return p.is_file() and p.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _is_package_dir(p: Path) -> bool:
+    return any((p / m).exists() for m in NPM_MARKERS + PYPI_MARKERS) or any(p.glob("*.dist-info"))
+
+
+def discover(root: Path) -> List[Path]:
+    """Packages under a corpus root: package directories and archives, sorted"""
+    found = []
+    stack = [Path(root)]
+    while stack:
+        d = stack.pop()
+        if _is_archive(d) or (d.is_dir() and _is_package_dir(d)):
+            found.append(d)
+            continue
+        if d.is_dir() and d.name != ".git":
+            stack.extend(d.iterdir())
+    return sorted(found)
+
+
+# ---------------- extraction ----------------
+def _member_filter(member, dest):
+    # Malware tarballs carry absolute links and device files: drop those members
+    try:
+        return tarfile.data_filter(member, dest)
+    except tarfile.FilterError:
+        return None
+
+
+def _unpack(archive: Path, dest: Path, zip_password: bytes = None):
+    name = archive.name.lower()
+    if name.endswith((".zip", ".whl")):
+        with zipfile.ZipFile(archive) as zf:
+            zf.extractall(dest, pwd=zip_password)
+    else:
+        with tarfile.open(archive) as tar:
+            tar.extractall(dest, filter=_member_filter)
+
+
+def _package_root(path: Path, tmp: Path, zip_password: bytes = None) -> Path | None:
+    """Directory holding the package, unpacking archives (and one archive inside them)"""
+    for depth in range(4):
+        if _is_archive(path):
+            dest = tmp / f"unpacked{depth}"
+            _unpack(path, dest, zip_password)
+            path = dest
+        if not path.is_dir():
+            return None
+        if _is_package_dir(path):
+            return path
+        children = [c for c in path.iterdir() if not c.name.startswith(".")]
+        # npm tarballs unpack into package/, corpus zips into <name>-<version>/
+        if len(children) != 1:
+            return path if any(path.rglob("*.js")) or any(path.rglob("*.py")) else None
+        path = children[0]
+    return None
+
+
+def _pypi_metadata(root: Path) -> Dict[str, Any]:
+    """Name/version/requirements from PKG-INFO (sdist) or METADATA (wheel)"""
+    for meta in [root / "PKG-INFO", *root.glob("*.dist-info/METADATA"), *root.glob("*.egg-info/PKG-INFO")]:
+        if meta.is_file():
+            info = {"name": None, "version": None, "requires": 0}
+            for line in meta.read_text(encoding="utf-8", errors="ignore").splitlines():
+                if not line.strip():
+                    break   # headers end at the first blank line
+                key, _, value = line.partition(":")
+                key = key.lower()
+                if key == "name":
+                    info["name"] = value.strip()
+                elif key == "version":
+                    info["version"] = value.strip()
+                elif key == "requires-dist":
+                    info["requires"] += 1
+            return info
+    return {}
+
+
+# ---------------- feature rows ----------------
+def sample_row(root: Path, fallback_name: str) -> Dict[str, Any]:
+    """Feature row for an unpacked package, from the scanner's extractors"""
+    if (root / "package.json").exists():
+        try:
+            name = json.loads((root / "package.json").read_text(encoding="utf-8", errors="ignore")).get("name")
+        except (ValueError, AttributeError):
+            name = None
+        return build_npm_row(name or fallback_name, root, cascade=False)
+
+    if any((root / m).exists() for m in PYPI_MARKERS) or any(root.glob("*.dist-info")) or any(root.rglob("*.py")):
+        info = _pypi_metadata(root)
+        row = build_pypi_row(info.get("name") or fallback_name, root, cascade=False)
+        if info.get("version"):
+            row["version"] = info["version"]
+            _version_fields(row, info["version"])
+            row["dependencies_count"] = info["requires"]
+        return row
+
+    return build_npm_row(fallback_name, root, cascade=False)
+
+
+def _build_sample(task: Tuple[Sample, bytes]) -> Tuple[Sample, Dict[str, Any] | None, str | None]:
+    """(sample, row, error) for one corpus entry (runs in a worker process)"""
+    (path, label), zip_password = task
+    try:
+        with tempfile.TemporaryDirectory(prefix="scg_ds_") as tmp:
+            root = _package_root(Path(path), Path(tmp), zip_password)
+            if root is None:
+                return (path, label), None, "no package found"
+            row = sample_row(root, Path(path).name.split(".")[0])
+            # Keep what the shard needs; the row's other fields are scan details
+            keep = {k: row.get(k) for k in ("package_name", "ecosystem", "version")}
+            keep.update({k: row[k] for k in DATASET_COLUMNS if k in row})
+            return (path, label), keep, None
+    except Exception as e:
+        return (path, label), None, f"{type(e).__name__}: {e}"
+
+
+# ---------------- shards ----------------
+def _shard_metas(out_dir: Path) -> List[Dict[str, Any]]:
+    metas = []
+    for p in sorted(out_dir.glob("shard-*.json")):
+        metas.append(json.loads(p.read_text(encoding="utf-8")))
+    return metas
+
+
+def _write_shard(out_dir: Path, index: int, schema: FeatureSchema, done: List[Tuple[Sample, Dict[str, Any]]], failed: List[Tuple[Sample, str]]):
+    name = f"shard-{index:05d}"
+    rows = [row for _, row in done]
+    X = schema.vectorize(rows)
+    y = np.array([label for (_, label), _ in done], dtype=np.int8)
+    for suffix, array in ((".X.npy", X), (".y.npy", y)):
+        tmp = out_dir / f"{name}{suffix}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, array, allow_pickle=False)
+        tmp.replace(out_dir / f"{name}{suffix}")
+    meta = {
+        "name": name,
+        "rows": len(done),
+        "samples": [
+            {"source": path, "label": label, "package": row.get("package_name"),
+             "version": row.get("version"), "ecosystem": row.get("ecosystem")}
+            for (path, label), row in done
+        ],
+        "failed": [{"source": path, "label": label, "error": error} for (path, label), error in failed],
+    }
+    tmp = out_dir / f"{name}.json.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    tmp.replace(out_dir / f"{name}.json")
+
+
+def build_dataset(sources: Sequence[Tuple[Path, int]], out_dir: Path, shard_size: int = 2000,
+                  workers: int = None, zip_password: str = None, limit: int = None) -> Dict[str, int]:
+    """Scan every package under the (corpus root, label) sources into out_dir shards"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    schema = FeatureSchema(DATASET_COLUMNS)
+
+    dataset_path = out_dir / DATASET_FILE
+    if dataset_path.exists():
+        existing = json.loads(dataset_path.read_text(encoding="utf-8"))
+        if existing.get("feature_schema", {}).get("fingerprint") != schema.fingerprint:
+            raise ValueError(f"{out_dir} was built with other feature columns; use a new output directory")
+    else:
+        dataset_path.write_text(json.dumps({"version": DATASET_VERSION, "feature_schema": schema.to_dict()}, indent=2), encoding="utf-8")
+
+    metas = _shard_metas(out_dir)
+    seen = {s["source"] for m in metas for s in m["samples"] + m["failed"]}
+    samples: List[Sample] = []
+    for root, label in sources:
+        for p in discover(Path(root)):
+            path = str(p.resolve())
+            if path not in seen:
+                samples.append((path, label))
+                seen.add(path)
+    if limit is not None:
+        samples = samples[:limit]
+    print(f"[Dataset] {len(samples)} packages to scan, {sum(m['rows'] for m in metas)} rows already in {len(metas)} shards")
+
+    stats = {"scanned": 0, "failed": 0, "shards": 0}
+    if not samples:
+        return stats
+
+    password = zip_password.encode() if zip_password else None
+    tasks = [(s, password) for s in samples]
+    index = len(metas)
+    done, failed = [], []
+    start = time.perf_counter()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+
+    def flush():
+        nonlocal index, done, failed
+        if done or failed:
+            _write_shard(out_dir, index, schema, done, failed)
+            index += 1
+            stats["shards"] += 1
+            rate = stats["scanned"] / max(time.perf_counter() - start, 1e-9)
+            print(f"[Dataset] shard {index - 1}: {len(done)} rows, {len(failed)} failed ({rate:.1f} packages/s)")
+            done, failed = [], []
+
+    def collect(results):
+        for sample, row, error in results:
+            if row is None:
+                failed.append((sample, error))
+                stats["failed"] += 1
+            else:
+                done.append((sample, row))
+                stats["scanned"] += 1
+            if len(done) + len(failed) >= shard_size:
+                flush()
+
+    if workers == 1:
+        collect(map(_build_sample, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(_build_sample, tasks, chunksize=max(1, min(64, len(tasks) // (workers * 8)))))
+    flush()
+    return stats
+
+
+def shard_names(out_dir: Path) -> List[str]:
+    """Finished shards, in build order"""
+    return [p.name[: -len(".json")] for p in sorted(Path(out_dir).glob("shard-*.json"))]
+
+
+def load_dataset(out_dir: Path, columns: Sequence[str] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """(X, y, columns) of every finished shard; `columns` selects and orders features"""
+    out_dir = Path(out_dir)
+    schema = FeatureSchema.from_dict(json.loads((out_dir / DATASET_FILE).read_text(encoding="utf-8"))["feature_schema"])
+    names = shard_names(out_dir)
+    if not names:
+        raise ValueError(f"No finished shards in {out_dir}")
+    X = np.concatenate([np.load(out_dir / f"{n}.X.npy", mmap_mode="r") for n in names])
+    y = np.concatenate([np.load(out_dir / f"{n}.y.npy", mmap_mode="r") for n in names])
+    if columns is None:
+        return X, y, schema.columns
+
+    columns = list(columns)
+    picked = np.zeros((len(X), len(columns)), dtype=np.float64)
+    derived = [c for c in columns if c not in schema.index and c in ECOSYSTEM_COLUMNS]
+    ecosystems = [s["ecosystem"] for n in names for s in json.loads((out_dir / f"{n}.json").read_text(encoding="utf-8"))["samples"]] if derived else []
+    for j, c in enumerate(columns):
+        if c in schema.index:
+            picked[:, j] = X[:, schema.index[c]]
+        elif c in ECOSYSTEM_COLUMNS:
+            picked[:, j] = [eco == ECOSYSTEM_COLUMNS[c] for eco in ecosystems]
+        else:
+            raise ValueError(f"Dataset {out_dir} has no column {c!r}")
+    return picked, y, columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a labelled feature dataset from local package corpora")
+    parser.add_argument("out", help="output directory (resumed if it exists)")
+    parser.add_argument("--malicious", nargs="*", default=[], help="corpus roots of malicious packages")
+    parser.add_argument("--benign", nargs="*", default=[], help="corpus roots of benign packages")
+    parser.add_argument("--shard-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--zip-password", default=None, help="password of encrypted corpus zips")
+    parser.add_argument("--limit", type=int, default=None, help="scan at most this many new packages")
+    args = parser.parse_args()
+
+    if not args.malicious and not args.benign:
+        parser.error("give at least one --malicious or --benign corpus")
+    sources = [(Path(p), 1) for p in args.malicious] + [(Path(p), 0) for p in args.benign]
+    stats = build_dataset(sources, Path(args.out), args.shard_size, args.workers, args.zip_password, args.limit)
+    print(f"✅ {stats['scanned']} packages scanned, {stats['failed']} failed, {stats['shards']} new shards -> {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
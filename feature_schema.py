@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Feature Schema
+The contract between feature extractors and the model: the model's column
+order, the legacy names extractors and older trainers use for the same
+columns, and a vectorizer that fills a preallocated matrix straight from
+extractor rows. Saved with the model (manifest "feature_schema").
+"""
+
+import json
+import hashlib
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+# Legacy name -> model column. train_model.py and unified_scanner.py grew
+# their own names for the columns RandomForest/train_model.py trains on
+ALIASES = {
+    "dependency_count": "dependencies_count",
+    "maintainer_count": "maintainers_count",
+    "eval_usage": "eval_calls",
+    "exec_usage": "exec_calls",
+    "shell_command_exec": "shell_commands",
+    "network_calls": "http_requests",
+    "network_calls_count": "http_requests",
+    "external_urls": "external_urls_count",
+    "suspicious_urls": "suspicious_domains",
+    "base64_strings": "base64_encoded_strings",
+    "file_system_read_ops": "file_read_operations",
+    "file_system_write_ops": "file_write_operations",
+    "name_similarity_popular": "name_similarity_to_popular",
+}
+
+# Columns computed from a row's "ecosystem" rather than read from it
+ECOSYSTEM_COLUMNS = {"eco_is_npm": "npm", "eco_is_pypi": "pypi"}
+
+
+class SchemaError(ValueError):
+    """Extractor output or model columns no longer match the schema"""
+
+
+class FeatureSchema:
+    """Model columns compiled to indices once; vectorize() does the rest"""
+
+    def __init__(self, columns: Sequence[str], aliases: Mapping[str, str] = None):
+        self.columns: List[str] = list(columns)
+        self.index: Dict[str, int] = {c: j for j, c in enumerate(self.columns)}
+        if len(self.index) != len(self.columns):
+            dupes = sorted({c for c in self.columns if self.columns.count(c) > 1})
+            raise SchemaError(f"Duplicate feature columns: {dupes}")
+
+        aliases = ALIASES if aliases is None else aliases
+        # Only aliases of columns this model has; a row's own canonical value wins
+        self.alias_index = [(a, self.index[c]) for a, c in aliases.items() if c in self.index and a not in self.index]
+        self.ecosystem_index = [(j, eco) for c, eco in ECOSYSTEM_COLUMNS.items() if (j := self.index.get(c)) is not None]
+
+    def __len__(self):
+        return len(self.columns)
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(json.dumps(self.columns).encode("utf-8")).hexdigest()
+
+    # ---------------- persistence ----------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": SCHEMA_VERSION, "columns": self.columns, "fingerprint": self.fingerprint}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "FeatureSchema":
+        if data.get("version") != SCHEMA_VERSION:
+            raise SchemaError(f"Feature schema v{data.get('version')}, expected v{SCHEMA_VERSION}")
+        schema = cls(data["columns"])
+        if data.get("fingerprint") not in (None, schema.fingerprint):
+            raise SchemaError("Feature schema columns do not match their fingerprint")
+        return schema
+
+    @classmethod
+    def from_model(cls, art: Mapping[str, Any]) -> "FeatureSchema":
+        """The schema saved with a loaded model, or one built from its column list"""
+        if art.get("feature_schema"):
+            schema = cls.from_dict(art["feature_schema"])
+        else:
+            columns = art.get("feature_columns") or art.get("feature_cols")
+            if not columns:
+                raise SchemaError("Model carries no feature schema or column list")
+            schema = cls(columns)
+        engine = art.get("engine")
+        if engine is not None and len(engine.feature) and int(np.max(engine.feature)) >= len(schema):
+            raise SchemaError(f"Model splits on feature {int(np.max(engine.feature))} but the schema has {len(schema)} columns")
+        return schema
+
+    # ---------------- drift checks ----------------
+    def missing(self, produced: Iterable[str]) -> List[str]:
+        """Model columns an extractor producing these keys never fills"""
+        produced = set(produced)
+        covered = {c for c in self.columns if c in produced}
+        covered |= {self.columns[j] for a, j in self.alias_index if a in produced}
+        if "ecosystem" in produced:
+            covered |= {self.columns[j] for j, _ in self.ecosystem_index}
+        return [c for c in self.columns if c not in covered]
+
+    def require(self, produced: Iterable[str]):
+        """Raise SchemaError unless an extractor producing these keys fills every column"""
+        missing = self.missing(produced)
+        if missing:
+            raise SchemaError(f"Extractor does not produce model columns: {missing}")
+
+    # ---------------- vectorizer ----------------
+    def vectorize(self, rows: Sequence[Mapping[str, Any]], out: np.ndarray = None, dtype=np.float64) -> np.ndarray:
+        """
+        (rows, columns) matrix of extractor rows; absent features are 0.
+        Pass `out` to reuse a preallocated matrix. Values that are not
+        numbers raise SchemaError naming the row and column.
+
+        float64 by default: the compiled forest's thresholds are exact for
+        raw float64 inputs (see forest_engine.fold_thresholds).
+        """
+        n = len(rows)
+        if out is None:
+            out = np.empty((n, len(self.columns)), dtype=dtype)
+        elif out.shape != (n, len(self.columns)):
+            raise SchemaError(f"Output matrix is {out.shape}, expected {(n, len(self.columns))}")
+
+        index = self.index
+        blank = [0] * len(self.columns)
+        for i, row in enumerate(rows):
+            # One list per row and a single row write; numpy element writes are slow
+            values = blank.copy()
+            for alias, j in self.alias_index:
+                value = row.get(alias)
+                if value is not None:
+                    values[j] = value
+            for key, value in row.items():
+                j = index.get(key)
+                if j is not None and value is not None:
+                    values[j] = value
+            if self.ecosystem_index and "ecosystem" in row:
+                eco = str(row["ecosystem"]).lower()
+                for j, name in self.ecosystem_index:
+                    values[j] = 1 if eco == name else 0
+            try:
+                out[i] = values
+            except (TypeError, ValueError):
+                raise SchemaError(f"Row {i}: {self._bad_value(row)}") from None
+        return out
+
+    def _bad_value(self, row: Mapping[str, Any]) -> str:
+        for key, value in row.items():
+            if key in self.index or any(key == a for a, _ in self.alias_index):
+                try:
+                    float(value if value is not None else 0)
+                except (TypeError, ValueError):
+                    return f"{key}={value!r} is not numeric"
+        return "non-numeric feature value"
@@ -0,0 +1,337 @@
+"""
+Install-time fast path for npm packages.
+
+npm runs the preinstall/install/postinstall scripts of every dependency, so
+an install-time payload sits in the files those commands start and in what
+they require. This stage resolves the lifecycle commands to files, follows
+relative require() chains a bounded depth and analyzes only that closure.
+Only a MALICIOUS verdict is conclusive and lets callers skip the
+full-package scan: a clean closure says nothing about the rest of the code.
+
+Packages without lifecycle scripts run nothing at install; for them the
+closure is the entry point (`main`/`bin`) and its requires instead, which
+is what runs once the package is loaded. It is reported, never conclusive.
+"""
+
+import json
+import os
+import re
+import shlex
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# The tokenizer and obfuscation rules are shared with the sandbox
+sys.path.append(str(Path(__file__).parent / "sandbox"))
+from js_tokenizer import tokenize, call_counts, indirect_calls, required_modules
+from obfuscation_detector import analyze_javascript
+
+# ---------------- Parameters ----------------
+# Scripts npm runs when a package is installed as a dependency (prepare only
+# runs for git dependencies and local installs)
+LIFECYCLE_SCRIPTS = ("preinstall", "install", "postinstall")
+MAX_DEPTH = 3                 # require() hops followed from a script file
+MAX_FILES = 50                # closure size before giving up on a verdict
+MAX_BYTES = 1_000_000         # larger files are not read
+MAX_SCRIPT_HOPS = 5           # `npm run a` -> `npm run b` -> ...
+
+# SCG_FULL_SCAN=1 scans every package in full even after a conclusive verdict
+FULL_SCAN = os.environ.get("SCG_FULL_SCAN", "") == "1"
+
+JS_SUFFIXES = (".js", ".cjs", ".mjs")
+RESOLVE_SUFFIXES = ("", ".js", ".cjs", ".mjs", ".json", "/index.js", "/index.cjs", "/index.mjs")
+RELATIVE_REQUIRE_RE = re.compile(r"""(?:\brequire\s*\(\s*|\bimport\s*\(\s*|\bfrom\s*)['"](\.{1,2}/[^'"]*)['"]""")
+
+# Commands that only build native addons or set up tooling
+BENIGN_TOOLS = {
+    "node-gyp", "node-gyp-build", "node-pre-gyp", "prebuild-install", "cmake-js",
+    "husky", "patch-package", "tsc", "opencollective", "opencollective-postinstall",
+    "echo", "exit", "true",
+}
+
+# Shell fragments that fetch or run remote code (see RandomForest/scanner.py SUSPICIOUS_TOKENS)
+SHELL_RED_FLAGS = re.compile(
+    r"\b(?:curl|wget|powershell|pwsh|invoke-webrequest|iwr|certutil|nc|ncat)\b"
+    r"|/dev/tcp/|\|\s*(?:ba)?sh\b|\bbase64\s+(?:-d|--decode)\b|\bchmod\s+\+x\b",
+    re.IGNORECASE,
+)
+
+NETWORK_MODULES = {"http", "https", "http2", "net", "tls", "dgram", "dns", "axios", "node-fetch", "request", "got", "ws"}
+EXEC_MODULES = {"child_process", "vm", "worker_threads"}
+SENSITIVE_HINTS = (".ssh", "id_rsa", ".npmrc", ".aws", ".env", ".bashrc", ".git-credentials", "wallet", "keychain")
+
+# Closure obfuscation score that alone settles the verdict as MALICIOUS
+OBFUSCATION_THRESHOLD = 70
+
+
+# ---------------- Command resolution ----------------
+def _simple_commands(command: str) -> List[List[str]]:
+    """argv of every simple command in a shell line (split on && || ; |)"""
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    commands, argv = [], []
+    try:
+        for token in lexer:
+            if token and set(token) <= set("&|;()<>"):
+                if argv:
+                    commands.append(argv)
+                argv = []
+            else:
+                argv.append(token)
+    except ValueError:
+        # Unbalanced quotes: fall back to whitespace
+        argv = command.split()
+    if argv:
+        commands.append(argv)
+
+    out = []
+    for argv in commands:
+        # FOO=bar node x.js, npx tool
+        while argv and re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", argv[0]):
+            argv = argv[1:]
+        if argv and argv[0] == "npx":
+            argv = [a for a in argv[1:] if not a.startswith("-")]
+        if argv:
+            out.append(argv)
+    return out
+
+
+def _resolve(base: Path, spec: str, root: Path) -> Optional[Path]:
+    """File a relative path or require() spec points to, if it is inside the package"""
+    for suffix in RESOLVE_SUFFIXES:
+        candidate = (base / (spec.rstrip("/") + suffix)).resolve()
+        if candidate.is_file() and (candidate == root or root in candidate.parents):
+            return candidate
+    return None
+
+
+def _entry_points(pkg_dir: Path, meta: Dict) -> List[str]:
+    """main/bin/exports entries of a package (default: index.js)"""
+    entries = []
+    if isinstance(meta.get("main"), str):
+        entries.append(meta["main"])
+    bin_ = meta.get("bin")
+    if isinstance(bin_, str):
+        entries.append(bin_)
+    elif isinstance(bin_, dict):
+        entries.extend(v for v in bin_.values() if isinstance(v, str))
+    exports = meta.get("exports")
+    if isinstance(exports, str):
+        entries.append(exports)
+    elif isinstance(exports, dict):
+        dot = exports.get(".", exports)
+        if isinstance(dot, str):
+            entries.append(dot)
+        elif isinstance(dot, dict):
+            entries.extend(v for k, v in dot.items() if k in ("require", "default", "node") and isinstance(v, str))
+    return entries or ["index.js"]
+
+
+def install_closure(pkg_dir: Path, meta: Dict) -> Dict:
+    """
+    Files, inline code and tools reached from the lifecycle scripts (or, when
+    there are none, from the entry points), following relative requires
+    MAX_DEPTH hops.
+    """
+    root = pkg_dir.resolve()
+    scripts = meta.get("scripts") or {}
+    lifecycle = {name: scripts[name] for name in LIFECYCLE_SCRIPTS if isinstance(scripts.get(name), str)}
+
+    closure = {
+        "scripts": lifecycle,
+        "files": [],            # resolved Paths, in discovery order
+        "inline": [],           # node -e code
+        "commands": [],         # shell lines run at install
+        "tools": [],            # executables that are not package files
+        "unresolved": [],       # referenced files that do not exist in the package
+        "truncated": False,
+    }
+    queue: List[Tuple[Path, int]] = []
+
+    def add_file(path: Path, depth: int):
+        if path not in closure["files"]:
+            if len(closure["files"]) >= MAX_FILES:
+                closure["truncated"] = True
+                return
+            closure["files"].append(path)
+            queue.append((path, depth))
+
+    def add_command(command: str, hops: int = 0):
+        closure["commands"].append(command)
+        for argv in _simple_commands(command):
+            tool = os.path.basename(argv[0])
+            if tool in ("node", "nodejs"):
+                args = iter(argv[1:])
+                for arg in args:
+                    if arg in ("-e", "--eval", "-p", "--print"):
+                        closure["inline"].append(next(args, ""))
+                        break
+                    if arg in ("-r", "--require"):
+                        target = _resolve(root, next(args, ""), root)
+                        if target:
+                            add_file(target, 0)
+                        continue
+                    if arg.startswith("-"):
+                        continue
+                    target = _resolve(root, arg, root)
+                    if target:
+                        add_file(target, 0)
+                    else:
+                        closure["unresolved"].append(arg)
+                    break
+            elif tool in ("npm", "yarn", "pnpm") and len(argv) > 1:
+                name = argv[2] if argv[1] in ("run", "run-script") and len(argv) > 2 else argv[1]
+                if isinstance(scripts.get(name), str) and hops < MAX_SCRIPT_HOPS:
+                    add_command(scripts[name], hops + 1)
+                else:
+                    closure["tools"].append(tool)
+            elif tool in ("sh", "bash") and len(argv) > 1 and not argv[1].startswith("-"):
+                target = _resolve(root, argv[1], root)
+                if target:
+                    add_file(target, 0)
+                else:
+                    closure["unresolved"].append(argv[1])
+            elif argv[0].startswith(("./", "../")) or argv[0].endswith(JS_SUFFIXES + (".sh",)):
+                target = _resolve(root, argv[0], root)
+                if target:
+                    add_file(target, 0)
+                else:
+                    closure["unresolved"].append(argv[0])
+            else:
+                closure["tools"].append(tool)
+
+    if lifecycle:
+        for command in lifecycle.values():
+            add_command(command)
+        for code in closure["inline"]:
+            for spec in RELATIVE_REQUIRE_RE.findall(code):
+                target = _resolve(root, spec, root)
+                if target:
+                    add_file(target, 1)
+    else:
+        for entry in _entry_points(root, meta):
+            target = _resolve(root, entry, root)
+            if target:
+                add_file(target, 0)
+
+    # Breadth-first over relative requires
+    while queue:
+        path, depth = queue.pop(0)
+        if depth >= MAX_DEPTH or path.suffix not in JS_SUFFIXES:
+            continue
+        # Raw-text match: a require in a comment only widens the closure
+        for spec in RELATIVE_REQUIRE_RE.findall(_read(path)):
+            target = _resolve(path.parent, spec, root)
+            if target:
+                add_file(target, depth + 1)
+    return closure
+
+
+def _read(path: Path) -> str:
+    try:
+        if path.stat().st_size > MAX_BYTES:
+            return ""
+        return path.read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return ""
+
+
+def _module_name(spec: str) -> str:
+    spec = spec[5:] if spec.startswith("node:") else spec
+    return spec.split("/")[0]
+
+
+# ---------------- Analysis ----------------
+def analyze_install_scripts(pkg_dir: Path, meta: Optional[Dict] = None) -> Dict:
+    """
+    Deep-analyze a package's install-time closure.
+
+    Returns a dict with:
+        verdict: MALICIOUS, SAFE or UNKNOWN
+        conclusive: True (MALICIOUS only) when the full-package scan can be skipped
+        install_time: whether any lifecycle script runs at install
+        files: package-relative paths of the analyzed closure
+        reasons: human-readable evidence for the verdict
+        obfuscation_score: highest per-file obfuscation score in the closure
+    """
+    pkg_dir = Path(pkg_dir)
+    if meta is None:
+        try:
+            meta = json.loads((pkg_dir / "package.json").read_text(encoding="utf-8", errors="ignore"))
+        except (OSError, ValueError):
+            meta = {}
+
+    closure = install_closure(pkg_dir, meta)
+    root = pkg_dir.resolve()
+    reasons = []
+    network = executes = secrets = False
+    obfuscation = 0
+
+    for command in closure["commands"]:
+        if SHELL_RED_FLAGS.search(command):
+            reasons.append(f"install command fetches or runs remote code: {command[:120]}")
+
+    install_time = bool(closure["scripts"])
+    sources = [("<inline>", code) for code in closure["inline"]]
+    if install_time:
+        # The entry closure of a package without scripts only feeds the model
+        sources += [(p.relative_to(root).as_posix(), _read(p)) for p in closure["files"]]
+    for name, source in sources:
+        if not source:
+            continue
+        if name.endswith(".sh"):
+            if SHELL_RED_FLAGS.search(source):
+                reasons.append(f"{name}: shell script fetches or runs remote code")
+            continue
+
+        tokens = tokenize(source)
+        calls = call_counts(tokens)
+        modules = {_module_name(m) for m in required_modules(tokens)}
+        strings = tokens["strings"]
+
+        network |= bool(modules & NETWORK_MODULES) or calls["fetch"] > 0 or calls["http_request"] > 0
+        executes |= bool(modules & EXEC_MODULES) or calls["eval"] + calls["function"] + calls["child_process"] > 0
+        secrets |= "process.env" in tokens["code"] or any(h in s for s in strings for h in SENSITIVE_HINTS)
+
+        hidden = indirect_calls(tokens)
+        if hidden:
+            reasons.append(f"{name}: dangerous calls hidden behind bracket notation ({', '.join(sorted(set(hidden)))})")
+        if closure["scripts"] and any(SHELL_RED_FLAGS.search(s) for s in strings):
+            reasons.append(f"{name}: builds a shell command that fetches or runs remote code")
+        obfuscation = max(obfuscation, analyze_javascript(source)["score"])
+
+    if install_time:
+        if network and (secrets or executes):
+            reasons.append("install-time code combines network access with "
+                           + ("secret/credential access" if secrets else "code or process execution"))
+        if obfuscation >= OBFUSCATION_THRESHOLD:
+            reasons.append(f"install-time code is heavily obfuscated (score {obfuscation})")
+
+    if reasons:
+        verdict = "MALICIOUS"
+    elif not install_time:
+        # Nothing runs at install; the rest of the package still needs the full scan
+        verdict = "SAFE"
+    elif not (network or executes or closure["unresolved"] or closure["truncated"]) \
+            and all(tool in BENIGN_TOOLS for tool in closure["tools"]):
+        verdict = "SAFE"
+    else:
+        verdict = "UNKNOWN"
+
+    return {
+        "verdict": verdict,
+        # SAFE only covers the closure: code it does not reach may still be malicious
+        "conclusive": verdict == "MALICIOUS",
+        "install_time": install_time,
+        "scripts": closure["scripts"],
+        "files": [p.relative_to(root).as_posix() for p in closure["files"]],
+        "reasons": reasons,
+        "obfuscation_score": obfuscation,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: install_scripts.py <package_dir>")
+        sys.exit(1)
+    print(json.dumps(analyze_install_scripts(Path(sys.argv[1])), indent=2))
@@ -0,0 +1,425 @@
+"""
+Lockfile parsing into a deduplicated dependency graph.
+
+Reads package-lock.json / npm-shrinkwrap.json (v2/v3, v1 as a fallback),
+the hidden node_modules/.package-lock.json, yarn.lock (classic and berry),
+pnpm-lock.yaml, poetry.lock and requirements.txt (when every requirement
+is pinned, optionally with --hash).
+Every parser feeds the same graph: one node per (ecosystem, name, version),
+however many times that version appears in the tree, so each unique
+package version is scanned once.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+Key = Tuple[str, str, str]   # (ecosystem, normalized name, version)
+
+# Lockfiles per ecosystem, most authoritative first; the first one found wins
+NPM_LOCKFILES = ["npm-shrinkwrap.json", "package-lock.json", "pnpm-lock.yaml", "yarn.lock", "node_modules/.package-lock.json"]
+PYPI_LOCKFILES = ["poetry.lock", "requirements.txt"]
+
+
+def normalize_name(ecosystem: str, name: str) -> str:
+    if ecosystem == "pypi":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    return name.lower()
+
+
+class DependencyGraph:
+    """Packages keyed by (ecosystem, name, version) and the edges between them"""
+
+    def __init__(self):
+        self.packages: Dict[Key, Dict] = {}
+        self.edges: Dict[Key, Set[Key]] = {}
+        self.roots: Set[Key] = set()
+        self.sources: List[str] = []
+
+    def add(self, ecosystem: str, name: str, version: str, path: str = None,
+            integrity: str = None, dev: bool = False) -> Key:
+        """Record one occurrence of a package version; returns its key"""
+        key = (ecosystem, normalize_name(ecosystem, name), version or "")
+        node = self.packages.get(key)
+        if node is None:
+            node = self.packages[key] = {
+                "ecosystem": ecosystem,
+                "name": key[1],
+                "version": key[2],
+                "paths": [],
+                "integrity": None,
+                "dev": dev,
+                "occurrences": 0,
+            }
+            self.edges[key] = set()
+        node["occurrences"] += 1
+        if path and path not in node["paths"]:
+            node["paths"].append(path)
+        node["integrity"] = node["integrity"] or integrity
+        # Dev-only if every occurrence is
+        node["dev"] = node["dev"] and dev
+        return key
+
+    def link(self, parent: Optional[Key], child: Optional[Key]):
+        if child is None:
+            return
+        if parent is None:
+            self.roots.add(child)
+        else:
+            self.edges[parent].add(child)
+
+    def drop(self, ecosystem: str):
+        """Forget every package of one ecosystem"""
+        for key in [k for k in self.packages if k[0] == ecosystem]:
+            del self.packages[key]
+            del self.edges[key]
+            self.roots.discard(key)
+        for children in self.edges.values():
+            children -= {k for k in children if k[0] == ecosystem}
+
+    def ecosystems(self) -> Set[str]:
+        return {key[0] for key in self.packages}
+
+    def unique(self, ecosystem: str = None) -> List[Dict]:
+        """One node per package version, sorted by name"""
+        return [self.packages[k] for k in sorted(self.packages) if ecosystem in (None, k[0])]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "unique_packages": len(self.packages),
+            "occurrences": sum(n["occurrences"] for n in self.packages.values()),
+            "edges": sum(len(e) for e in self.edges.values()),
+            "roots": len(self.roots),
+        }
+
+    def __len__(self):
+        return len(self.packages)
+
+
+# ---------------- npm: package-lock.json ----------------
+def _v1_packages(deps: Dict, prefix: str = "", out: Dict = None) -> Dict:
+    """Flatten a v1 nested `dependencies` tree into v2-style `packages` locations"""
+    out = {} if out is None else out
+    for name, entry in (deps or {}).items():
+        loc = f"{prefix}node_modules/{name}"
+        out[loc] = {
+            "version": entry.get("version"),
+            "integrity": entry.get("integrity"),
+            "dev": entry.get("dev", False),
+            "dependencies": entry.get("requires") or {},
+        }
+        _v1_packages(entry.get("dependencies"), f"{loc}/", out)
+    return out
+
+
+def parse_package_lock(path: Path, graph: DependencyGraph):
+    data = json.loads(path.read_text(encoding="utf-8", errors="ignore"))
+    packages = data.get("packages")
+    if not isinstance(packages, dict):
+        packages = _v1_packages(data.get("dependencies"))
+        packages[""] = {
+            "dependencies": {name: "" for name in (data.get("dependencies") or {})},
+        }
+
+    # Locations are relative to the project root, also in the hidden lockfile
+    keys: Dict[str, Key] = {}
+    for loc, entry in packages.items():
+        if "node_modules/" not in loc or entry.get("link"):
+            continue  # the project itself, workspace sources and symlinks
+        name = entry.get("name") or loc.rsplit("node_modules/", 1)[1]
+        keys[loc] = graph.add("npm", name, entry.get("version"), path=loc,
+                              integrity=entry.get("integrity"), dev=bool(entry.get("dev")))
+
+    def resolve(loc: str, dep: str) -> Optional[Key]:
+        # Node's lookup: the nearest node_modules/<dep> walking up from loc
+        base = loc
+        while True:
+            candidate = f"{base}/node_modules/{dep}" if base else f"node_modules/{dep}"
+            if candidate in keys:
+                return keys[candidate]
+            if not base:
+                return None
+            cut = base.rfind("/node_modules/")
+            base = base[:cut] if cut >= 0 else ""
+
+    for loc, entry in packages.items():
+        if loc and loc not in keys:
+            continue
+        fields = ("dependencies", "optionalDependencies", "devDependencies") if not loc else ("dependencies", "optionalDependencies")
+        for field in fields:
+            for dep in entry.get(field) or {}:
+                graph.link(keys.get(loc), resolve(loc, dep))
+
+    if "" not in packages:
+        # Hidden lockfile: no root entry, every top-level package is a root
+        for loc, key in keys.items():
+            if loc.count("node_modules/") == 1:
+                graph.roots.add(key)
+
+
+# ---------------- npm: yarn.lock ----------------
+def _yarn_pair(text: str) -> Tuple[str, str]:
+    """`key "value"` (classic) or `key: value` (berry), either side maybe quoted"""
+    if text.startswith('"'):
+        end = text.find('"', 1)
+        key, rest = text[1:end], text[end + 1:]
+    else:
+        key, _, rest = text.partition(" ")
+        if key.endswith(":"):
+            key = key[:-1]
+    return key, rest.lstrip(":").strip().strip('"')
+
+
+def _split_spec(spec: str) -> Tuple[str, str]:
+    """'@scope/name@^1.0' -> ('@scope/name', '^1.0')"""
+    at = spec.find("@", 1)
+    return (spec[:at], spec[at + 1:]) if at > 0 else (spec, "")
+
+
+def parse_yarn_lock(path: Path, graph: DependencyGraph):
+    entries = []
+    current = section = None
+    for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        indent = len(line) - len(line.lstrip(" "))
+        if indent == 0:
+            specs = [s.strip().strip('"') for s in stripped.rstrip(":").split(",")]
+            current = {"specs": specs, "deps": {}}
+            entries.append(current)
+            section = None
+        elif current is None:
+            continue
+        elif indent == 2:
+            key, value = _yarn_pair(stripped)
+            if value:
+                current[key] = value
+                section = None
+            else:
+                section = key
+        elif section in ("dependencies", "optionalDependencies"):
+            name, value = _yarn_pair(stripped)
+            current["deps"][name] = value
+
+    by_spec: Dict[str, Key] = {}
+    resolved = []
+    for entry in entries:
+        if "version" not in entry or entry["specs"][0] == "__metadata":
+            continue
+        name, _ = _split_spec(entry["specs"][0])
+        if "@workspace:" in entry["specs"][0] or "@link:" in entry["specs"][0]:
+            continue
+        key = graph.add("npm", name, entry["version"], integrity=entry.get("integrity") or entry.get("checksum"))
+        for spec in entry["specs"]:
+            by_spec[spec] = key
+        resolved.append((key, entry))
+
+    def lookup(name: str, rng: str) -> Optional[Key]:
+        return by_spec.get(f"{name}@{rng}") or by_spec.get(f"{name}@npm:{rng}")
+
+    for key, entry in resolved:
+        for dep, rng in entry["deps"].items():
+            graph.link(key, lookup(dep, rng))
+
+    manifest = path.parent / "package.json"
+    if manifest.exists():
+        try:
+            meta = json.loads(manifest.read_text(encoding="utf-8", errors="ignore"))
+        except ValueError:
+            meta = {}
+        for field in ("dependencies", "devDependencies", "optionalDependencies"):
+            for dep, rng in (meta.get(field) or {}).items():
+                graph.link(None, lookup(dep, rng))
+
+
+# ---------------- npm: pnpm-lock.yaml ----------------
+def _pnpm_key(key: str) -> Tuple[str, str]:
+    """'/name@1.0.0(peer@2)', 'name@1.0.0' (v9) or '/name/1.0.0_peer' (v5) -> (name, version)"""
+    key = key.lstrip("/").split("(")[0]
+    v5 = re.match(r"^((?:@[^/]+/)?[^/@]+)/(\d[^/_]*)", key)
+    if v5:
+        return v5.group(1), v5.group(2)
+    return _split_spec(key)
+
+
+def _pnpm_version(version) -> str:
+    return str(version).split("(")[0].split("_")[0]
+
+
+def parse_pnpm_lock(path: Path, graph: DependencyGraph):
+    if yaml is None:
+        print(f"[Lockfiles] PyYAML not installed, skipping {path}")
+        return
+    data = yaml.safe_load(path.read_text(encoding="utf-8", errors="ignore")) or {}
+    packages = data.get("packages") or {}
+    snapshots = data.get("snapshots") or {}
+
+    keys: Dict[Tuple[str, str], Key] = {}
+    for raw, entry in packages.items():
+        entry = entry or {}
+        name, version = _pnpm_key(raw)
+        name = entry.get("name", name)
+        version = str(entry.get("version", version))
+        integrity = (entry.get("resolution") or {}).get("integrity")
+        keys[(name, version)] = graph.add("npm", name, version, integrity=integrity, dev=bool(entry.get("dev")))
+
+    def child(name: str, version) -> Optional[Key]:
+        if isinstance(version, dict):
+            version = version.get("version", "")
+        version = str(version)
+        if version[:1].isdigit():
+            return keys.get((name, _pnpm_version(version)))
+        if version.startswith(("link:", "file:")):
+            return None
+        # Aliased or path-style reference: /name/1.0.0, name@1.0.0
+        return keys.get(_pnpm_key(version))
+
+    # v9 keeps dependencies in snapshots, earlier versions in packages
+    for raw, entry in {**packages, **snapshots}.items():
+        entry = entry or {}
+        if "name" in entry:
+            parent = keys.get((entry["name"], str(entry.get("version"))))
+        else:
+            parent = keys.get(_pnpm_key(raw))
+        for field in ("dependencies", "optionalDependencies"):
+            for dep, version in (entry.get(field) or {}).items():
+                graph.link(parent, child(dep, version))
+
+    importers = data.get("importers") or {".": data}
+    for importer in importers.values():
+        for field in ("dependencies", "devDependencies", "optionalDependencies"):
+            for dep, version in ((importer or {}).get(field) or {}).items():
+                graph.link(None, child(dep, version))
+
+
+# ---------------- PyPI: poetry.lock ----------------
+def parse_poetry_lock(path: Path, graph: DependencyGraph):
+    if tomllib is None:
+        print(f"[Lockfiles] tomllib unavailable (Python < 3.11), skipping {path}")
+        return
+    data = tomllib.loads(path.read_text(encoding="utf-8", errors="ignore"))
+
+    by_name: Dict[str, Key] = {}
+    entries = data.get("package") or []
+    for entry in entries:
+        files = entry.get("files") or []
+        integrity = files[0].get("hash") if files else None
+        key = graph.add("pypi", entry["name"], entry.get("version"), integrity=integrity,
+                        dev=entry.get("category") == "dev")
+        by_name[key[1]] = key
+
+    for entry in entries:
+        parent = by_name[normalize_name("pypi", entry["name"])]
+        for dep in entry.get("dependencies") or {}:
+            graph.link(parent, by_name.get(normalize_name("pypi", dep)))
+
+    pyproject = path.parent / "pyproject.toml"
+    if pyproject.exists():
+        try:
+            project = tomllib.loads(pyproject.read_text(encoding="utf-8", errors="ignore"))
+        except ValueError:
+            project = {}
+        poetry = project.get("tool", {}).get("poetry", {})
+        direct = list(poetry.get("dependencies") or {})
+        for group in (poetry.get("group") or {}).values():
+            direct += list(group.get("dependencies") or {})
+        direct += [re.split(r"[\s\[<>=!~;]", d, maxsplit=1)[0] for d in project.get("project", {}).get("dependencies", [])]
+        for dep in direct:
+            graph.link(None, by_name.get(normalize_name("pypi", dep)))
+
+
+# ---------------- PyPI: requirements.txt ----------------
+REQUIREMENT_RE = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(?:===?\s*([^\s;,]+))?")
+
+
+def parse_requirements(path: Path, graph: DependencyGraph, _seen: Set[Path] = None):
+    seen = _seen if _seen is not None else set()
+    path = path.resolve()
+    if path in seen or not path.exists():
+        return
+    seen.add(path)
+
+    # Join backslash continuations (pip-compile puts each --hash on its own line)
+    text = re.sub(r"\\\r?\n", " ", path.read_text(encoding="utf-8", errors="ignore"))
+    for line in text.splitlines():
+        line = line.split(" #", 1)[0].strip()
+        if not line or line.startswith("#"):
+            continue
+        include = re.match(r"^(?:-r|--requirement)\s*=?\s*(\S+)", line)
+        if include:
+            parse_requirements(path.parent / include.group(1), graph, seen)
+            continue
+        if line.startswith("-"):
+            continue
+        m = REQUIREMENT_RE.match(line)
+        if not m:
+            continue
+        hashes = re.findall(r"--hash[=\s]+(\S+)", line)
+        graph.link(None, graph.add("pypi", m.group(1), m.group(2) or "", integrity=hashes[0] if hashes else None))
+
+
+# ---------------- discovery ----------------
+PARSERS = {
+    "npm-shrinkwrap.json": parse_package_lock,
+    "package-lock.json": parse_package_lock,
+    ".package-lock.json": parse_package_lock,
+    "pnpm-lock.yaml": parse_pnpm_lock,
+    "yarn.lock": parse_yarn_lock,
+    "poetry.lock": parse_poetry_lock,
+    "requirements.txt": parse_requirements,
+}
+
+
+def find_lockfiles(project_dir: Path) -> List[Path]:
+    """The lockfile used for each ecosystem present in project_dir"""
+    found = []
+    for candidates in (NPM_LOCKFILES, PYPI_LOCKFILES):
+        for name in candidates:
+            path = project_dir / name
+            if path.is_file():
+                found.append(path)
+                break
+    return found
+
+
+def build_dependency_graph(project_dir: Path) -> DependencyGraph:
+    """Merge the project's lockfiles into one graph (empty if none parse)"""
+    graph = DependencyGraph()
+    for path in find_lockfiles(Path(project_dir)):
+        try:
+            PARSERS[path.name](path, graph)
+        except Exception as e:
+            print(f"[Lockfiles] Could not parse {path}: {e}")
+            continue
+        # Only a fully pinned requirements file locks anything; otherwise
+        # what is installed (or declared) decides
+        if path.name == "requirements.txt" and any(not n["version"] for n in graph.unique("pypi")):
+            graph.drop("pypi")
+            continue
+        graph.sources.append(str(path))
+    return graph
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: lockfiles.py <project_dir>")
+        sys.exit(1)
+
+    g = build_dependency_graph(Path(sys.argv[1]))
+    print(json.dumps({"sources": g.sources, **g.stats()}, indent=2))
+    for node in g.unique():
+        print(f"{node['ecosystem']:5} {node['name']}@{node['version']}  x{node['occurrences']}")
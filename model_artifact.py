@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Model Artifact Format
+A trained model as a directory instead of a pickle:
+
+    security_model/
+        manifest.json     format/version, feature schema, explanations,
+                          metrics, and the sha256 of every array file
+        feature.npy  threshold.npy  children.npy  value.npy  roots.npy
+        classes.npy  scaler_mean.npy  scaler_scale.npy
+
+Loading never unpickles anything: arrays are memory-mapped read-only, so it
+is near-instant and every worker process shares the same pages. Each array
+is checked against its manifest hash before use.
+
+Scanners only load artifacts. Export a pickled model (train scripts do
+this after training):
+    python model_artifact.py data/security_model.pkl
+"""
+
+import sys
+import json
+import pickle
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any
+
+import numpy as np
+
+from forest_engine import ForestEngine
+from feature_schema import FeatureSchema
+
+ARTIFACT_FORMAT = "scg-forest"
+# Bump when the layout or meaning of the arrays changes
+ARTIFACT_VERSION = 1
+MANIFEST = "manifest.json"
+
+# Pickle entries that are not JSON metadata
+MODEL_KEYS = ("model", "scaler")
+
+
+class ArtifactError(Exception):
+    """Artifact missing, of another format/version, or failing its hashes"""
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _json_default(value):
+    # Metrics computed with numpy come out as numpy scalars
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def artifact_dir_for(model_path: Path) -> Path:
+    """data/security_model.pkl -> data/security_model/"""
+    model_path = Path(model_path)
+    return model_path if model_path.is_dir() else model_path.with_suffix("")
+
+
+def save_artifact(engine: ForestEngine, out_dir: Path, meta: Dict[str, Any], scaler=None) -> Path:
+    """Write engine arrays and manifest to out_dir; the manifest goes last"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    arrays = {name: getattr(engine, name) for name in ForestEngine.ARRAYS}
+    if scaler is not None:
+        # Folded into the thresholds already; kept for explanations and audits
+        arrays["scaler_mean"] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(scaler.scale_, dtype=np.float64)
+
+    files = {}
+    for name, array in arrays.items():
+        path = out_dir / f"{name}.npy"
+        np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+        files[name] = {
+            "file": path.name,
+            "dtype": str(array.dtype),
+            "shape": list(array.shape),
+            "sha256": _sha256_file(path),
+        }
+
+    content = hashlib.sha256("\n".join(f"{n}:{files[n]['sha256']}" for n in sorted(files)).encode()).hexdigest()
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "content_sha256": content,
+        "depth": engine.depth,
+        "arrays": files,
+        **meta,
+    }
+    tmp = out_dir / f"{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2, default=_json_default), encoding="utf-8")
+    tmp.replace(out_dir / MANIFEST)
+    return out_dir
+
+
+def load_artifact(artifact_dir: Path, verify: bool = True) -> Dict[str, Any]:
+    """
+    Manifest metadata (feature columns, explanations, metrics, ...) plus
+    "engine", with every array memory-mapped from artifact_dir.
+    """
+    artifact_dir = Path(artifact_dir)
+    try:
+        manifest = json.loads((artifact_dir / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"No readable manifest in {artifact_dir}: {e}")
+    if manifest.get("format") != ARTIFACT_FORMAT or manifest.get("version") != ARTIFACT_VERSION:
+        raise ArtifactError(
+            f"{artifact_dir} is {manifest.get('format')} v{manifest.get('version')}, "
+            f"expected {ARTIFACT_FORMAT} v{ARTIFACT_VERSION}"
+        )
+
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        path = artifact_dir / entry["file"]
+        if verify and _sha256_file(path) != entry["sha256"]:
+            raise ArtifactError(f"{path} does not match its manifest hash")
+        arrays[name] = np.load(path, mmap_mode="r", allow_pickle=False)
+
+    engine = ForestEngine(depth=manifest["depth"], **{n: arrays[n] for n in ForestEngine.ARRAYS})
+    meta = {k: v for k, v in manifest.items() if k != "arrays"}
+    return {**meta, "engine": engine, "scaler_mean": arrays.get("scaler_mean"), "scaler_scale": arrays.get("scaler_scale")}
+
+
+def export_model(pkl_path: Path, out_dir: Path = None) -> Path:
+    """Convert a pickled {model, scaler, ...} dict into an artifact directory"""
+    pkl_path = Path(pkl_path)
+    with open(pkl_path, "rb") as f:
+        data = pickle.load(f)
+    meta = {k: v for k, v in data.items() if k not in MODEL_KEYS}
+    meta["source_sha256"] = _sha256_file(pkl_path)
+    # Models trained before the schema existed only carry their column list
+    meta["feature_schema"] = FeatureSchema.from_model(meta).to_dict()
+    engine = ForestEngine.from_sklearn(data["model"], data.get("scaler"))
+    return save_artifact(engine, out_dir or artifact_dir_for(pkl_path), meta, data.get("scaler"))
+
+
+def load_scoring_model(model_path: Path) -> Dict[str, Any]:
+    """
+    Scoring model from an artifact directory (or the .pkl it was exported
+    from). Never unpickles: a missing or unreadable artifact, or one whose
+    source pickle has since changed, raises ArtifactError until the pickle
+    is exported again. "schema" is its FeatureSchema.
+    """
+    artifact_dir = artifact_dir_for(model_path)
+    if not (artifact_dir / MANIFEST).exists():
+        raise ArtifactError(
+            f"No model artifact in {artifact_dir}; export one with "
+            f"python model_artifact.py {artifact_dir.with_suffix('.pkl')}"
+        )
+    art = load_artifact(artifact_dir)
+    source = artifact_dir.with_suffix(".pkl")
+    if source.is_file() and art.get("source_sha256") != _sha256_file(source):
+        raise ArtifactError(
+            f"{artifact_dir} was not exported from the current {source}; "
+            f"run python model_artifact.py {source}"
+        )
+    return {**art, "schema": FeatureSchema.from_model(art)}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: model_artifact.py <security_model.pkl> [out_dir]")
+        sys.exit(1)
+    out = export_model(Path(sys.argv[1]), Path(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print(f"✅ Exported model artifact -> {out}")
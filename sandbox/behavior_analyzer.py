@@ -5,33 +5,133 @@ Analyzes sandbox execution results and generates threat report
 """
 
 import json
+import re
 import sys
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List
 
+from result_store import ResultWriter, read_record, result_path, build_summary
+from results_catalog import ResultsCatalog, CATALOG_NAME
+from syscall_tracer import read_trace_log, is_suspicious_exec, is_registry_host, DNS_PORT, is_local_address
+
+
+# Risk contributed by each finding type. Shared with the live analyzer so an
+# early verdict scores the same way as the final report.
+RISK_WEIGHTS = {
+    'network_activity': 15,
+    'suspicious_ip': 35,
+    'sensitive_file_access': 30,
+    'ssh_access': 25,
+    'env_access': 20,
+    'file_deletion': 10,
+    'malicious_output': 35,
+    'suspicious_ip_in_output': 30,
+    'file_manipulation': 20,
+    'suspicious_process': 25,
+    'dns_lookup': 10,
+}
+
+# Network and file behavior each contribute at most this much
+CATEGORY_RISK_CAP = 50
+
+MALICIOUS_OUTPUT_KEYWORDS = [
+    'exfiltrat', 'steal', 'credential', 'malicious', 'backdoor',
+    'ssh key', 'environment variable', 'password', 'token'
+]
+
+FILE_MANIPULATION_KEYWORDS = [
+    'writefilesync', 'unlinkSync', 'rm -rf', 'file written',
+    'data exfiltrated to:', '/tmp/', '.ssh', '.env'
+]
+
+IP_PATTERN = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
+
+
+def find_output_ips(text):
+    """IPs mentioned in output, ignoring loopback and 0.x addresses"""
+    return [
+        ip for ip in IP_PATTERN.findall(text)
+        if not ip.startswith('127.') and not ip.startswith('0.')
+    ]
+
 
 class BehaviorAnalyzer:
     """Analyzes sandbox execution behavior and generates threat assessment"""
     
-    def __init__(self, execution_id):
+    def __init__(self, execution_id, execution_data=None, network_data=None,
+                 file_data=None, obfuscation_data=None, trace_data=None):
+        """
+        Args:
+            execution_id: Sandbox execution to analyze
+            execution_data, network_data, file_data, obfuscation_data:
+                In-memory results from the runner. Anything left as None
+                is loaded from the execution's files on disk instead.
+            trace_data: Syscall events (defaults to the binary trace log)
+        """
         self.execution_id = execution_id
         self.results_dir = Path('/sandbox/results')
         self.logs_dir = Path('/sandbox/logs')
         
-        # Load data
-        self.execution_data = self.load_json(
-            self.results_dir / f'{execution_id}_result.json'
-        )
-        self.network_data = self.load_json(
-            self.logs_dir / f'{execution_id}_network.json'
-        )
-        self.file_data = self.load_json(
-            self.logs_dir / f'{execution_id}_files.json'
-        )
-        self.obfuscation_data = self.load_json(
-            self.results_dir / f'{execution_id}_obfuscation.json'
-        )
+        # Load data: result file first, then the older per-monitor JSON files
+        store_file = result_path(self.results_dir, execution_id)
+        if execution_data is None:
+            execution_data = read_record(store_file, 'result') or self.load_json(
+                self.results_dir / f'{execution_id}_result.json'
+            )
+        if network_data is None:
+            network_data = read_record(store_file, 'network') or self.load_json(
+                self.logs_dir / f'{execution_id}_network.json'
+            )
+        if file_data is None:
+            file_data = read_record(store_file, 'files') or self.load_json(
+                self.logs_dir / f'{execution_id}_files.json'
+            )
+        if obfuscation_data is None:
+            obfuscation_data = read_record(store_file, 'obfuscation') or self.load_json(
+                self.results_dir / f'{execution_id}_obfuscation.json'
+            )
+        
+        if trace_data is None:
+            trace_data = read_trace_log(self.logs_dir / f'{execution_id}_trace.bin')
+        
+        self.execution_data = execution_data
+        self.network_data = network_data
+        self.file_data = file_data
+        self.obfuscation_data = obfuscation_data
+        self.trace_data = trace_data
+    
+    def trace_events(self, event_type):
+        """Syscall trace events of one type ('exec', 'open', 'connect', 'dns')"""
+        return [e for e in self.trace_data if e.get('type') == event_type]
+    
+    def traced_connections(self):
+        """Outbound connect() calls in the same shape as NetworkMonitor connections"""
+        connections = []
+        for event in self.trace_events('connect'):
+            if event['port'] == DNS_PORT or is_local_address(event['ip']):
+                continue
+            connections.append({
+                'protocol': 'tcp',
+                'remote': f"{event['ip']}:{event['port']}",
+                'remote_ip': event['ip'],
+                'remote_port': str(event['port']),
+                'state': 'CONNECT',
+                'timestamp': datetime.fromtimestamp(event['timestamp']).isoformat(),
+                'suspicious': event['suspicious'],
+                'source': 'syscall'
+            })
+        return connections
+    
+    def all_connections(self):
+        """netstat connections plus traced ones netstat was too slow to see"""
+        connections = list(self.network_data.get('connections', []))
+        seen = {f"{c.get('remote_ip')}:{c.get('remote_port')}" for c in connections}
+        for conn in self.traced_connections():
+            if conn['remote'] not in seen:
+                seen.add(conn['remote'])
+                connections.append(conn)
+        return connections
     
     def load_json(self, file_path):
         """Load JSON file, return {} if not found"""
@@ -97,14 +197,17 @@ class BehaviorAnalyzer:
     
     def analyze_network_behavior(self) -> Dict:
         """Analyze network activity for threats"""
-        if not self.network_data:
+        if not self.network_data and not self.trace_data:
             return {'risk_score': 0, 'findings': []}
         
         findings = []
         risk_score = 0
         
-        connections = self.network_data.get('connections', [])
-        suspicious_ips = self.network_data.get('suspicious_ips', [])
+        connections = self.all_connections()
+        suspicious_ips = list(self.network_data.get('suspicious_ips', []))
+        for conn in connections:
+            if conn.get('source') == 'syscall' and conn['suspicious'] and conn['remote_ip'] not in suspicious_ips:
+                suspicious_ips.append(conn['remote_ip'])
         
         # Check for external connections
         if connections:
@@ -114,7 +217,7 @@ class BehaviorAnalyzer:
                 'message': f'Made {len(connections)} network connections',
                 'details': connections[:5]  # First 5
             })
-            risk_score += 15
+            risk_score += RISK_WEIGHTS['network_activity']
         
         # Check for suspicious IPs
         if suspicious_ips:
@@ -124,10 +227,10 @@ class BehaviorAnalyzer:
                 'message': f'Connected to {len(suspicious_ips)} suspicious IPs',
                 'details': suspicious_ips
             })
-            risk_score += 35
+            risk_score += RISK_WEIGHTS['suspicious_ip']
         
         return {
-            'risk_score': min(risk_score, 50),
+            'risk_score': min(risk_score, CATEGORY_RISK_CAP),
             'findings': findings,
             'connection_count': len(connections),
             'suspicious_ip_count': len(suspicious_ips)
@@ -135,15 +238,30 @@ class BehaviorAnalyzer:
     
     def analyze_file_behavior(self) -> Dict:
         """Analyze file system activity for threats"""
-        if not self.file_data:
+        if not self.file_data and not self.trace_data:
             return {'risk_score': 0, 'findings': []}
         
         findings = []
         risk_score = 0
         
         analysis = self.file_data.get('analysis', {})
-        threat_indicators = analysis.get('threat_indicators', {})
-        suspicious_events = analysis.get('suspicious_events', [])
+        threat_indicators = dict(analysis.get('threat_indicators', {}))
+        suspicious_events = list(analysis.get('suspicious_events', []))
+        
+        # Credential reads anywhere on disk, which watchdog cannot see
+        for event in self.trace_events('open'):
+            if event['sensitive']:
+                suspicious_events.append({
+                    'type': 'written' if event['write'] else 'read',
+                    'path': event['path'],
+                    'timestamp': datetime.fromtimestamp(event['timestamp']).isoformat(),
+                    'suspicious': True,
+                    'source': 'syscall'
+                })
+                if '.ssh' in event['path']:
+                    threat_indicators['accesses_ssh'] = True
+                if '.env' in event['path']:
+                    threat_indicators['accesses_env'] = True
         
         # Check sensitive file access
         if suspicious_events:
@@ -153,7 +271,7 @@ class BehaviorAnalyzer:
                 'message': f'Accessed {len(suspicious_events)} sensitive files',
                 'details': [e['path'] for e in suspicious_events[:5]]
             })
-            risk_score += 30
+            risk_score += RISK_WEIGHTS['sensitive_file_access']
         
         # Check for SSH access
         if threat_indicators.get('accesses_ssh'):
@@ -163,7 +281,7 @@ class BehaviorAnalyzer:
                 'message': 'Attempted to access SSH keys',
                 'details': 'Potential credential theft'
             })
-            risk_score += 25
+            risk_score += RISK_WEIGHTS['ssh_access']
         
         # Check for env file access
         if threat_indicators.get('accesses_env'):
@@ -173,7 +291,7 @@ class BehaviorAnalyzer:
                 'message': 'Accessed environment variables',
                 'details': 'May be stealing API keys/secrets'
             })
-            risk_score += 20
+            risk_score += RISK_WEIGHTS['env_access']
         
         # Check for file deletions
         deleted_count = len(analysis.get('deleted_files', []))
@@ -184,14 +302,50 @@ class BehaviorAnalyzer:
                 'message': f'Deleted {deleted_count} files',
                 'details': 'Potential data destruction'
             })
-            risk_score += 10
+            risk_score += RISK_WEIGHTS['file_deletion']
         
         return {
-            'risk_score': min(risk_score, 50),
+            'risk_score': min(risk_score, CATEGORY_RISK_CAP),
             'findings': findings,
             'threat_indicators': threat_indicators
         }
     
+    def analyze_process_behavior(self) -> Dict:
+        """Analyze traced process spawns and DNS lookups"""
+        if not self.trace_data:
+            return {'risk_score': 0, 'findings': []}
+        
+        findings = []
+        risk_score = 0
+        
+        execs = self.trace_events('exec')
+        suspicious_execs = [e for e in execs if is_suspicious_exec(e['path'])]
+        if suspicious_execs:
+            findings.append({
+                'severity': 'critical',
+                'type': 'suspicious_process',
+                'message': f'Spawned {len(suspicious_execs)} suspicious processes',
+                'details': [' '.join(e['argv'][:6]) or e['path'] for e in suspicious_execs[:5]]
+            })
+            risk_score += RISK_WEIGHTS['suspicious_process']
+        
+        lookups = sorted({e['name'] for e in self.trace_events('dns') if not is_registry_host(e['name'])})
+        if lookups:
+            findings.append({
+                'severity': 'medium',
+                'type': 'dns_lookup',
+                'message': f'Resolved {len(lookups)} non-registry hosts',
+                'details': lookups[:10]
+            })
+            risk_score += RISK_WEIGHTS['dns_lookup']
+        
+        return {
+            'risk_score': min(risk_score, CATEGORY_RISK_CAP),
+            'findings': findings,
+            'process_count': len(execs),
+            'dns_lookups': lookups
+        }
+    
     def analyze_execution_behavior(self) -> Dict:
         """Analyze execution results for anomalies and suspicious stdout patterns"""
         if not self.execution_data:
@@ -207,45 +361,35 @@ class BehaviorAnalyzer:
         stdout = run_result.get('stdout', '')
         if stdout:
             # Check for data exfiltration mentions
-            if any(keyword in stdout.lower() for keyword in [
-                'exfiltrat', 'steal', 'credential', 'malicious', 'backdoor',
-                'ssh key', 'environment variable', 'password', 'token'
-            ]):
+            if any(keyword in stdout.lower() for keyword in MALICIOUS_OUTPUT_KEYWORDS):
                 findings.append({
                     'severity': 'critical',
                     'type': 'malicious_output',
                     'message': 'Suspicious activity detected in output',
                     'details': 'Code mentions stealing credentials or exfiltrating data'
                 })
-                risk_score += 35
+                risk_score += RISK_WEIGHTS['malicious_output']
             
             # Check for suspicious IP patterns
-            import re
-            ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-            ips_found = re.findall(ip_pattern, stdout)
-            if ips_found:
-                suspicious_ips = [ip for ip in ips_found if not ip.startswith('127.') and not ip.startswith('0.')]
-                if suspicious_ips:
-                    findings.append({
-                        'severity': 'critical',
-                        'type': 'suspicious_ip_in_output',
-                        'message': f'Found suspicious IPs in output: {", ".join(suspicious_ips)}',
-                        'details': suspicious_ips
-                    })
-                    risk_score += 30
+            suspicious_ips = find_output_ips(stdout)
+            if suspicious_ips:
+                findings.append({
+                    'severity': 'critical',
+                    'type': 'suspicious_ip_in_output',
+                    'message': f'Found suspicious IPs in output: {", ".join(suspicious_ips)}',
+                    'details': suspicious_ips
+                })
+                risk_score += RISK_WEIGHTS['suspicious_ip_in_output']
             
             # Check for file system manipulation
-            if any(keyword in stdout.lower() for keyword in [
-                'writefilesync', 'unlinkSync', 'rm -rf', 'file written',
-                'data exfiltrated to:', '/tmp/', '.ssh', '.env'
-            ]):
+            if any(keyword in stdout.lower() for keyword in FILE_MANIPULATION_KEYWORDS):
                 findings.append({
                     'severity': 'high',
                     'type': 'file_manipulation',
                     'message': 'File system manipulation detected',
                     'details': 'Code writes or deletes files'
                 })
-                risk_score += 20
+                risk_score += RISK_WEIGHTS['file_manipulation']
         
         # Check for errors that might indicate malicious code
         if 'error' in execution:
@@ -257,6 +401,16 @@ class BehaviorAnalyzer:
             })
             risk_score += 5
         
+        # Check whether the live analyzer stopped the run early
+        early = execution.get('early_termination')
+        if early:
+            findings.append({
+                'severity': 'critical',
+                'type': 'early_termination',
+                'message': f"Execution stopped after {early.get('elapsed', 0)}s at live risk {early.get('risk_score', 0)}/100",
+                'details': early.get('indicators', [])
+            })
+        
         # Check for timeout (could indicate infinite loop/DoS)
         if execution.get('timeout'):
             findings.append({
@@ -284,12 +438,14 @@ class BehaviorAnalyzer:
             'stdout_analyzed': bool(stdout)
         }
     
-    def calculate_overall_risk(self, network_analysis, file_analysis, execution_analysis) -> int:
+    def calculate_overall_risk(self, network_analysis, file_analysis, execution_analysis,
+                               process_analysis=None) -> int:
         """Calculate overall risk score"""
         total_score = (
             network_analysis['risk_score'] +
             file_analysis['risk_score'] +
-            execution_analysis['risk_score']
+            execution_analysis['risk_score'] +
+            (process_analysis['risk_score'] if process_analysis else 0)
         )
         
         # Cap at 100
@@ -332,29 +488,39 @@ class BehaviorAnalyzer:
         if 'ssh_access' in finding_types or 'sensitive_file_access' in finding_types:
             recommendations.append('🔐 Check for credential theft attempts')
         
+        if 'suspicious_process' in finding_types:
+            recommendations.append('⚙️ Review the commands spawned during install/run')
+        
         if 'env_access' in finding_types:
             recommendations.append('🔑 Verify API keys have not been compromised')
         
         return recommendations
     
-    def generate_report(self) -> Dict:
-        """Generate comprehensive threat analysis report"""
+    def generate_report(self, save=True) -> Dict:
+        """Generate comprehensive threat analysis report (appended to the result file if save)"""
         print(f"[Analyzer] Generating report for: {self.execution_id}")
         
         # Analyze each component
         network_analysis = self.analyze_network_behavior()
         file_analysis = self.analyze_file_behavior()
         execution_analysis = self.analyze_execution_behavior()
+        process_analysis = self.analyze_process_behavior()
         obfuscation_analysis = self.analyze_obfuscation()
         
         # Calculate overall risk (include obfuscation)
         risk_score = self.calculate_overall_risk(
             network_analysis, 
             file_analysis, 
-            execution_analysis
+            execution_analysis,
+            process_analysis
         ) + obfuscation_analysis['risk_score']
         risk_score = min(risk_score, 100)  # Cap at 100
         
+        # Never report less than the score that stopped the run
+        early = self.execution_data.get('execution', {}).get('early_termination')
+        if early:
+            risk_score = max(risk_score, early.get('risk_score', 0))
+        
         threat_level = self.classify_threat_level(risk_score)
         
         # Compile all findings
@@ -362,6 +528,7 @@ class BehaviorAnalyzer:
             network_analysis['findings'] +
             file_analysis['findings'] +
             execution_analysis['findings'] +
+            process_analysis['findings'] +
             obfuscation_analysis['findings']
         )
         
@@ -374,7 +541,7 @@ class BehaviorAnalyzer:
 
         # Prepare network activities for frontend
         network_activities = []
-        for conn in self.network_data.get('connections', []):
+        for conn in self.all_connections():
             try:
                 network_activities.append({
                     'ip': conn.get('remote_ip', 'unknown'),
@@ -406,11 +573,14 @@ class BehaviorAnalyzer:
                 'network_connections': network_analysis.get('connection_count', 0),
                 'suspicious_ips': network_analysis.get('suspicious_ip_count', 0),
                 'file_operations': len(self.file_data.get('events', [])),
+                'process_spawns': process_analysis.get('process_count', 0),
+                'dns_lookups': len(process_analysis.get('dns_lookups', [])),
             },
             'analysis': {
                 'network': network_analysis,
                 'file_system': file_analysis,
-                'execution': execution_analysis
+                'execution': execution_analysis,
+                'process': process_analysis
             },
             'findings': all_findings,
             'recommendations': recommendations,
@@ -418,12 +588,17 @@ class BehaviorAnalyzer:
             'file_operations': file_operations
         }
         
-        # Save report
-        report_file = self.results_dir / f'{self.execution_id}_analysis.json'
-        with open(report_file, 'w') as f:
-            json.dump(report, f, indent=2)
+        if save:
+            report_file = result_path(self.results_dir, self.execution_id)
+            summary = build_summary(report, self.execution_data)
+            with ResultWriter(report_file) as store:
+                store.append('analysis', report)
+                store.append('summary', summary)
+            catalog = ResultsCatalog(self.results_dir / CATALOG_NAME)
+            catalog.record(summary, report_file)
+            catalog.close()
+            print(f"[Analyzer] Report saved: {report_file}")
         
-        print(f"[Analyzer] Report saved: {report_file}")
         print(f"[Analyzer] Risk Score: {risk_score}/100 ({threat_level})")
         
         return report
@@ -448,6 +623,7 @@ class BehaviorAnalyzer:
         print(f"Network Connections: {summary['network_connections']}")
         print(f"Suspicious IPs: {summary['suspicious_ips']}")
         print(f"File Operations: {summary['file_operations']}")
+        print(f"Process Spawns: {summary.get('process_spawns', 0)}")
         
         if report['findings']:
             print(f"\n{'─'*70}")
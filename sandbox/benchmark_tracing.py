@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Tracing Overhead Benchmark
+Times a plain `npm install` against the same install under each tracing mode.
+Run inside the sandbox image, where strace is installed:
+
+    python /sandbox/benchmark_tracing.py /sandbox/package 5
+"""
+
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from syscall_tracer import SyscallTracer
+
+
+def time_install(package_path, tracer=None):
+    """Wall time of one npm install in a fresh copy of the package"""
+    work = Path(tempfile.mkdtemp(prefix='scg-bench-'))
+    try:
+        target = work / 'package'
+        shutil.copytree(package_path, target, ignore=shutil.ignore_patterns('node_modules'))
+        cmd = ['npm', 'install', '--prefix', str(target), '--no-audit', '--no-fund', '--offline']
+        if tracer:
+            cmd = tracer.wrap(cmd)
+
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=str(target), capture_output=True)
+        return time.perf_counter() - start
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def benchmark(package_path, runs=5):
+    modes = ['plain']
+    if SyscallTracer.available():
+        modes += ['strace', 'seccomp']
+    else:
+        print("[Benchmark] strace not found, timing the plain install only")
+
+    results = {}
+    for mode in modes:
+        timings = []
+        events = 0
+        for i in range(runs):
+            tracer = None
+            logs_dir = tempfile.mkdtemp(prefix='scg-bench-logs-')
+            if mode != 'plain':
+                tracer = SyscallTracer(f'bench_{mode}_{i}', mode=mode, logs_dir=logs_dir)
+            timings.append(time_install(package_path, tracer))
+            if tracer:
+                tracer.stop()
+                events = tracer.event_count
+            shutil.rmtree(logs_dir, ignore_errors=True)
+        results[mode] = {'median': statistics.median(timings), 'events': events}
+
+    base = results['plain']['median']
+    print(f"\n{'mode':<10}{'median (s)':>12}{'overhead':>12}{'events':>10}")
+    for mode, r in results.items():
+        overhead = (r['median'] / base - 1) * 100 if base else 0
+        print(f"{mode:<10}{r['median']:>12.3f}{overhead:>11.1f}%{r['events']:>10}")
+    return results
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: benchmark_tracing.py <package_path> [runs]")
+        sys.exit(1)
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    benchmark(sys.argv[1], runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Event Bus
+In-memory channel for monitor events
+"""
+
+import threading
+from collections import defaultdict, deque
+
+# Recent events kept per channel; older ones are only seen by subscribers
+HISTORY = 1000
+
+
+class EventBus:
+    """Thread-safe publish/subscribe bus shared by the sandbox monitors"""
+
+    ALL = '*'
+
+    def __init__(self, history=HISTORY):
+        self._lock = threading.Lock()
+        self._events = defaultdict(lambda: deque(maxlen=history))
+        self._subscribers = defaultdict(list)
+
+    def subscribe(self, channel, callback):
+        """Call callback(channel, event) for every event on channel ('*' for all)"""
+        with self._lock:
+            self._subscribers[channel].append(callback)
+
+    def publish(self, channel, event):
+        """Record an event in the channel's recent history and hand it to subscribers"""
+        with self._lock:
+            self._events[channel].append(event)
+            callbacks = self._subscribers[channel] + self._subscribers[self.ALL]
+
+        # Callbacks run outside the lock so they may publish themselves
+        for callback in callbacks:
+            try:
+                callback(channel, event)
+            except Exception as e:
+                print(f"[EventBus] Subscriber error on '{channel}': {e}")
+
+    def events(self, channel):
+        """Snapshot of the last `history` events published on a channel"""
+        with self._lock:
+            return list(self._events[channel])
@@ -42,8 +42,15 @@ class FileActivityHandler(FileSystemEventHandler):
 class FileMonitor:
     """Monitors file system operations during sandbox execution"""
     
-    def __init__(self, execution_id, watch_path='/sandbox'):
+    def __init__(self, execution_id, watch_path='/sandbox', bus=None):
+        """
+        Args:
+            execution_id: Sandbox execution this monitor belongs to
+            watch_path: Directory to watch recursively
+            bus: Optional EventBus that receives every file event
+        """
         self.execution_id = execution_id
+        self.bus = bus
         self.watch_path = Path(watch_path)
         self.logs_dir = Path('/sandbox/logs')
         self.logs_dir.mkdir(exist_ok=True)
@@ -88,6 +95,9 @@ class FileMonitor:
         
         self.events.append(event)
         
+        if self.bus:
+            self.bus.publish('file', event)
+        
         # Log suspicious activities immediately
         if event['suspicious']:
             print(f"[FileMonitor] ⚠️  SUSPICIOUS {event_type}: {path}")
@@ -191,8 +201,8 @@ class FileMonitor:
         
         self.observer.start()
     
-    def stop(self):
-        """Stop monitoring and save results"""
+    def stop(self, save=True):
+        """Stop monitoring and optionally save results"""
         print(f"[FileMonitor] Stopping...")
         
         try:
@@ -203,28 +213,13 @@ class FileMonitor:
             print(f"[FileMonitor] Error stopping observer: {e}")
         
         try:
-            duration = time.time() - self.start_time if self.start_time else 0
-            
-            # Analyze operations
-            analysis = self.analyze_file_operations()
-            
-            # Compile results
-            result = {
-                'execution_id': self.execution_id,
-                'watch_path': str(self.watch_path),
-                'duration': duration,
-                'events': self.events,
-                'analysis': analysis
-            }
+            result = self.get_results()
             
-            # Save to file
-            log_file = self.logs_dir / f'{self.execution_id}_files.json'
-            with open(log_file, 'w') as f:
-                json.dump(result, f, indent=2)
+            if save:
+                self.save(result)
             
-            print(f"[FileMonitor] Results saved: {log_file}")
             print(f"[FileMonitor] Total events: {len(self.events)}")
-            print(f"[FileMonitor] Suspicious: {len(analysis['suspicious_events'])}")
+            print(f"[FileMonitor] Suspicious: {len(result['analysis']['suspicious_events'])}")
             
             return result
         except Exception as e:
@@ -232,6 +227,31 @@ class FileMonitor:
             import traceback
             traceback.print_exc()
             return None
+    
+    def get_results(self):
+        """Analyze and summarize everything captured so far"""
+        duration = time.time() - self.start_time if self.start_time else 0
+        
+        # Analyze operations
+        analysis = self.analyze_file_operations()
+        
+        return {
+            'execution_id': self.execution_id,
+            'watch_path': str(self.watch_path),
+            'duration': duration,
+            'events': self.events,
+            'analysis': analysis
+        }
+    
+    def log_path(self):
+        return self.logs_dir / f'{self.execution_id}_files.json'
+    
+    def save(self, result):
+        """Write results to the execution's file log"""
+        log_file = self.log_path()
+        with open(log_file, 'w') as f:
+            json.dump(result, f, separators=(',', ':'))
+        print(f"[FileMonitor] Results saved: {log_file}")
 
 
 def main():
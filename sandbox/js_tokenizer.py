@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - JavaScript Tokenizer
+Splits JavaScript source into code and data (strings, template literals,
+regex literals, comments) in one streaming pass, so call sites are only
+counted in real code and string contents can be analyzed on their own.
+"""
+
+import re
+import sys
+import json
+from typing import Dict, List
+
+
+# Code runs are matched in bulk; only the characters that can start a literal
+# or a comment (and braces, inside template substitutions) stop a run
+TOKEN_RE = re.compile(r'''
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>"[^"\\\n]*(?:\\.[^"\\\n]*)*"|'[^'\\\n]*(?:\\.[^'\\\n]*)*')
+  | (?P<template>`)
+  | (?P<slash>/)
+  | (?P<code>[^"'`/]+)
+''', re.S | re.X)
+
+TOKEN_IN_SUBSTITUTION_RE = re.compile(r'''
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>"[^"\\\n]*(?:\\.[^"\\\n]*)*"|'[^'\\\n]*(?:\\.[^'\\\n]*)*')
+  | (?P<template>`)
+  | (?P<slash>/)
+  | (?P<brace>[{}])
+  | (?P<code>[^"'`/{}]+)
+''', re.S | re.X)
+
+# Static part of a template literal, up to the closing backtick or a ${
+TEMPLATE_PART_RE = re.compile(r'[^`\\$]*(?:(?:\\.|\$(?!\{))[^`\\$]*)*(`|\$\{|\Z)', re.S)
+
+REGEX_LITERAL_RE = re.compile(r'/(?![*/])(?:[^\\/\n\[]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*')
+
+# After these keywords a slash starts a regex literal, not a division
+REGEX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+WORD_TAIL_RE = re.compile(r'[\w$]+$')
+
+ESCAPE_RE = re.compile(r'\\(?:x([0-9a-fA-F]{2})|u\{([0-9a-fA-F]+)\}|u([0-9a-fA-F]{4})|([0-7]{1,3})|(\r\n|.))', re.S)
+SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '\n': '', '\r\n': ''}
+
+# Literals appear in the code skeleton as `<index>`; backticks never survive as code
+PLACEHOLDER_RE = r'`(\d+)`'
+REGEX_PLACEHOLDER = '/_/'
+
+# ---------------- call sites ----------------
+
+CALL_PATTERNS = {
+    'eval': re.compile(r'(?<![\w$])eval\s*\('),
+    'function': re.compile(r'(?<![\w$.])(?:new\s+)?Function\s*\('),
+    'charcode': re.compile(r'\.fromCharCode\s*\('),
+    'atob': re.compile(r'(?<![\w$])(?:atob|btoa)\s*\('),
+    'child_process': re.compile(r'\.(?:exec|execSync|execFile|execFileSync|spawn|spawnSync|fork)\s*\('),
+    'fetch': re.compile(r'(?<![\w$.])fetch\s*\('),
+    'http_request': re.compile(r'\b(?:https?|axios)\.(?:request|get|post)\s*\('),
+}
+
+# Buffer.from(x, 'base64') / x.toString('base64')
+BASE64_ARG_RE = re.compile(r'(?:Buffer\.from\s*\([^()]*?,|\.toString\s*\()\s*' + PLACEHOLDER_RE + r'\s*\)')
+REQUIRE_RE = re.compile(r'(?<![\w$.])(?:require|import)\s*\(\s*' + PLACEHOLDER_RE + r'\s*\)|\bfrom\s*' + PLACEHOLDER_RE)
+# obj['ev' + 'al'](...)
+BRACKET_CALL_RE = re.compile(r'\[\s*(`\d+`(?:\s*\+\s*`\d+`)*)\s*\]\s*\(')
+
+# Names that are dangerous to reach through a computed property
+INDIRECT_NAMES = {
+    'eval': 'eval',
+    'Function': 'function',
+    'constructor': 'function',
+    'fromCharCode': 'charcode',
+    'atob': 'atob',
+    'exec': 'child_process',
+    'execSync': 'child_process',
+    'spawn': 'child_process',
+    'spawnSync': 'child_process',
+    'require': 'require',
+}
+
+
+def decode_js_string(raw: str) -> str:
+    """Value of a string literal body with its escape sequences applied"""
+    if '\\' not in raw:
+        return raw
+
+    def replace(m):
+        hex2, brace, hex4, octal, other = m.groups()
+        try:
+            if hex2 or hex4 or brace:
+                return chr(int(hex2 or hex4 or brace, 16))
+            if octal:
+                return chr(int(octal, 8))
+        except (ValueError, OverflowError):
+            return ''
+        return SIMPLE_ESCAPES.get(other, other)
+
+    return ESCAPE_RE.sub(replace, raw)
+
+
+def _regex_allowed(prev: str) -> bool:
+    """Whether a slash after this code tail starts a regex literal"""
+    if not prev:
+        return True
+    last = prev[-1]
+    if last in ')]`':
+        return False
+    if last.isalnum() or last in '_$':
+        word = WORD_TAIL_RE.search(prev)
+        return bool(word) and word.group() in REGEX_KEYWORDS
+    return True
+
+
+def tokenize(source: str) -> Dict:
+    """
+    Split source into a code skeleton and its literals.
+
+    Returns:
+        code: the source with comments removed and every string/template
+              part replaced by `<index>` (regex literals by /_/)
+        strings: decoded string and template-literal contents, by index
+        escaped: source text of the literals that contained escape sequences
+        comments, regexes: how many of each were stripped
+    """
+    code: List[str] = []
+    strings: List[str] = []
+    escaped: List[str] = []
+    comments = 0
+    regexes = 0
+    substitutions: List[int] = []   # brace depth inside each open ${ ... }
+    prev = ''                       # tail of the last code emitted
+    pos = 0
+    end = len(source)
+
+    def literal(value):
+        code.append(f'`{len(strings)}`')
+        if '\\' in value:
+            escaped.append(value)
+            value = decode_js_string(value)
+        strings.append(value)
+
+    def template_part(start):
+        """Consume a template's static text; returns the position after it"""
+        m = TEMPLATE_PART_RE.match(source, start)
+        terminator = m.group(1)
+        literal(source[start:m.end() - len(terminator)])
+        if terminator == '${':
+            substitutions.append(0)
+        return m.end()
+
+    while pos < end:
+        pattern = TOKEN_IN_SUBSTITUTION_RE if substitutions else TOKEN_RE
+        for m in pattern.finditer(source, pos):
+            kind = m.lastgroup
+            if kind == 'code':
+                text = m.group()
+                code.append(text)
+                tail = text.rstrip()
+                if tail:
+                    prev = tail[-16:]
+            elif kind == 'string':
+                literal(m.group()[1:-1])
+                prev = '`'
+            elif kind == 'comment':
+                comments += 1
+                code.append(' ')
+            elif kind == 'slash':
+                regex = REGEX_LITERAL_RE.match(source, m.start()) if _regex_allowed(prev) else None
+                if regex:
+                    regexes += 1
+                    code.append(REGEX_PLACEHOLDER)
+                    prev = '`'
+                    pos = regex.end()
+                    break
+                code.append('/')
+                prev = '/'
+            elif kind == 'template':
+                pos = template_part(m.end())
+                prev = '`'
+                break
+            elif kind == 'brace':
+                if m.group() == '{':
+                    substitutions[-1] += 1
+                elif substitutions[-1]:
+                    substitutions[-1] -= 1
+                else:
+                    # End of a ${ ... }: the template's static text resumes
+                    substitutions.pop()
+                    pos = template_part(m.end())
+                    prev = '`'
+                    break
+                code.append(m.group())
+                prev = m.group()
+        else:
+            break
+
+    return {
+        'code': ''.join(code),
+        'strings': strings,
+        'escaped': escaped,
+        'comments': comments,
+        'regexes': regexes,
+    }
+
+
+def _literals(tokens: Dict, group: str) -> List[str]:
+    return [tokens['strings'][int(i)] for i in re.findall(r'\d+', group)]
+
+
+def call_counts(tokens: Dict) -> Dict[str, int]:
+    """Call sites in real code only, including computed-property calls"""
+    code = tokens['code']
+    counts = {name: len(pattern.findall(code)) for name, pattern in CALL_PATTERNS.items()}
+    counts['base64'] = counts.pop('atob') + sum(
+        1 for i in BASE64_ARG_RE.findall(code) if tokens['strings'][int(i)] == 'base64'
+    )
+    for name in indirect_calls(tokens):
+        counts[INDIRECT_NAMES[name]] = counts.get(INDIRECT_NAMES[name], 0) + 1
+    return counts
+
+
+def indirect_calls(tokens: Dict) -> List[str]:
+    """Dangerous names reached as obj['na' + 'me'](...)"""
+    found = []
+    for group in BRACKET_CALL_RE.findall(tokens['code']):
+        name = ''.join(_literals(tokens, group))
+        if name in INDIRECT_NAMES:
+            found.append(name)
+    return found
+
+
+def required_modules(tokens: Dict) -> List[str]:
+    """Modules loaded with require()/import() or imported with `from`"""
+    modules = []
+    for a, b in REQUIRE_RE.findall(tokens['code']):
+        modules.append(tokens['strings'][int(a or b)])
+    return modules
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: js_tokenizer.py <file.js>")
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding='utf-8', errors='ignore') as f:
+        tokens = tokenize(f.read())
+    print(json.dumps({
+        'calls': call_counts(tokens),
+        'indirect_calls': indirect_calls(tokens),
+        'modules': sorted(set(required_modules(tokens))),
+        'strings': len(tokens['strings']),
+        'comments': tokens['comments'],
+        'regexes': tokens['regexes'],
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
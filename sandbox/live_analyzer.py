@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Live Behavior Analyzer
+Scores network, file and stdout events as they arrive and stops the
+detonation as soon as the verdict is clear
+"""
+
+import threading
+import time
+
+from behavior_analyzer import (
+    RISK_WEIGHTS,
+    CATEGORY_RISK_CAP,
+    MALICIOUS_OUTPUT_KEYWORDS,
+    FILE_MANIPULATION_KEYWORDS,
+    find_output_ips,
+)
+from syscall_tracer import is_suspicious_exec, is_registry_host, is_local_address, DNS_PORT
+
+
+NETWORK_INDICATORS = ('network_activity', 'suspicious_ip')
+FILE_INDICATORS = ('sensitive_file_access', 'ssh_access', 'env_access', 'file_deletion')
+OUTPUT_INDICATORS = ('malicious_output', 'suspicious_ip_in_output', 'file_manipulation')
+PROCESS_INDICATORS = ('suspicious_process', 'dns_lookup')
+
+# npm/pip fetch from their registries over these while installing
+REGISTRY_PORTS = (80, 443)
+
+
+class LiveBehaviorAnalyzer:
+    """Incremental risk scoring over the monitor event bus"""
+
+    def __init__(self, bus, kill_threshold=70, on_verdict=None):
+        """
+        Args:
+            bus: EventBus carrying 'stage', 'network', 'file', 'stdout' and 'syscall' events
+            kill_threshold: Risk score that ends the detonation (0 disables)
+            on_verdict: Called once with the verdict when the threshold is crossed
+        """
+        self.kill_threshold = kill_threshold
+        self.on_verdict = on_verdict
+
+        self.indicators = {}  # finding type -> first event that raised it
+        self.risk_score = 0
+        self.verdict = None
+        self.stage = None
+        self.unknown_lookups = False  # a host other than a registry was resolved
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+
+        bus.subscribe('stage', self.on_stage_event)
+        bus.subscribe('network', self.on_network_event)
+        bus.subscribe('file', self.on_file_event)
+        bus.subscribe('stdout', self.on_stdout_event)
+        bus.subscribe('syscall', self.on_syscall_event)
+
+    def on_stage_event(self, channel, event):
+        self.stage = event.get('stage')
+
+    def is_registry_traffic(self, conn):
+        """An install-stage fetch while only registry hosts have been resolved"""
+        port = int(conn.get('port') or conn.get('remote_port') or 0)
+        return (self.stage == 'install' and port in REGISTRY_PORTS
+                and not self.unknown_lookups and not conn.get('suspicious'))
+
+    def on_network_event(self, channel, conn):
+        if self.is_registry_traffic(conn):
+            return
+        self.raise_indicator('network_activity', conn)
+        if conn.get('suspicious'):
+            self.raise_indicator('suspicious_ip', conn)
+
+    def on_file_event(self, channel, event):
+        path = event.get('path', '')
+        if event.get('suspicious'):
+            self.raise_indicator('sensitive_file_access', event)
+        if '.ssh' in path:
+            self.raise_indicator('ssh_access', event)
+        if '.env' in path:
+            self.raise_indicator('env_access', event)
+        if event.get('type') == 'deleted':
+            self.raise_indicator('file_deletion', event)
+
+    def on_stdout_event(self, channel, event):
+        # Like the final report, only the package's own run is scored: pip
+        # and npm progress output ("Collecting tokenizers", /tmp/pip-...) is not
+        if event.get('stage') == 'install':
+            return
+        line = event.get('line', '')
+        lowered = line.lower()
+        if any(keyword in lowered for keyword in MALICIOUS_OUTPUT_KEYWORDS):
+            self.raise_indicator('malicious_output', event)
+        if find_output_ips(line):
+            self.raise_indicator('suspicious_ip_in_output', event)
+        if any(keyword in lowered for keyword in FILE_MANIPULATION_KEYWORDS):
+            self.raise_indicator('file_manipulation', event)
+
+    def on_syscall_event(self, channel, event):
+        kind = event.get('type')
+        if kind == 'open' and event.get('sensitive'):
+            self.on_file_event(channel, event)
+        elif kind == 'connect':
+            if event['port'] != DNS_PORT and not is_local_address(event['ip']):
+                self.on_network_event(channel, event)
+        elif kind == 'exec' and is_suspicious_exec(event['path']):
+            self.raise_indicator('suspicious_process', event)
+        elif kind == 'dns' and not is_registry_host(event['name']):
+            self.unknown_lookups = True
+            self.raise_indicator('dns_lookup', event)
+
+    def score(self):
+        """Current risk score, capped per category like the final report"""
+        def category(types):
+            return sum(RISK_WEIGHTS[t] for t in types if t in self.indicators)
+
+        total = (
+            min(category(NETWORK_INDICATORS), CATEGORY_RISK_CAP) +
+            min(category(FILE_INDICATORS), CATEGORY_RISK_CAP) +
+            category(OUTPUT_INDICATORS) +
+            min(category(PROCESS_INDICATORS), CATEGORY_RISK_CAP)
+        )
+        return min(total, 100)
+
+    def raise_indicator(self, indicator, event):
+        """Record an indicator, rescore, and fire the verdict once the threshold is hit"""
+        with self._lock:
+            if indicator in self.indicators:
+                return
+            self.indicators[indicator] = event
+            self.risk_score = self.score()
+            print(f"[LiveAnalyzer] {indicator} -> risk {self.risk_score}/100")
+
+            if self.verdict or not self.kill_threshold or self.risk_score < self.kill_threshold:
+                return
+
+            self.verdict = {
+                'risk_score': self.risk_score,
+                'verdict': 'MALICIOUS',
+                'indicators': sorted(self.indicators),
+                'elapsed': round(time.time() - self.start_time, 3),
+            }
+            verdict = self.verdict
+
+        print(f"[LiveAnalyzer] ⛔ Threshold {self.kill_threshold} crossed after {verdict['elapsed']}s")
+        if self.on_verdict:
+            self.on_verdict(verdict)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Monitor Supervisor
+Runs the network and file monitors as threads inside the sandbox runner
+"""
+
+from event_bus import EventBus
+from network_monitor import NetworkMonitor
+from file_monitor import FileMonitor
+
+
+class MonitorSupervisor:
+    """Owns the in-process monitors and the event bus they publish to"""
+
+    def __init__(self, execution_id, watch_path, bus=None, store=None):
+        """
+        Args:
+            execution_id: Sandbox execution being monitored
+            watch_path: Directory handed to the file monitor
+            bus: EventBus to publish on (a new one is created if omitted)
+            store: Optional ResultWriter that receives the raw monitor results
+        """
+        self.execution_id = execution_id
+        self.bus = bus or EventBus()
+        self.store = store
+
+        self.network = NetworkMonitor(execution_id, bus=self.bus)
+        self.files = FileMonitor(execution_id, watch_path, bus=self.bus)
+
+    def start(self):
+        """Start both monitors; each runs on its own background thread"""
+        self.network.start()
+        self.files.start()
+
+    def stop(self):
+        """Stop both monitors and return their in-memory results"""
+        network_result = self.network.stop(save=False) or {}
+        file_result = self.files.stop(save=False) or {}
+
+        if self.store:
+            self.store.append('network', network_result)
+            self.store.append('files', file_result)
+
+        return {'network': network_result, 'files': file_result}
@@ -17,11 +17,39 @@ import subprocess
 import re
 
 
+def is_suspicious_ip(ip):
+    """Check if IP is suspicious (not common CDN/registry)"""
+    # Known safe patterns (npm registry, GitHub, etc.)
+    safe_prefixes = [
+        '104.16.',  # Cloudflare CDN
+        '151.101.',  # Fastly CDN
+        '185.199.',  # GitHub
+        '140.82.',   # GitHub
+    ]
+    
+    for prefix in safe_prefixes:
+        if ip.startswith(prefix):
+            return False
+    
+    # Check if it's a private IP
+    if ip.startswith('10.') or ip.startswith('192.168.') or ip.startswith('172.'):
+        return False
+    
+    # Everything else is potentially suspicious
+    return True
+
+
 class NetworkMonitor:
     """Monitors network connections during sandbox execution"""
     
-    def __init__(self, execution_id):
+    def __init__(self, execution_id, bus=None):
+        """
+        Args:
+            execution_id: Sandbox execution this monitor belongs to
+            bus: Optional EventBus that receives every new connection
+        """
         self.execution_id = execution_id
+        self.bus = bus
         self.logs_dir = Path('/sandbox/logs')
         self.logs_dir.mkdir(exist_ok=True)
         
@@ -31,6 +59,7 @@ class NetworkMonitor:
         
         self.monitoring = False
         self.start_time = None
+        self._stop_event = threading.Event()
         
     def parse_netstat_output(self, output):
         """Parse netstat output for active connections"""
@@ -91,59 +120,60 @@ class NetworkMonitor:
                     # Only log new connections
                     if conn_key not in seen_connections:
                         seen_connections.add(conn_key)
+                        conn['suspicious'] = self.is_suspicious_ip(conn['remote_ip'])
                         self.connections.append(conn)
                         
                         print(f"[NetworkMonitor] New connection: {conn_key}")
                         
                         # Check for suspicious IPs (hardcoded/external)
-                        if self.is_suspicious_ip(conn['remote_ip']):
+                        if conn['suspicious']:
                             print(f"[NetworkMonitor] ⚠️  SUSPICIOUS IP: {conn['remote_ip']}")
+                        
+                        if self.bus:
+                            self.bus.publish('network', conn)
                 
             except Exception as e:
                 print(f"[NetworkMonitor] Error: {e}")
             
-            time.sleep(0.5)  # Poll every 500ms
+            # Poll every 500ms, but wake immediately on stop()
+            self._stop_event.wait(0.5)
     
     def is_suspicious_ip(self, ip):
         """Check if IP is suspicious (not common CDN/registry)"""
-        # Known safe patterns (npm registry, GitHub, etc.)
-        safe_prefixes = [
-            '104.16.',  # Cloudflare CDN
-            '151.101.',  # Fastly CDN
-            '185.199.',  # GitHub
-            '140.82.',   # GitHub
-        ]
-        
-        for prefix in safe_prefixes:
-            if ip.startswith(prefix):
-                return False
-        
-        # Check if it's a private IP
-        if ip.startswith('10.') or ip.startswith('192.168.') or ip.startswith('172.'):
-            return False
-        
-        # Everything else is potentially suspicious
-        return True
+        return is_suspicious_ip(ip)
     
     def start(self):
         """Start monitoring in background thread"""
         self.monitoring = True
+        self._stop_event.clear()
         self.monitor_thread = threading.Thread(target=self.capture_connections)
         self.monitor_thread.daemon = True
         self.monitor_thread.start()
     
-    def stop(self):
-        """Stop monitoring and save results"""
+    def stop(self, save=True):
+        """Stop monitoring and optionally save results"""
         print(f"[NetworkMonitor] Stopping...")
         self.monitoring = False
+        self._stop_event.set()
         
         if hasattr(self, 'monitor_thread'):
             self.monitor_thread.join(timeout=5)
         
-        # Save results
+        result = self.get_results()
+        
+        if save:
+            self.save(result)
+        
+        print(f"[NetworkMonitor] Total connections: {len(self.connections)}")
+        print(f"[NetworkMonitor] Suspicious IPs: {len(result['suspicious_ips'])}")
+        
+        return result
+    
+    def get_results(self):
+        """Summarize everything captured so far"""
         duration = time.time() - self.start_time if self.start_time else 0
         
-        result = {
+        return {
             'execution_id': self.execution_id,
             'duration': duration,
             'total_connections': len(self.connections),
@@ -155,17 +185,16 @@ class NetworkMonitor:
                 if self.is_suspicious_ip(conn['remote_ip'])
             ]
         }
-        
-        # Save to file
-        log_file = self.logs_dir / f'{self.execution_id}_network.json'
+    
+    def log_path(self):
+        return self.logs_dir / f'{self.execution_id}_network.json'
+    
+    def save(self, result):
+        """Write results to the execution's network log"""
+        log_file = self.log_path()
         with open(log_file, 'w') as f:
-            json.dump(result, f, indent=2)
-        
+            json.dump(result, f, separators=(',', ':'))
         print(f"[NetworkMonitor] Results saved: {log_file}")
-        print(f"[NetworkMonitor] Total connections: {len(self.connections)}")
-        print(f"[NetworkMonitor] Suspicious IPs: {len(result['suspicious_ips'])}")
-        
-        return result
 
 
 def main():
@@ -4,364 +4,680 @@ Supply Chain Guardian - Obfuscation Detector
 Detects code obfuscation patterns in package source code
 """
 
+import os
 import re
-import ast
+import sys
 import json
+import hashlib
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, Optional
+from collections import deque
+
+from js_tokenizer import tokenize, call_counts, indirect_calls
+from python_ast_analyzer import analyze_source, call_sites, REPORTED_CATEGORIES
+from worker_pool import TimeoutPool, ERROR, TIMEOUT
+
+
+# Bump when the rules below change so cached per-file results are invalidated
+RULES_VERSION = 3
+
+# Directories never descended into
+SKIP_DIRS = {'node_modules', '__pycache__', '.git'}
+
+# File extension -> analyzer
+LANGUAGES = {
+    '.js': 'javascript',
+    '.py': 'python',
+}
+
+# Seconds one file may take before its worker is killed
+FILE_TIMEOUT = 10
+
+# Packages this small are analyzed in-process: starting the pool costs more
+# than the analysis, and small inputs are unlikely to hit the timeout
+IN_PROCESS_FILES = 4
+IN_PROCESS_BYTES = 256 * 1024
+
+# Python findings that carry the line numbers of their call sites
+LINE_CATEGORIES = {
+    'base64_encoding': ('base64',),
+    'exec_eval_usage': ('exec', 'eval'),
+    'compile_usage': ('compile',),
+    'dynamic_imports': ('dynamic_import',),
+    'serialized_code': ('serialized',),
+}
+
+# ---------------- JavaScript rules ----------------
+
+# Matched on the token skeleton, where every string literal is `<index>`
+# and comments are gone: name -> (pattern, literal that must appear)
+JS_PATTERNS = {
+    'concat': (re.compile(r'`\d+`(?:\s*\+\s*`\d+`){5,}'), '+'),
+    'single_var': (re.compile(r'\b[a-z]\s*='), '='),
+    'bracket': (re.compile(r'\[`(\d+)`\]'), '['),
+}
+
+# Escape sequences only exist in the raw text
+JS_ESCAPE_PATTERNS = {
+    'hex': (re.compile(r'\\x[0-9a-fA-F]{2}'), '\\x'),
+    'unicode': (re.compile(r'\\u[0-9a-fA-F]{4}'), '\\u'),
+}
+
+IDENTIFIER_RE = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
+PIECE_RE = re.compile(r'`(\d+)`')
+
+# ---------------- Python rules ----------------
+
+PY_PATTERNS = {
+    'base64': (re.compile(r'base64\.(?:b64decode|b64encode|decodebytes)'), 'base64.'),
+    'exec': (re.compile(r'\b(?:exec|eval)\s*\('), None),
+    'compile': (re.compile(r'\bcompile\s*\('), 'compile'),
+    'dynamic_import': (re.compile(r'__import__\s*\('), '__import__'),
+    'hex': (re.compile(r'\\x[0-9a-fA-F]{2}'), '\\x'),
+    'chr': (re.compile(r'\bchr\s*\('), 'chr'),
+    'attr': (re.compile(r'\b(?:getattr|setattr|hasattr)\s*\('), 'attr'),
+    'join': (re.compile(r'["\']\.join\('), '.join('),
+    'marshal': (re.compile(r'\b(?:marshal|pickle)\.(?:loads|dumps)'), None),
+    'rot13': (re.compile(r'codecs\.(?:encode|decode)|rot_13', re.IGNORECASE), None),
+}
+
+
+def count_patterns(patterns, content: str) -> Dict[str, int]:
+    """Match count of every pattern, skipping those whose literal is absent"""
+    return {
+        name: len(pattern.findall(content)) if literal is None or literal in content else 0
+        for name, (pattern, literal) in patterns.items()
+    }
+
+
+def javascript_counts(content: str) -> tuple:
+    """
+    Per-rule counts for JavaScript source and the tokens behind them.
+    Calls are counted in code only, so eval( inside a string or comment
+    never matches, and bracket calls like window['ev' + 'al']() are folded.
+    """
+    tokens = tokenize(content)
+    code, strings = tokens['code'], tokens['strings']
+    calls = call_counts(tokens)
+    counts = count_patterns(JS_ESCAPE_PATTERNS, content)
+
+    matches = {
+        name: pattern.finditer(code) if literal in code else ()
+        for name, (pattern, literal) in JS_PATTERNS.items()
+    }
+    # Runs of 1-3 character pieces: 'e' + 'v' + 'a' + ...
+    counts['concat'] = sum(
+        1 for m in matches['concat']
+        if all(1 <= len(strings[int(i)]) <= 3 for i in PIECE_RE.findall(m.group()))
+    )
+    # obj['name'] where a dot would have done
+    counts['bracket'] = sum(1 for m in matches['bracket'] if IDENTIFIER_RE.fullmatch(strings[int(m.group(1))]))
+    counts['single_var'] = sum(1 for _ in matches['single_var'])
+    counts.update(base64=calls['base64'], eval=calls['eval'],
+                  function=calls['function'], charcode=calls['charcode'])
+    return counts, tokens
+
+
+def analyze_javascript(content: str) -> Dict:
+    """Analyze JavaScript code for obfuscation patterns"""
+    findings = []
+    score = 0
+    counts, tokens = javascript_counts(content)
+
+    # 1. Base64 encoding detection
+    base64_matches = counts['base64']
+    if base64_matches > 0:
+        findings.append({
+            'type': 'base64_encoding',
+            'severity': 'high',
+            'count': base64_matches,
+            'message': f'Found {base64_matches} base64 encoding operations'
+        })
+        score += min(base64_matches * 10, 30)
+
+    # 2. Hex string patterns (long hex strings often indicate obfuscation)
+    hex_matches = counts['hex']
+    if hex_matches > 10:
+        findings.append({
+            'type': 'hex_encoding',
+            'severity': 'high',
+            'count': hex_matches,
+            'message': f'Found {hex_matches} hex-encoded characters'
+        })
+        score += min(hex_matches // 2, 25)
+
+    # 3. eval() usage (code execution from strings)
+    eval_matches = counts['eval']
+    if eval_matches > 0:
+        findings.append({
+            'type': 'eval_usage',
+            'severity': 'critical',
+            'count': eval_matches,
+            'message': f'Found {eval_matches} eval() calls (dynamic code execution)'
+        })
+        score += eval_matches * 20
+
+    # 4. Function constructor (indirect eval)
+    func_matches = counts['function']
+    if func_matches > 0:
+        findings.append({
+            'type': 'function_constructor',
+            'severity': 'critical',
+            'count': func_matches,
+            'message': f'Found {func_matches} Function() constructor calls'
+        })
+        score += func_matches * 20
+
+    # 5. String concatenation obfuscation (lots of + operators in strings)
+    concat_matches = counts['concat']
+    if concat_matches > 0:
+        findings.append({
+            'type': 'string_concatenation',
+            'severity': 'medium',
+            'count': concat_matches,
+            'message': f'Found {concat_matches} heavily concatenated strings'
+        })
+        score += min(concat_matches * 5, 15)
+
+    # 6. Single-letter variable names (indicator of minification/obfuscation)
+    single_vars = counts['single_var']
+    total_lines = content.count('\n') + 1
+    if total_lines > 50 and single_vars > total_lines * 0.3:
+        findings.append({
+            'type': 'minified_code',
+            'severity': 'medium',
+            'count': single_vars,
+            'message': f'Heavy use of single-letter variables ({single_vars} found)'
+        })
+        score += 15
+
+    # 7. Unicode escape sequences
+    unicode_matches = counts['unicode']
+    if unicode_matches > 10:
+        findings.append({
+            'type': 'unicode_obfuscation',
+            'severity': 'medium',
+            'count': unicode_matches,
+            'message': f'Found {unicode_matches} unicode escape sequences'
+        })
+        score += min(unicode_matches // 3, 15)
+
+    # 8. String.fromCharCode (character code obfuscation)
+    charcode_matches = counts['charcode']
+    if charcode_matches > 0:
+        findings.append({
+            'type': 'charcode_obfuscation',
+            'severity': 'high',
+            'count': charcode_matches,
+            'message': f'Found {charcode_matches} String.fromCharCode() calls'
+        })
+        score += charcode_matches * 15
+
+    # 9. Obfuscated property access (bracket notation abuse)
+    bracket_matches = counts['bracket']
+    if bracket_matches > 20:
+        findings.append({
+            'type': 'bracket_obfuscation',
+            'severity': 'medium',
+            'count': bracket_matches,
+            'message': f'Excessive bracket notation for property access ({bracket_matches})'
+        })
+        score += min(bracket_matches // 5, 10)
+
+    # 10. Long lines (often indicator of minified/packed code)
+    long_lines = sum(1 for line in content.split('\n') if len(line) > 300)
+    if long_lines > 0:
+        findings.append({
+            'type': 'long_lines',
+            'severity': 'low',
+            'count': long_lines,
+            'message': f'{long_lines} extremely long lines (>300 chars)'
+        })
+        score += min(long_lines * 3, 10)
+
+    # 11. Dangerous functions reached through computed property names
+    indirect = indirect_calls(tokens)
+    if indirect:
+        names = ', '.join(sorted(set(indirect)))
+        findings.append({
+            'type': 'indirect_call',
+            'severity': 'critical',
+            'count': len(indirect),
+            'message': f'Found {len(indirect)} dangerous calls hidden behind bracket notation ({names})'
+        })
+        score += len(indirect) * 25
+
+    return {
+        'score': min(score, 100),
+        'findings': findings
+    }
+
+
+def python_counts(content: str) -> tuple:
+    """
+    Per-rule counts for Python source and the AST analysis behind them.
+    Calls are counted on the parse tree, so strings and comments never match;
+    files that do not parse fall back to the regexes.
+    """
+    parsed = analyze_source(content)
+    if parsed['error']:
+        return count_patterns(PY_PATTERNS, content), parsed
+
+    calls = parsed['counts']
+    hex_pattern, _ = PY_PATTERNS['hex']
+    return {
+        'base64': calls.get('base64', 0),
+        'exec': calls.get('exec', 0) + calls.get('eval', 0),
+        'compile': calls.get('compile', 0),
+        'dynamic_import': calls.get('dynamic_import', 0),
+        # Escapes only exist in the raw text, not in the tree
+        'hex': len(hex_pattern.findall(content)) if '\\x' in content else 0,
+        'chr': calls.get('chr', 0),
+        'attr': calls.get('attr', 0),
+        'join': parsed['string_joins'],
+        'marshal': calls.get('serialized', 0),
+        'rot13': calls.get('codecs', 0) + parsed['rot13_literals'],
+    }, parsed
+
+
+def analyze_python(content: str) -> Dict:
+    """Analyze Python code for obfuscation patterns"""
+    findings = []
+    score = 0
+    counts, parsed = python_counts(content)
+
+    # 1. Base64 encoding
+    base64_matches = counts['base64']
+    if base64_matches > 0:
+        findings.append({
+            'type': 'base64_encoding',
+            'severity': 'high',
+            'count': base64_matches,
+            'message': f'Found {base64_matches} base64 encoding operations'
+        })
+        score += min(base64_matches * 10, 30)
+
+    # 2. exec() and eval() usage
+    exec_matches = counts['exec']
+    if exec_matches > 0:
+        findings.append({
+            'type': 'exec_eval_usage',
+            'severity': 'critical',
+            'count': exec_matches,
+            'message': f'Found {exec_matches} exec/eval calls (dynamic code execution)'
+        })
+        score += exec_matches * 25
+
+    # 3. compile() function (bytecode compilation)
+    compile_matches = counts['compile']
+    if compile_matches > 0:
+        findings.append({
+            'type': 'compile_usage',
+            'severity': 'high',
+            'count': compile_matches,
+            'message': f'Found {compile_matches} compile() calls'
+        })
+        score += compile_matches * 15
+
+    # 4. __import__ dynamic imports
+    import_matches = counts['dynamic_import']
+    if import_matches > 1:  # 1 might be legitimate
+        findings.append({
+            'type': 'dynamic_imports',
+            'severity': 'medium',
+            'count': import_matches,
+            'message': f'Found {import_matches} __import__() calls'
+        })
+        score += import_matches * 10
+
+    # 5. Hex/octal literals
+    hex_matches = counts['hex']
+    if hex_matches > 10:
+        findings.append({
+            'type': 'hex_encoding',
+            'severity': 'medium',
+            'count': hex_matches,
+            'message': f'Found {hex_matches} hex-encoded characters'
+        })
+        score += min(hex_matches // 2, 20)
+
+    # 6. chr() function (character code obfuscation)
+    chr_matches = counts['chr']
+    if chr_matches > 5:
+        findings.append({
+            'type': 'chr_obfuscation',
+            'severity': 'medium',
+            'count': chr_matches,
+            'message': f'Found {chr_matches} chr() calls'
+        })
+        score += min(chr_matches * 2, 15)
+
+    # 7. getattr/setattr abuse (hiding attribute access)
+    attr_matches = counts['attr']
+    if attr_matches > 10:
+        findings.append({
+            'type': 'attribute_obfuscation',
+            'severity': 'medium',
+            'count': attr_matches,
+            'message': f'Excessive use of getattr/setattr ({attr_matches})'
+        })
+        score += min(attr_matches // 2, 15)
+
+    # 8. String concatenation with join
+    join_matches = counts['join']
+    if join_matches > 10:
+        findings.append({
+            'type': 'string_obfuscation',
+            'severity': 'low',
+            'count': join_matches,
+            'message': f'Heavy use of string join operations ({join_matches})'
+        })
+        score += min(join_matches // 3, 10)
+
+    # 9. marshal/pickle usage (serialized code)
+    marshal_matches = counts['marshal']
+    if marshal_matches > 0:
+        findings.append({
+            'type': 'serialized_code',
+            'severity': 'high',
+            'count': marshal_matches,
+            'message': f'Found {marshal_matches} marshal/pickle operations'
+        })
+        score += marshal_matches * 20
+
+    # 10. ROT13/codecs obfuscation
+    rot13_matches = counts['rot13']
+    if rot13_matches > 0:
+        findings.append({
+            'type': 'encoding_obfuscation',
+            'severity': 'medium',
+            'count': rot13_matches,
+            'message': f'Found {rot13_matches} encoding/codec operations'
+        })
+        score += rot13_matches * 10
+
+    # 11. Dangerous calls reached through renamed references, getattr() or built strings
+    indirect = [c for c in parsed['calls'] if c['indirect'] and c['category'] in REPORTED_CATEGORIES]
+    if indirect:
+        names = ', '.join(sorted({c['name'] for c in indirect}))
+        findings.append({
+            'type': 'indirect_call',
+            'severity': 'critical',
+            'count': len(indirect),
+            'lines': sorted({c['line'] for c in indirect}),
+            'message': f'Found {len(indirect)} dangerous calls hidden behind aliases or getattr() ({names})'
+        })
+        score += len(indirect) * 25
+
+    for finding in findings:
+        categories = LINE_CATEGORIES.get(finding['type'])
+        if categories and parsed['calls']:
+            finding['lines'] = sorted({c['line'] for c in parsed['calls'] if c['category'] in categories})
+
+    return {
+        'score': min(score, 100),
+        'findings': findings,
+        'call_sites': call_sites(parsed)
+    }
+
+
+ANALYZERS = {
+    'javascript': analyze_javascript,
+    'python': analyze_python,
+}
+
+
+def content_key(language: str, data: bytes) -> str:
+    """Cache key for one file: rules version, analyzer and content hash"""
+    digest = hashlib.sha256(data).hexdigest()
+    return f'{RULES_VERSION}-{language}-{digest}'
+
+
+def analyze_bytes(language: str, data: bytes) -> Dict:
+    """Worker entry point: decode and run one analyzer"""
+    return ANALYZERS[language](data.decode('utf-8', errors='ignore'))
+
+
+def iter_source_files(root: Path) -> Iterator[tuple]:
+    """(path, language) for every analyzable file, in one pruned walk"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in filenames:
+            language = LANGUAGES.get(os.path.splitext(name)[1])
+            if language:
+                yield Path(dirpath, name), language
+
+
+def classify(avg_score: int) -> tuple:
+    """Threat level and verdict for an average obfuscation score"""
+    if avg_score >= 70:
+        return 'CRITICAL', 'Heavily obfuscated - likely malicious'
+    if avg_score >= 40:
+        return 'HIGH', 'Moderately obfuscated - suspicious'
+    if avg_score >= 20:
+        return 'MEDIUM', 'Some obfuscation detected'
+    return 'LOW', 'Minimal or no obfuscation'
 
 
 class ObfuscationDetector:
     """Detects various code obfuscation techniques"""
-    
-    def __init__(self, package_path: Path):
+
+    # Results shared by every detector in this process, keyed by content_key()
+    _memory_cache: Dict[str, Dict] = {}
+
+    def __init__(self, package_path: Path, workers: Optional[int] = None,
+                 cache_dir: Optional[Path] = None, timeout: Optional[float] = FILE_TIMEOUT):
+        """
+        Args:
+            package_path: Package directory to scan
+            workers: Worker processes (default: CPU count)
+            cache_dir: Optional directory persisting per-file results across runs
+            timeout: Seconds one file may take (None with workers=1 analyzes in-process)
+        """
         self.package_path = Path(package_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         self.obfuscation_score = 0
         self.findings = []
-        
+        self.cache_hits = 0
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
     def analyze_javascript(self, content: str) -> Dict:
         """Analyze JavaScript code for obfuscation patterns"""
-        findings = []
-        score = 0
-        
-        # 1. Base64 encoding detection
-        base64_pattern = r'(?:atob|btoa|Buffer\.from)\s*\('
-        base64_matches = len(re.findall(base64_pattern, content, re.IGNORECASE))
-        if base64_matches > 0:
-            findings.append({
-                'type': 'base64_encoding',
-                'severity': 'high',
-                'count': base64_matches,
-                'message': f'Found {base64_matches} base64 encoding operations'
-            })
-            score += min(base64_matches * 10, 30)
-        
-        # 2. Hex string patterns (long hex strings often indicate obfuscation)
-        hex_pattern = r'\\x[0-9a-fA-F]{2}'
-        hex_matches = len(re.findall(hex_pattern, content))
-        if hex_matches > 10:
-            findings.append({
-                'type': 'hex_encoding',
-                'severity': 'high',
-                'count': hex_matches,
-                'message': f'Found {hex_matches} hex-encoded characters'
-            })
-            score += min(hex_matches // 2, 25)
-        
-        # 3. eval() usage (code execution from strings)
-        eval_pattern = r'\beval\s*\('
-        eval_matches = len(re.findall(eval_pattern, content))
-        if eval_matches > 0:
-            findings.append({
-                'type': 'eval_usage',
-                'severity': 'critical',
-                'count': eval_matches,
-                'message': f'Found {eval_matches} eval() calls (dynamic code execution)'
-            })
-            score += eval_matches * 20
-        
-        # 4. Function constructor (indirect eval)
-        func_constructor = r'new\s+Function\s*\('
-        func_matches = len(re.findall(func_constructor, content))
-        if func_matches > 0:
-            findings.append({
-                'type': 'function_constructor',
-                'severity': 'critical',
-                'count': func_matches,
-                'message': f'Found {func_matches} Function() constructor calls'
-            })
-            score += func_matches * 20
-        
-        # 5. String concatenation obfuscation (lots of + operators in strings)
-        concat_pattern = r'["\'][^"\']{1,3}["\'](\s*\+\s*["\'][^"\']{1,3}["\']){5,}'
-        concat_matches = len(re.findall(concat_pattern, content))
-        if concat_matches > 0:
-            findings.append({
-                'type': 'string_concatenation',
-                'severity': 'medium',
-                'count': concat_matches,
-                'message': f'Found {concat_matches} heavily concatenated strings'
-            })
-            score += min(concat_matches * 5, 15)
-        
-        # 6. Single-letter variable names (indicator of minification/obfuscation)
-        single_var_pattern = r'\b[a-z]\s*='
-        single_vars = len(re.findall(single_var_pattern, content))
-        total_lines = content.count('\n') + 1
-        if total_lines > 50 and single_vars > total_lines * 0.3:
-            findings.append({
-                'type': 'minified_code',
-                'severity': 'medium',
-                'count': single_vars,
-                'message': f'Heavy use of single-letter variables ({single_vars} found)'
-            })
-            score += 15
-        
-        # 7. Unicode escape sequences
-        unicode_pattern = r'\\u[0-9a-fA-F]{4}'
-        unicode_matches = len(re.findall(unicode_pattern, content))
-        if unicode_matches > 10:
-            findings.append({
-                'type': 'unicode_obfuscation',
-                'severity': 'medium',
-                'count': unicode_matches,
-                'message': f'Found {unicode_matches} unicode escape sequences'
-            })
-            score += min(unicode_matches // 3, 15)
-        
-        # 8. String.fromCharCode (character code obfuscation)
-        charcode_pattern = r'String\.fromCharCode\s*\('
-        charcode_matches = len(re.findall(charcode_pattern, content))
-        if charcode_matches > 0:
-            findings.append({
-                'type': 'charcode_obfuscation',
-                'severity': 'high',
-                'count': charcode_matches,
-                'message': f'Found {charcode_matches} String.fromCharCode() calls'
-            })
-            score += charcode_matches * 15
-        
-        # 9. Obfuscated property access (bracket notation abuse)
-        bracket_pattern = r'\[["\'][a-zA-Z_][a-zA-Z0-9_]*["\']\]'
-        bracket_matches = len(re.findall(bracket_pattern, content))
-        if bracket_matches > 20:
-            findings.append({
-                'type': 'bracket_obfuscation',
-                'severity': 'medium',
-                'count': bracket_matches,
-                'message': f'Excessive bracket notation for property access ({bracket_matches})'
-            })
-            score += min(bracket_matches // 5, 10)
-        
-        # 10. Long lines (often indicator of minified/packed code)
-        long_lines = sum(1 for line in content.split('\n') if len(line) > 300)
-        if long_lines > 0:
-            findings.append({
-                'type': 'long_lines',
-                'severity': 'low',
-                'count': long_lines,
-                'message': f'{long_lines} extremely long lines (>300 chars)'
-            })
-            score += min(long_lines * 3, 10)
-        
-        return {
-            'score': min(score, 100),
-            'findings': findings
-        }
-    
+        return analyze_javascript(content)
+
     def analyze_python(self, content: str) -> Dict:
         """Analyze Python code for obfuscation patterns"""
-        findings = []
-        score = 0
-        
-        # 1. Base64 encoding
-        base64_pattern = r'base64\.(b64decode|b64encode|decodebytes)'
-        base64_matches = len(re.findall(base64_pattern, content))
-        if base64_matches > 0:
-            findings.append({
-                'type': 'base64_encoding',
-                'severity': 'high',
-                'count': base64_matches,
-                'message': f'Found {base64_matches} base64 encoding operations'
-            })
-            score += min(base64_matches * 10, 30)
-        
-        # 2. exec() and eval() usage
-        exec_pattern = r'\b(exec|eval)\s*\('
-        exec_matches = len(re.findall(exec_pattern, content))
-        if exec_matches > 0:
-            findings.append({
-                'type': 'exec_eval_usage',
-                'severity': 'critical',
-                'count': exec_matches,
-                'message': f'Found {exec_matches} exec/eval calls (dynamic code execution)'
-            })
-            score += exec_matches * 25
-        
-        # 3. compile() function (bytecode compilation)
-        compile_pattern = r'\bcompile\s*\('
-        compile_matches = len(re.findall(compile_pattern, content))
-        if compile_matches > 0:
-            findings.append({
-                'type': 'compile_usage',
-                'severity': 'high',
-                'count': compile_matches,
-                'message': f'Found {compile_matches} compile() calls'
-            })
-            score += compile_matches * 15
-        
-        # 4. __import__ dynamic imports
-        import_pattern = r'__import__\s*\('
-        import_matches = len(re.findall(import_pattern, content))
-        if import_matches > 1:  # 1 might be legitimate
-            findings.append({
-                'type': 'dynamic_imports',
-                'severity': 'medium',
-                'count': import_matches,
-                'message': f'Found {import_matches} __import__() calls'
-            })
-            score += import_matches * 10
-        
-        # 5. Hex/octal literals
-        hex_pattern = r'\\x[0-9a-fA-F]{2}'
-        hex_matches = len(re.findall(hex_pattern, content))
-        if hex_matches > 10:
-            findings.append({
-                'type': 'hex_encoding',
-                'severity': 'medium',
-                'count': hex_matches,
-                'message': f'Found {hex_matches} hex-encoded characters'
-            })
-            score += min(hex_matches // 2, 20)
-        
-        # 6. chr() function (character code obfuscation)
-        chr_pattern = r'\bchr\s*\('
-        chr_matches = len(re.findall(chr_pattern, content))
-        if chr_matches > 5:
-            findings.append({
-                'type': 'chr_obfuscation',
-                'severity': 'medium',
-                'count': chr_matches,
-                'message': f'Found {chr_matches} chr() calls'
-            })
-            score += min(chr_matches * 2, 15)
-        
-        # 7. getattr/setattr abuse (hiding attribute access)
-        attr_pattern = r'\b(getattr|setattr|hasattr)\s*\('
-        attr_matches = len(re.findall(attr_pattern, content))
-        if attr_matches > 10:
-            findings.append({
-                'type': 'attribute_obfuscation',
-                'severity': 'medium',
-                'count': attr_matches,
-                'message': f'Excessive use of getattr/setattr ({attr_matches})'
-            })
-            score += min(attr_matches // 2, 15)
-        
-        # 8. String concatenation with join
-        join_pattern = r'["\']\.join\('
-        join_matches = len(re.findall(join_pattern, content))
-        if join_matches > 10:
-            findings.append({
-                'type': 'string_obfuscation',
-                'severity': 'low',
-                'count': join_matches,
-                'message': f'Heavy use of string join operations ({join_matches})'
-            })
-            score += min(join_matches // 3, 10)
-        
-        # 9. marshal/pickle usage (serialized code)
-        marshal_pattern = r'\b(marshal|pickle)\.(loads|dumps)'
-        marshal_matches = len(re.findall(marshal_pattern, content))
-        if marshal_matches > 0:
-            findings.append({
-                'type': 'serialized_code',
-                'severity': 'high',
-                'count': marshal_matches,
-                'message': f'Found {marshal_matches} marshal/pickle operations'
-            })
-            score += marshal_matches * 20
-        
-        # 10. ROT13/codecs obfuscation
-        rot13_pattern = r'codecs\.(encode|decode)|rot_13'
-        rot13_matches = len(re.findall(rot13_pattern, content, re.IGNORECASE))
-        if rot13_matches > 0:
-            findings.append({
-                'type': 'encoding_obfuscation',
+        return analyze_python(content)
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        result = self._memory_cache.get(key)
+        if result is None and self.cache_dir:
+            try:
+                result = json.loads((self.cache_dir / f'{key}.json').read_text())
+                self._memory_cache[key] = result
+            except (OSError, ValueError):
+                return None
+        return result
+
+    def _store(self, key: str, result: Dict):
+        self._memory_cache[key] = result
+        if self.cache_dir:
+            try:
+                (self.cache_dir / f'{key}.json').write_text(json.dumps(result, separators=(',', ':')))
+            except OSError:
+                pass
+
+    def _file_result(self, path: Path, language: str, result: Dict, cached: bool) -> Dict:
+        return {
+            'file': str(path.relative_to(self.package_path)),
+            'language': language,
+            'score': result['score'],
+            'findings': result['findings'],
+            'call_sites': result.get('call_sites', []),
+            'cached': cached,
+        }
+
+    def scan_iter(self) -> Iterator[Dict]:
+        """
+        Yield one result per source file as soon as it is analyzed.
+
+        Files are read once and looked up by content hash. Misses run in a
+        pool of worker processes; a file that takes longer than the timeout
+        has its worker killed and is reported instead of stalling the scan.
+        A file the analyzer fails on is reported too, never dropped.
+        """
+        files = list(iter_source_files(self.package_path))
+        self.cache_hits = 0
+        hits = deque()
+
+        def misses():
+            for path, language in files:
+                try:
+                    data = path.read_bytes()
+                except OSError:
+                    continue
+
+                key = content_key(language, data)
+                result = self._cached(key)
+                if result is not None:
+                    self.cache_hits += 1
+                    hits.append(self._file_result(path, language, result, cached=True))
+                    continue
+                yield (path, language, key), (language, data)
+
+        if not files:
+            return
+
+        if (not self.timeout and self.workers == 1) or self._is_small(files):
+            for (path, language, key), args in misses():
+                while hits:
+                    yield hits.popleft()
+                try:
+                    result = analyze_bytes(*args)
+                except Exception as e:
+                    yield self._file_result(path, language, self._error_result(f'{type(e).__name__}: {e}'), cached=False)
+                    continue
+                self._store(key, result)
+                yield self._file_result(path, language, result, cached=False)
+            yield from hits
+            return
+
+        with TimeoutPool(analyze_bytes, workers=min(self.workers, len(files)), timeout=self.timeout) as pool:
+            for (path, language, key), outcome, result in pool.imap_unordered(misses()):
+                while hits:
+                    yield hits.popleft()
+                if outcome == TIMEOUT:
+                    yield self._file_result(path, language, self._timeout_result(), cached=False)
+                elif outcome == ERROR:
+                    yield self._file_result(path, language, self._error_result(result), cached=False)
+                else:
+                    self._store(key, result)
+                    yield self._file_result(path, language, result, cached=False)
+        yield from hits
+
+    @staticmethod
+    def _is_small(files) -> bool:
+        if len(files) > IN_PROCESS_FILES:
+            return False
+        try:
+            return sum(path.stat().st_size for path, _ in files) <= IN_PROCESS_BYTES
+        except OSError:
+            return False
+
+    def _error_result(self, error: str) -> Dict:
+        # A file crafted to crash the analyzer must not vanish from the report
+        return {
+            'score': 15,
+            'findings': [{
+                'type': 'analysis_error',
                 'severity': 'medium',
-                'count': rot13_matches,
-                'message': f'Found {rot13_matches} encoding/codec operations'
-            })
-            score += rot13_matches * 10
-        
+                'count': 1,
+                'message': f'Analysis failed ({error})'
+            }]
+        }
+
+    def _timeout_result(self) -> Dict:
         return {
-            'score': min(score, 100),
-            'findings': findings
+            'score': 15,
+            'findings': [{
+                'type': 'analysis_timeout',
+                'severity': 'medium',
+                'count': 1,
+                'message': f'Analysis exceeded {self.timeout}s (pathological or oversized file)'
+            }]
         }
-    
+
     def scan_package(self) -> Dict:
         """Scan all files in package for obfuscation"""
-        all_findings = []
-        total_score = 0
-        files_scanned = 0
-        
-        # Scan JavaScript files
-        for js_file in self.package_path.rglob('*.js'):
-            if 'node_modules' in str(js_file):
-                continue
-            try:
-                content = js_file.read_text(errors='ignore')
-                result = self.analyze_javascript(content)
-                if result['findings']:
-                    all_findings.extend([
-                        {**f, 'file': str(js_file.relative_to(self.package_path))}
-                        for f in result['findings']
-                    ])
-                    total_score += result['score']
-                    files_scanned += 1
-            except Exception as e:
-                pass
-        
-        # Scan Python files
-        for py_file in self.package_path.rglob('*.py'):
-            if '__pycache__' in str(py_file):
-                continue
-            try:
-                content = py_file.read_text(errors='ignore')
-                result = self.analyze_python(content)
-                if result['findings']:
-                    all_findings.extend([
-                        {**f, 'file': str(py_file.relative_to(self.package_path))}
-                        for f in result['findings']
-                    ])
-                    total_score += result['score']
-                    files_scanned += 1
-            except Exception as e:
-                pass
-        
+        results = sorted(self.scan_iter(), key=lambda r: r['file'])
+        file_results = [r for r in results if r['findings']]
+        sites = [{**c, 'file': r['file']} for r in results for c in r['call_sites']]
+
+        all_findings = [
+            {**f, 'file': r['file']}
+            for r in file_results
+            for f in r['findings']
+        ]
+        total_score = sum(r['score'] for r in file_results)
+        files_scanned = len(file_results)
+
         # Normalize score (average across files, capped at 100)
-        if files_scanned > 0:
-            avg_score = total_score // files_scanned
-        else:
-            avg_score = 0
-        
-        # Classify obfuscation level
-        if avg_score >= 70:
-            level = 'CRITICAL'
-            verdict = 'Heavily obfuscated - likely malicious'
-        elif avg_score >= 40:
-            level = 'HIGH'
-            verdict = 'Moderately obfuscated - suspicious'
-        elif avg_score >= 20:
-            level = 'MEDIUM'
-            verdict = 'Some obfuscation detected'
-        else:
-            level = 'LOW'
-            verdict = 'Minimal or no obfuscation'
-        
+        avg_score = total_score // files_scanned if files_scanned > 0 else 0
+        level, verdict = classify(avg_score)
+
+        self.obfuscation_score = min(avg_score, 100)
+        self.findings = all_findings
+
         return {
-            'obfuscation_score': min(avg_score, 100),
+            'obfuscation_score': self.obfuscation_score,
             'threat_level': level,
             'verdict': verdict,
             'files_scanned': files_scanned,
             'findings': all_findings,
-            'finding_count': len(all_findings)
+            'finding_count': len(all_findings),
+            'call_sites': sites,
+            'cache_hits': self.cache_hits
         }
 
 
 def main():
     """CLI entry point"""
-    import sys
-    
-    if len(sys.argv) < 2:
-        print("Usage: obfuscation_detector.py <package_path>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    stream = '--stream' in sys.argv
+
+    if not args:
+        print("Usage: obfuscation_detector.py <package_path> [--stream]")
+        print("  --stream  print one JSON line per analyzed file as it completes")
         sys.exit(1)
-    
-    package_path = Path(sys.argv[1])
-    detector = ObfuscationDetector(package_path)
-    result = detector.scan_package()
-    
-    print(json.dumps(result, indent=2))
+
+    detector = ObfuscationDetector(Path(args[0]), cache_dir=os.environ.get('SANDBOX_OBFUSCATION_CACHE'))
+
+    if not stream:
+        print(json.dumps(detector.scan_package(), indent=2))
+        return
+
+    total_score = files_scanned = finding_count = 0
+    for file_result in detector.scan_iter():
+        print(json.dumps(file_result, separators=(',', ':')), flush=True)
+        if file_result['findings']:
+            total_score += file_result['score']
+            files_scanned += 1
+            finding_count += len(file_result['findings'])
+
+    avg_score = total_score // files_scanned if files_scanned > 0 else 0
+    level, verdict = classify(avg_score)
+    print(json.dumps({
+        'obfuscation_score': min(avg_score, 100),
+        'threat_level': level,
+        'verdict': verdict,
+        'files_scanned': files_scanned,
+        'finding_count': finding_count,
+        'cache_hits': detector.cache_hits
+    }, separators=(',', ':')))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Python AST Analyzer
+Finds real call sites of dangerous functions in Python source, resolving
+import aliases, renamed references and getattr()/string-folding tricks
+"""
+
+import ast
+import sys
+import json
+import hashlib
+import builtins
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+
+# Qualified name -> call category
+CALL_CATEGORIES = {
+    'builtins.exec': 'exec',
+    'builtins.eval': 'eval',
+    'builtins.compile': 'compile',
+    'builtins.__import__': 'dynamic_import',
+    'importlib.import_module': 'dynamic_import',
+    'builtins.chr': 'chr',
+    'builtins.getattr': 'attr',
+    'builtins.setattr': 'attr',
+    'builtins.hasattr': 'attr',
+    'base64.b64decode': 'base64',
+    'base64.b64encode': 'base64',
+    'base64.decodebytes': 'base64',
+    'marshal.loads': 'serialized',
+    'marshal.dumps': 'serialized',
+    'pickle.loads': 'serialized',
+    'pickle.dumps': 'serialized',
+    'codecs.encode': 'codecs',
+    'codecs.decode': 'codecs',
+    'os.system': 'subprocess',
+    'os.popen': 'subprocess',
+    'pty.spawn': 'subprocess',
+    'socket.socket': 'socket',
+    'socket.create_connection': 'socket',
+    'socket.socketpair': 'socket',
+}
+
+# Qualified-name prefixes -> call category
+CALL_PREFIXES = [
+    ('subprocess.', 'subprocess'),
+    ('os.exec', 'subprocess'),
+    ('os.spawn', 'subprocess'),
+    ('os.posix_spawn', 'subprocess'),
+]
+
+# Categories whose call sites are reported to the caller
+REPORTED_CATEGORIES = {'exec', 'eval', 'compile', 'dynamic_import', 'subprocess', 'socket'}
+
+BUILTIN_NAMES = set(dir(builtins))
+BUILTIN_MODULE_NAMES = {'__builtins__', 'builtins'}
+
+# Bound on string-folding recursion ('a' + 'b' + ... chains)
+MAX_FOLD_DEPTH = 64
+MAX_CACHE_ENTRIES = 4096
+
+_cache: Dict[str, Dict] = {}
+
+
+def classify_call(qualname: str) -> Optional[str]:
+    """Category of a fully-qualified callee, or None if not interesting"""
+    category = CALL_CATEGORIES.get(qualname)
+    if category:
+        return category
+    for prefix, category in CALL_PREFIXES:
+        if qualname.startswith(prefix):
+            return category
+    return None
+
+
+class _CallResolver(ast.NodeVisitor):
+    """Single pass over a module tracking aliases, string constants and calls"""
+
+    def __init__(self):
+        self.aliases: Dict[str, Tuple[str, bool]] = {}   # name -> (qualified name, indirect)
+        self.constants: Dict[str, str] = {}              # name -> folded string value
+        self.shadowed = set()                            # names rebound to unknown values
+        self.calls: List[Dict] = []
+        self.string_joins = 0
+        self.rot13_literals = 0
+
+    # ---------------- string folding ----------------
+
+    def fold(self, node, depth=0) -> Optional[str]:
+        """Compile-time value of a string expression, if it has one"""
+        if depth > MAX_FOLD_DEPTH:
+            return None
+        if isinstance(node, ast.Constant):
+            return node.value if isinstance(node.value, str) else None
+        if isinstance(node, ast.Name):
+            return self.constants.get(node.id)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left = self.fold(node.left, depth + 1)
+            right = self.fold(node.right, depth + 1) if left is not None else None
+            return left + right if right is not None else None
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                if isinstance(value, ast.FormattedValue):
+                    value = value.value
+                part = self.fold(value, depth + 1)
+                if part is None:
+                    return None
+                parts.append(part)
+            return ''.join(parts)
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice):
+            # 'cexe'[::-1]
+            s = node.slice
+            if s.lower is None and s.upper is None and isinstance(s.step, ast.UnaryOp) \
+                    and isinstance(s.step.op, ast.USub) and isinstance(s.step.operand, ast.Constant) \
+                    and s.step.operand.value == 1:
+                value = self.fold(node.value, depth + 1)
+                return value[::-1] if value is not None else None
+        if isinstance(node, ast.Call) and not node.keywords:
+            func = node.func
+            # 'sep'.join(['e', 'x', ...])
+            if isinstance(func, ast.Attribute) and func.attr == 'join' and len(node.args) == 1 \
+                    and isinstance(node.args[0], (ast.List, ast.Tuple)):
+                sep = self.fold(func.value, depth + 1)
+                parts = [self.fold(e, depth + 1) for e in node.args[0].elts]
+                if sep is not None and None not in parts:
+                    return sep.join(parts)
+            # chr(101)
+            if isinstance(func, ast.Name) and func.id == 'chr' and len(node.args) == 1 \
+                    and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, int):
+                try:
+                    return chr(node.args[0].value)
+                except (ValueError, OverflowError):
+                    return None
+        return None
+
+    # ---------------- name resolution ----------------
+
+    def qualify(self, node, depth=0) -> Tuple[Optional[str], bool]:
+        """(qualified name, reached indirectly) for an expression naming a callable or module"""
+        if depth > MAX_FOLD_DEPTH:
+            return None, False
+
+        if isinstance(node, ast.Name):
+            if node.id in self.aliases:
+                return self.aliases[node.id]
+            if node.id in BUILTIN_MODULE_NAMES:
+                return 'builtins', False
+            if node.id in BUILTIN_NAMES and node.id not in self.shadowed:
+                return f'builtins.{node.id}', False
+            return None, False
+
+        if isinstance(node, ast.Attribute):
+            base, indirect = self.qualify(node.value, depth + 1)
+            return (f'{base}.{node.attr}', indirect) if base else (None, False)
+
+        if isinstance(node, ast.Subscript):
+            # globals()['exec'], __builtins__['exec'], builtins.__dict__['exec']
+            key = self.fold(node.slice, depth + 1)
+            if key is None:
+                return None, False
+            value = node.value
+            if isinstance(value, ast.Call) and isinstance(value.func, ast.Name) \
+                    and value.func.id in ('globals', 'locals', 'vars') and not value.args:
+                target, _ = self.aliases.get(key, (f'builtins.{key}', False))
+                return target, True
+            base, _ = self.qualify(value, depth + 1)
+            if base in ('builtins', 'builtins.__dict__'):
+                return f'builtins.{key}', True
+            return None, False
+
+        if isinstance(node, ast.Call):
+            callee, _ = self.qualify(node.func, depth + 1)
+            # getattr(obj, 'name')
+            if callee == 'builtins.getattr' and len(node.args) >= 2:
+                base, _ = self.qualify(node.args[0], depth + 1)
+                attr = self.fold(node.args[1], depth + 1)
+                if base and attr:
+                    if base == 'builtins.__dict__':
+                        base = 'builtins'
+                    return f'{base}.{attr}', True
+            # __import__('os'), importlib.import_module('os')
+            if callee in ('builtins.__import__', 'importlib.import_module') and node.args:
+                module = self.fold(node.args[0], depth + 1)
+                if module:
+                    return module, True
+            # vars(builtins)
+            if callee == 'builtins.vars' and len(node.args) == 1:
+                base, _ = self.qualify(node.args[0], depth + 1)
+                if base == 'builtins':
+                    return 'builtins.__dict__', True
+        return None, False
+
+    def bind(self, name: str, value):
+        """Record what a simple `name = value` assignment refers to"""
+        qualname, indirect = self.qualify(value) if value is not None else (None, False)
+        folded = self.fold(value) if value is not None else None
+
+        self.constants.pop(name, None)
+        if folded is not None:
+            self.constants[name] = folded
+        if qualname:
+            # e = exec: calling e() hides the real name
+            renamed = qualname.rsplit('.', 1)[-1] != name
+            self.aliases[name] = (qualname, indirect or renamed)
+        else:
+            self.aliases.pop(name, None)
+            self.shadowed.add(name)
+
+    # ---------------- visitors ----------------
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.aliases[alias.asname] = (alias.name, False)
+            else:
+                root = alias.name.split('.')[0]
+                self.aliases[root] = (root, False)
+
+    def visit_ImportFrom(self, node):
+        if node.level or not node.module:
+            return
+        for alias in node.names:
+            if alias.name == '*':
+                continue
+            self.aliases[alias.asname or alias.name] = (f'{node.module}.{alias.name}', False)
+
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                self.bind(target.id, node.value if len(node.targets) == 1 else None)
+
+    def visit_AnnAssign(self, node):
+        self.generic_visit(node)
+        if isinstance(node.target, ast.Name):
+            self.bind(node.target.id, node.value)
+
+    def visit_NamedExpr(self, node):
+        self.generic_visit(node)
+        self.bind(node.target.id, node.value)
+
+    def visit_FunctionDef(self, node):
+        self.aliases.pop(node.name, None)
+        self.shadowed.add(node.name)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+    visit_ClassDef = visit_FunctionDef
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str) and ('rot_13' in node.value or 'rot13' in node.value):
+            self.rot13_literals += 1
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr == 'join' \
+                and isinstance(func.value, ast.Constant) and isinstance(func.value.value, str):
+            self.string_joins += 1
+
+        qualname, indirect = self.qualify(func)
+        if qualname:
+            category = classify_call(qualname)
+            if category:
+                self.calls.append({
+                    'category': category,
+                    'name': qualname,
+                    'line': node.lineno,
+                    'indirect': indirect,
+                })
+        self.generic_visit(node)
+
+
+def _analyze(source: str) -> Dict:
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+        return {'error': f'{type(e).__name__}: {e}', 'calls': [], 'counts': {}}
+
+    resolver = _CallResolver()
+    try:
+        resolver.visit(tree)
+    except RecursionError:
+        return {'error': 'RecursionError: nesting too deep', 'calls': [], 'counts': {}}
+
+    return {
+        'error': None,
+        'calls': resolver.calls,
+        'counts': dict(Counter(c['category'] for c in resolver.calls)),
+        'string_joins': resolver.string_joins,
+        'rot13_literals': resolver.rot13_literals,
+    }
+
+
+def analyze_source(source: str) -> Dict:
+    """
+    Parse Python source and return its dangerous call sites.
+
+    Results are cached by content hash; `error` is set when the source does
+    not parse (Python 2 code, truncated files) so callers can fall back.
+    """
+    key = hashlib.sha256(source.encode('utf-8', errors='ignore')).hexdigest()
+    result = _cache.get(key)
+    if result is None:
+        result = _analyze(source)
+        if len(_cache) >= MAX_CACHE_ENTRIES:
+            _cache.clear()
+        _cache[key] = result
+    return result
+
+
+def call_sites(result: Dict) -> List[Dict]:
+    """The call sites worth reporting (code execution, processes, sockets)"""
+    return [c for c in result.get('calls', []) if c['category'] in REPORTED_CATEGORIES]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python_ast_analyzer.py <file.py>")
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding='utf-8', errors='ignore') as f:
+        result = analyze_source(f.read())
+    if result['error']:
+        print(f"[ASTAnalyzer] {result['error']}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(call_sites(result), indent=2))
+
+
+if __name__ == '__main__':
+    main()
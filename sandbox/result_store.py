@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Result Store
+One append-only record file per sandbox execution.
+
+Layout:
+    header   b'SCGR' + format version
+    records  kind (u8) | flags (u8) | length (u32) | payload
+    index    record listing the offset of the latest record of each kind
+    footer   fixed-size record holding the index offset
+
+Payloads are compact JSON, zlib-compressed above a few KB (captured
+stdout/stderr). Readers seek to the footer, load the small index and then
+only the records they need, so listing a run never touches its output.
+Appending after close writes a fresh index and footer; the old ones are
+skipped like any other superseded record.
+"""
+
+import json
+import os
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+
+MAGIC = b'SCGR'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sB')
+RECORD_HEADER = struct.Struct('<BBI')
+FOOTER_PAYLOAD = struct.Struct('<Q')
+FOOTER_SIZE = RECORD_HEADER.size + FOOTER_PAYLOAD.size
+
+FLAG_ZLIB = 1
+COMPRESS_ABOVE = 4096
+
+# Record kinds
+SUMMARY = 1
+RESULT = 2
+NETWORK = 3
+FILES = 4
+OBFUSCATION = 5
+ANALYSIS = 6
+INDEX = 14
+FOOTER = 15
+
+KIND_NAMES = {
+    SUMMARY: 'summary',
+    RESULT: 'result',
+    NETWORK: 'network',
+    FILES: 'files',
+    OBFUSCATION: 'obfuscation',
+    ANALYSIS: 'analysis',
+}
+KINDS_BY_NAME = {name: kind for kind, name in KIND_NAMES.items()}
+
+EXTENSION = '.scgr'
+
+
+def result_path(results_dir, execution_id):
+    return Path(results_dir) / f'{execution_id}{EXTENSION}'
+
+
+def encode_payload(data):
+    raw = json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+    if len(raw) > COMPRESS_ABOVE:
+        return FLAG_ZLIB, zlib.compress(raw, 6)
+    return 0, raw
+
+
+def decode_payload(flags, raw):
+    if flags & FLAG_ZLIB:
+        raw = zlib.decompress(raw)
+    return json.loads(raw)
+
+
+def build_summary(report, result=None):
+    """The few fields listings and dashboards need"""
+    result = result or {}
+    return {
+        'execution_id': report.get('execution_id'),
+        'package_name': report.get('package_name') or result.get('package_name'),
+        'package_type': result.get('package_type'),
+        'timestamp': report.get('timestamp'),
+        'duration': result.get('duration'),
+        'risk_score': report.get('risk_score', 0),
+        'threat_level': report.get('threat_level'),
+        'verdict': report.get('verdict'),
+        'summary': report.get('summary', {}),
+    }
+
+
+class ResultWriter:
+    """Appends records to an execution's result file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index = {}
+        is_new = not self.path.exists() or self.path.stat().st_size == 0
+
+        if not is_new:
+            # Carry forward the existing index so a re-opened file stays complete
+            try:
+                self.index = ResultReader(self.path).index()
+            except ValueError:
+                self.index = {}
+
+        self._file = open(self.path, 'ab')
+        if is_new:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+
+    def _write_record(self, kind, flags, payload):
+        offset = self._file.tell()
+        self._file.write(RECORD_HEADER.pack(kind, flags, len(payload)))
+        self._file.write(payload)
+        return offset
+
+    def append(self, kind, data):
+        """Append one record; kind is a record constant or its name"""
+        if isinstance(kind, str):
+            kind = KINDS_BY_NAME[kind]
+        flags, payload = encode_payload(data)
+        offset = self._write_record(kind, flags, payload)
+        self.index[KIND_NAMES[kind]] = offset
+        return offset
+
+    def close(self):
+        """Write the index and footer, making the file readable without a scan"""
+        if self._file.closed:
+            return
+        flags, payload = encode_payload(self.index)
+        index_offset = self._write_record(INDEX, flags, payload)
+        self._write_record(FOOTER, 0, FOOTER_PAYLOAD.pack(index_offset))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ResultReader:
+    """Random access to the records of one result file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._index = None
+
+    def _read_at(self, f, offset):
+        f.seek(offset)
+        header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            raise ValueError(f'Truncated record at {offset} in {self.path}')
+        kind, flags, length = RECORD_HEADER.unpack(header)
+        return kind, flags, f.read(length)
+
+    def _check_header(self, f):
+        f.seek(0)
+        header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise ValueError(f'Not a result file: {self.path}')
+        magic, version = FILE_HEADER.unpack(header)
+        if magic != MAGIC or version > VERSION:
+            raise ValueError(f'Not a result file (or newer format): {self.path}')
+
+    def _scan(self, f):
+        """Rebuild the index by skipping through record headers (no trailing index)"""
+        index = {}
+        offset = FILE_HEADER.size
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        while offset + RECORD_HEADER.size <= end:
+            f.seek(offset)
+            kind, _, length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            if offset + RECORD_HEADER.size + length > end:
+                break  # torn write at the tail
+            if kind in KIND_NAMES:
+                index[KIND_NAMES[kind]] = offset
+            offset += RECORD_HEADER.size + length
+        return index
+
+    def index(self):
+        """{kind name: offset} of the latest record of each kind"""
+        if self._index is not None:
+            return self._index
+
+        with open(self.path, 'rb') as f:
+            self._check_header(f)
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            index = None
+            if size >= FILE_HEADER.size + FOOTER_SIZE:
+                kind, flags, payload = self._read_at(f, size - FOOTER_SIZE)
+                if kind == FOOTER and len(payload) == FOOTER_PAYLOAD.size:
+                    (index_offset,) = FOOTER_PAYLOAD.unpack(payload)
+                    kind, flags, payload = self._read_at(f, index_offset)
+                    if kind == INDEX:
+                        index = decode_payload(flags, payload)
+            if index is None:
+                index = self._scan(f)
+
+        self._index = index
+        return index
+
+    def read(self, kind):
+        """Decoded payload of the latest record of a kind, or None"""
+        if isinstance(kind, int):
+            kind = KIND_NAMES[kind]
+        offset = self.index().get(kind)
+        if offset is None:
+            return None
+        with open(self.path, 'rb') as f:
+            _, flags, payload = self._read_at(f, offset)
+        return decode_payload(flags, payload)
+
+    def summary(self):
+        return self.read('summary')
+
+
+def read_record(path, kind):
+    """Latest record of a kind from a result file, or None if unreadable"""
+    try:
+        return ResultReader(path).read(kind)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    """Print a record (default: summary) or one of its fields"""
+    if len(sys.argv) < 2:
+        print("Usage: result_store.py <file.scgr> [kind] [field]")
+        print(f"  kind: {', '.join(KINDS_BY_NAME)}")
+        sys.exit(1)
+
+    kind = sys.argv[2] if len(sys.argv) > 2 else 'summary'
+    data = read_record(sys.argv[1], kind)
+    if data is None:
+        sys.exit(1)
+
+    if len(sys.argv) > 3:
+        print(data.get(sys.argv[3], ''))
+    else:
+        print(json.dumps(data, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Results Catalog
+Embedded SQLite index of sandbox runs, written when each analysis finishes
+"""
+
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from result_store import read_record, EXTENSION
+
+
+CATALOG_NAME = 'catalog.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    execution_id  TEXT PRIMARY KEY,
+    package_name  TEXT,
+    package_type  TEXT,
+    created_at    REAL NOT NULL,
+    risk_score    INTEGER NOT NULL DEFAULT 0,
+    threat_level  TEXT,
+    verdict       TEXT,
+    duration      REAL,
+    result_file   TEXT,
+    summary       TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (created_at, execution_id);
+CREATE INDEX IF NOT EXISTS runs_by_package ON runs (package_name, created_at, execution_id);
+CREATE INDEX IF NOT EXISTS runs_by_verdict ON runs (verdict, created_at, execution_id);
+CREATE INDEX IF NOT EXISTS runs_by_risk ON runs (risk_score, created_at);
+'''
+
+COLUMNS = [
+    'execution_id', 'package_name', 'package_type', 'created_at', 'risk_score',
+    'threat_level', 'verdict', 'duration', 'result_file', 'summary',
+]
+
+
+def parse_timestamp(value):
+    """Epoch seconds from an ISO timestamp, epoch number or datetime"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ResultsCatalog:
+    """Query API over every sandbox run recorded in a results directory"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.is_new = not self.db_path.exists()
+
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def _row(self, row) -> Dict:
+        data = dict(row)
+        data['summary'] = json.loads(data['summary']) if data.get('summary') else {}
+        return data
+
+    def record(self, summary: Dict, result_file, created_at=None):
+        """Insert or replace the catalog entry for one finished run"""
+        created_at = parse_timestamp(created_at or summary.get('timestamp')) or time.time()
+        with self.conn:
+            self.conn.execute(
+                f'INSERT OR REPLACE INTO runs ({", ".join(COLUMNS)}) '
+                f'VALUES ({", ".join("?" * len(COLUMNS))})',
+                (
+                    summary['execution_id'],
+                    summary.get('package_name'),
+                    summary.get('package_type'),
+                    created_at,
+                    int(summary.get('risk_score') or 0),
+                    summary.get('threat_level'),
+                    summary.get('verdict'),
+                    summary.get('duration'),
+                    Path(result_file).name,
+                    json.dumps(summary, separators=(',', ':')),
+                )
+            )
+
+    def get(self, execution_id: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            'SELECT * FROM runs WHERE execution_id = ?', (execution_id,)
+        ).fetchone()
+        return self._row(row) if row else None
+
+    def _filters(self, package=None, verdict=None, since=None, until=None,
+                 min_risk=None, max_risk=None):
+        where = []
+        params = []
+        if package is not None:
+            where.append('package_name = ?')
+            params.append(package)
+        if verdict is not None:
+            where.append('verdict = ?')
+            params.append(verdict)
+        if since is not None:
+            where.append('created_at >= ?')
+            params.append(parse_timestamp(since))
+        if until is not None:
+            where.append('created_at < ?')
+            params.append(parse_timestamp(until))
+        if min_risk is not None:
+            where.append('risk_score >= ?')
+            params.append(min_risk)
+        if max_risk is not None:
+            where.append('risk_score <= ?')
+            params.append(max_risk)
+        return where, params
+
+    def query(self, limit: int = 20, before: Optional[Dict] = None, **filters) -> List[Dict]:
+        """
+        Newest-first runs matching every given filter: package, verdict,
+        since/until (ISO string, epoch or datetime), min_risk/max_risk.
+
+        Pagination is keyset-based: pass the last row of a page as `before`
+        to get the next one, so deep pages cost the same as the first.
+        """
+        where, params = self._filters(**filters)
+        if before is not None:
+            where.append('(created_at, execution_id) < (?, ?)')
+            params.extend([before['created_at'], before['execution_id']])
+
+        sql = 'SELECT * FROM runs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY created_at DESC, execution_id DESC LIMIT ?'
+        params.append(limit)
+
+        return [self._row(row) for row in self.conn.execute(sql, params)]
+
+    def count(self, **filters) -> int:
+        """Number of runs matching the same filters as query()"""
+        where, params = self._filters(**filters)
+        sql = 'SELECT COUNT(*) FROM runs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def apply_retention(self, max_age_days: Optional[float] = None,
+                        keep_per_package: Optional[int] = None) -> List[Dict]:
+        """
+        Drop runs older than max_age_days and/or beyond the newest
+        keep_per_package runs of each package. Returns the removed rows so
+        the caller can delete their files.
+        """
+        clauses = []
+        params = []
+        if max_age_days is not None:
+            clauses.append('created_at < ?')
+            params.append(time.time() - max_age_days * 86400)
+        if keep_per_package is not None:
+            clauses.append('''execution_id IN (
+                SELECT execution_id FROM (
+                    SELECT execution_id, ROW_NUMBER() OVER (
+                        PARTITION BY package_name ORDER BY created_at DESC
+                    ) AS rank FROM runs
+                ) WHERE rank > ?
+            )''')
+            params.append(keep_per_package)
+        if not clauses:
+            return []
+
+        where = ' OR '.join(clauses)
+        with self.conn:
+            removed = [self._row(row) for row in self.conn.execute(
+                f'SELECT * FROM runs WHERE {where}', params
+            )]
+            self.conn.execute(f'DELETE FROM runs WHERE {where}', params)
+        return removed
+
+    def rebuild(self, results_dir) -> int:
+        """Backfill the catalog from the summaries of existing result files"""
+        added = 0
+        for result_file in Path(results_dir).glob(f'*{EXTENSION}'):
+            summary = read_record(result_file, 'summary')
+            if summary and summary.get('execution_id'):
+                self.record(summary, result_file, created_at=summary.get('timestamp') or result_file.stat().st_mtime)
+                added += 1
+        return added
+
+
+def main():
+    """List recent runs from a catalog"""
+    if len(sys.argv) < 2:
+        print("Usage: results_catalog.py <catalog.db> [package] [limit]")
+        sys.exit(1)
+
+    catalog = ResultsCatalog(sys.argv[1])
+    package = sys.argv[2] if len(sys.argv) > 2 else None
+    limit = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    for row in catalog.query(package=package, limit=limit):
+        when = datetime.fromtimestamp(row['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"{when}  {row['risk_score']:>3}/100  {row['verdict'] or '?':<10}  {row['execution_id']}")
+
+
+if __name__ == '__main__':
+    main()
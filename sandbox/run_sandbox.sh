@@ -82,36 +82,41 @@ docker run \
 
 RUNNER_EXIT=$?
 
-echo -e "\n${YELLOW}Analyzing behavior...${NC}\n"
-
 # Find the latest execution ID
-LATEST_RESULT=$(ls -t "$RESULTS_DIR" | grep "_result.json" | head -1)
+LATEST_RESULT=$(ls -t "$RESULTS_DIR" | grep -E "\.scgr$" | head -1)
 if [ -z "$LATEST_RESULT" ]; then
     echo -e "${RED}Error: No results found${NC}"
     exit 1
 fi
 
-EXECUTION_ID=$(basename "$LATEST_RESULT" | sed 's/_result.json//')
+EXECUTION_ID=$(basename "$LATEST_RESULT" .scgr)
+RESULT_FILE="$RESULTS_DIR/$LATEST_RESULT"
 
-# Run behavior analysis in a new container (needs write access to save analysis)
-docker run \
-    --rm \
-    -v "$RESULTS_DIR:/sandbox/results:rw" \
-    -v "$LOGS_DIR:/sandbox/logs:ro" \
-    "$IMAGE_NAME" \
-    python /sandbox/behavior_analyzer.py "$EXECUTION_ID"
+summary_field() {
+    python3 "$SCRIPT_DIR/result_store.py" "$RESULT_FILE" summary "$1"
+}
 
-ANALYZER_EXIT=$?
+# The runner analyzes in-process; only fall back to a separate analyzer
+# container for runs that did not produce a report
+if ! summary_field verdict > /dev/null 2>&1; then
+    echo -e "\n${YELLOW}Analyzing behavior...${NC}\n"
+    docker run \
+        --rm \
+        -v "$RESULTS_DIR:/sandbox/results:rw" \
+        -v "$LOGS_DIR:/sandbox/logs:ro" \
+        "$IMAGE_NAME" \
+        python /sandbox/behavior_analyzer.py "$EXECUTION_ID"
+fi
 
 # Display summary
 echo -e "\n${BLUE}========================================${NC}"
 echo -e "${BLUE}Test Complete${NC}"
 echo -e "${BLUE}========================================${NC}"
 
-if [ -f "$RESULTS_DIR/${EXECUTION_ID}_analysis.json" ]; then
-    RISK_SCORE=$(jq -r '.risk_score' "$RESULTS_DIR/${EXECUTION_ID}_analysis.json")
-    THREAT_LEVEL=$(jq -r '.threat_level' "$RESULTS_DIR/${EXECUTION_ID}_analysis.json")
-    VERDICT=$(jq -r '.verdict' "$RESULTS_DIR/${EXECUTION_ID}_analysis.json")
+if summary_field verdict > /dev/null 2>&1; then
+    RISK_SCORE=$(summary_field risk_score)
+    THREAT_LEVEL=$(summary_field threat_level)
+    VERDICT=$(summary_field verdict)
     
     echo -e "${YELLOW}Risk Score:${NC} $RISK_SCORE/100"
     echo -e "${YELLOW}Threat Level:${NC} $THREAT_LEVEL"
@@ -128,7 +133,7 @@ else
     echo -e "${RED}Analysis report not found${NC}"
 fi
 
-echo -e "\n${YELLOW}Results:${NC} sandbox/results/${EXECUTION_ID}_*"
+echo -e "\n${YELLOW}Results:${NC} sandbox/results/${EXECUTION_ID}.scgr"
 echo -e "${YELLOW}Logs:${NC} sandbox/logs/${EXECUTION_ID}_*"
 
 exit 0
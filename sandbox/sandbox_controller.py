@@ -6,11 +6,14 @@ Python interface for running sandbox tests from backend
 
 import os
 import json
-import subprocess
 import time
+import subprocess
 from pathlib import Path
 from typing import Dict, Optional
 
+from result_store import read_record, EXTENSION
+from results_catalog import ResultsCatalog, CATALOG_NAME
+
 
 class SandboxController:
     """Controls sandbox execution from Python code"""
@@ -33,6 +36,11 @@ class SandboxController:
         # Ensure directories exist
         self.results_dir.mkdir(parents=True, exist_ok=True)
         self.logs_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.catalog = ResultsCatalog(self.results_dir / CATALOG_NAME)
+        if self.catalog.is_new:
+            # One-time backfill for result files written before the catalog existed
+            self.catalog.rebuild(self.results_dir)
     
     def is_sandbox_built(self) -> bool:
         """Check if sandbox Docker image exists"""
@@ -122,14 +130,10 @@ class SandboxController:
                 timeout=timeout + 60  # Add buffer for sandbox overhead
             )
             
-            # Find the latest analysis result
-            analysis_files = sorted(
-                self.results_dir.glob('*_analysis.json'),
-                key=lambda f: f.stat().st_mtime,
-                reverse=True
-            )
-            
-            if not analysis_files:
+            # The run we just started is the package's newest catalog entry
+            latest = self.catalog.query(package=Path(package_path).name, limit=1)
+            analysis = self.get_analysis_by_id(latest[0]['execution_id']) if latest else None
+            if not analysis:
                 return {
                     'error': 'No analysis results generated',
                     'risk_score': 0,
@@ -137,10 +141,6 @@ class SandboxController:
                     'stderr': result.stderr
                 }
             
-            # Load the latest analysis
-            with open(analysis_files[0]) as f:
-                analysis = json.load(f)
-            
             print(f"[SandboxController] Analysis complete: Risk Score {analysis['risk_score']}/100")
             
             return analysis
@@ -163,9 +163,13 @@ class SandboxController:
             }
     
     def get_analysis_by_id(self, execution_id: str) -> Optional[Dict]:
-        """Get analysis results by execution ID"""
-        analysis_file = self.results_dir / f'{execution_id}_analysis.json'
+        """Get the full analysis report by execution ID"""
+        entry = self.catalog.get(execution_id)
+        if entry:
+            return read_record(self.results_dir / entry['result_file'], 'analysis')
         
+        # Runs recorded before the result file format
+        analysis_file = self.results_dir / f'{execution_id}_analysis.json'
         if not analysis_file.exists():
             return None
         
@@ -173,37 +177,45 @@ class SandboxController:
             return json.load(f)
     
     def get_recent_analyses(self, limit: int = 10) -> list:
-        """Get recent analysis results"""
-        analysis_files = sorted(
-            self.results_dir.glob('*_analysis.json'),
-            key=lambda f: f.stat().st_mtime,
-            reverse=True
-        )
-        
-        results = []
-        for file in analysis_files[:limit]:
-            try:
-                with open(file) as f:
-                    results.append(json.load(f))
-            except:
-                continue
-        
-        return results
+        """Get summaries of recent runs (use get_analysis_by_id for full reports)"""
+        return [entry['summary'] for entry in self.catalog.query(limit=limit)]
     
-    def cleanup_old_results(self, days: int = 7):
-        """Remove analysis results older than specified days"""
-        cutoff = time.time() - (days * 86400)
+    def search_analyses(self, **filters) -> list:
+        """
+        Query the catalog: package, verdict, since, until, min_risk, max_risk,
+        limit and before (last row of the previous page). Returns catalog rows.
+        """
+        return self.catalog.query(**filters)
+    
+    def cleanup_old_results(self, days: int = 7, keep_per_package: Optional[int] = None):
+        """Remove runs older than the given days (and beyond keep_per_package per package)"""
         removed = 0
         
-        for file in self.results_dir.glob('*.json'):
-            if file.stat().st_mtime < cutoff:
-                file.unlink()
-                removed += 1
+        for entry in self.catalog.apply_retention(max_age_days=days, keep_per_package=keep_per_package):
+            for file in (
+                self.results_dir / entry['result_file'],
+                self.logs_dir / f"{entry['execution_id']}_trace.bin"
+            ):
+                if file.exists():
+                    file.unlink()
+                    removed += 1
         
-        for file in self.logs_dir.glob('*.json'):
-            if file.stat().st_mtime < cutoff:
-                file.unlink()
-                removed += 1
+        # Files the catalog does not know (legacy JSON logs, runs never
+        # recorded) are swept by age, as before the catalog existed
+        cutoff = time.time() - (days * 86400)
+        uncatalogued = [
+            (self.results_dir, '*.json', None),
+            (self.results_dir, f'*{EXTENSION}', lambda f: f.stem),
+            (self.logs_dir, '*.json', None),
+            (self.logs_dir, '*_trace.bin', lambda f: f.stem[:-len('_trace')]),
+        ]
+        for directory, pattern, execution_id in uncatalogued:
+            for file in directory.glob(pattern):
+                if execution_id and self.catalog.get(execution_id(file)):
+                    continue
+                if file.stat().st_mtime < cutoff:
+                    file.unlink()
+                    removed += 1
         
         print(f"[SandboxController] Cleaned up {removed} old files")
         return removed
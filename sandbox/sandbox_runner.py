@@ -13,21 +13,48 @@ import signal
 from pathlib import Path
 from datetime import datetime
 import multiprocessing as mp
+import threading
+
+from event_bus import EventBus
+from monitor_supervisor import MonitorSupervisor
+from behavior_analyzer import BehaviorAnalyzer
+from live_analyzer import LiveBehaviorAnalyzer
+from syscall_tracer import SyscallTracer
+from obfuscation_detector import ObfuscationDetector
+from result_store import ResultWriter, result_path, build_summary
+from results_catalog import ResultsCatalog, CATALOG_NAME
 
 
 class SandboxRunner:
     """Manages package execution in sandbox with timeout and monitoring"""
     
-    def __init__(self, package_path, package_type='npm', timeout=30):
+    def __init__(self, package_path, package_type='npm', timeout=30, persist_logs=True,
+                 kill_threshold=None, trace_mode=None):
         """
         Args:
             package_path: Path to package directory
             package_type: 'npm' or 'pypi'
             timeout: Max execution time in seconds
+            persist_logs: Also store the raw monitor results in the result file
+            kill_threshold: Live risk score that stops the run early
+                (default: SANDBOX_KILL_THRESHOLD env or 70, 0 disables)
+            trace_mode: Syscall tracing backend: 'strace', 'seccomp' or 'off'
+                (default: SANDBOX_TRACE env or 'strace')
         """
         self.package_path = Path(package_path)
         self.package_type = package_type
         self.timeout = timeout
+        self.persist_logs = persist_logs
+        if kill_threshold is None:
+            kill_threshold = int(os.environ.get('SANDBOX_KILL_THRESHOLD', 70))
+        self.kill_threshold = kill_threshold
+        self.trace_mode = trace_mode or os.environ.get('SANDBOX_TRACE', 'strace')
+        
+        self.bus = None
+        self.tracer = None
+        self.live_analyzer = None
+        self.early_verdict = None
+        self._current_proc = None
         self.results_dir = Path('/sandbox/results')
         self.logs_dir = Path('/sandbox/logs')
         
@@ -36,58 +63,113 @@ class SandboxRunner:
         self.logs_dir.mkdir(exist_ok=True)
         
         # Use environment variable for package name if available, otherwise use directory name
-        package_name = os.environ.get('PACKAGE_NAME', self.package_path.name)
-        self.execution_id = f"{package_name}_{int(time.time())}"
+        self.package_name = os.environ.get('PACKAGE_NAME', self.package_path.name)
+        self.execution_id = f"{self.package_name}_{int(time.time())}"
+        self.store = None
         
     def setup_monitoring(self):
-        """Start network and file monitoring in background"""
-        monitors = {}
+        """Start network and file monitoring on background threads"""
+        self.bus = EventBus()
+        self.live_analyzer = LiveBehaviorAnalyzer(
+            self.bus,
+            kill_threshold=self.kill_threshold,
+            on_verdict=self.terminate_early
+        )
+        supervisor = MonitorSupervisor(
+            self.execution_id,
+            self.package_path,
+            bus=self.bus,
+            store=self.store if self.persist_logs else None
+        )
+        supervisor.start()
+        
+        if self.trace_mode != 'off':
+            if SyscallTracer.available():
+                self.tracer = SyscallTracer(self.execution_id, bus=self.bus, mode=self.trace_mode,
+                                            logs_dir=self.logs_dir)
+            else:
+                print("[Sandbox] strace not found, syscall tracing disabled")
+        return supervisor
+    
+    def terminate_early(self, verdict):
+        """Kill the running detonation once the live analyzer has a verdict"""
+        self.early_verdict = verdict
+        proc = self._current_proc
+        if proc and proc.poll() is None:
+            print(f"[Sandbox] Terminating early: risk {verdict['risk_score']}/100")
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+    
+    def run_command(self, cmd, stage, cwd=None):
+        """Run a command, streaming its stdout onto the event bus as it is produced"""
+        if self.early_verdict:
+            return {'stdout': '', 'stderr': '', 'returncode': None, 'skipped': True}
         
-        # Start network monitor with unbuffered output
-        net_log = self.logs_dir / f'{self.execution_id}_network.log'
-        with open(net_log, 'w') as f:
-            f.write(f"Network monitoring started for {self.execution_id}\n")
+        if self.tracer:
+            cmd = self.tracer.wrap(cmd)
+        if self.bus:
+            self.bus.publish('stage', {'stage': stage, 'timestamp': datetime.now().isoformat()})
         
-        net_monitor_proc = subprocess.Popen(
-            ['python', '-u', '/sandbox/network_monitor.py', self.execution_id],
-            stdout=open(net_log, 'a'),
-            stderr=subprocess.STDOUT
+        proc = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True  # own process group, so children die with it
         )
-        monitors['network'] = net_monitor_proc
+        self._current_proc = proc
+        stdout_lines = []
+        stderr_lines = []
         
-        # Start file monitor with unbuffered output
-        file_log = self.logs_dir / f'{self.execution_id}_files.log'
-        with open(file_log, 'w') as f:
-            f.write(f"File monitoring started for {self.execution_id}\n")
+        def pump(stream, lines, channel):
+            for line in stream:
+                lines.append(line)
+                if channel and self.bus:
+                    self.bus.publish(channel, {
+                        'stage': stage,
+                        'line': line,
+                        'timestamp': datetime.now().isoformat()
+                    })
         
-        file_monitor_proc = subprocess.Popen(
-            ['python', '-u', '/sandbox/file_monitor.py', self.execution_id, str(self.package_path)],
-            stdout=open(file_log, 'a'),
-            stderr=subprocess.STDOUT
-        )
-        monitors['file'] = file_monitor_proc
+        readers = [
+            threading.Thread(target=pump, args=(proc.stdout, stdout_lines, 'stdout'), daemon=True),
+            threading.Thread(target=pump, args=(proc.stderr, stderr_lines, None), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
         
-        time.sleep(1)  # Let monitors initialize
-        return monitors
-    
-    def stop_monitoring(self, monitors):
-        """Stop all monitoring processes and ensure logs are saved"""
-        for name, proc in monitors.items():
+        try:
+            proc.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
             try:
-                proc.terminate()
-                # Wait longer for monitors to save their logs
-                proc.wait(timeout=10)
-            except subprocess.TimeoutExpired:
-                proc.kill()
-                proc.wait()
-            except:
-                try:
-                    proc.kill()
-                except:
-                    pass
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+            raise
+        finally:
+            for reader in readers:
+                reader.join(timeout=2)
+            self._current_proc = None
         
-        # Give monitors time to write logs
-        time.sleep(2)
+        return {
+            'stdout': ''.join(stdout_lines),
+            'stderr': ''.join(stderr_lines),
+            'returncode': proc.returncode
+        }
+    
+    def stop_monitoring(self, supervisor):
+        """Stop all monitors and return their in-memory results"""
+        if self.tracer:
+            self.tracer.stop()
+        try:
+            return supervisor.stop()
+        except Exception as e:
+            print(f"[Sandbox] Failed to stop monitors: {e}")
+            return {'network': {}, 'files': {}}
     
     def run_npm_package(self):
         """Execute npm package"""
@@ -95,13 +177,7 @@ class SandboxRunner:
         
         # Install dependencies (with network monitoring)
         install_cmd = ['npm', 'install', '--prefix', str(self.package_path)]
-        install_result = subprocess.run(
-            install_cmd,
-            cwd=str(self.package_path),
-            capture_output=True,
-            timeout=self.timeout,
-            text=True
-        )
+        install_result = self.run_command(install_cmd, 'install', cwd=str(self.package_path))
         
         # Try to run main entry point
         package_json = self.package_path / 'package.json'
@@ -114,24 +190,11 @@ class SandboxRunner:
         
         # Execute main file
         run_cmd = ['node', str(self.package_path / main_file)]
-        run_result = subprocess.run(
-            run_cmd,
-            capture_output=True,
-            timeout=self.timeout,
-            text=True
-        )
+        run_result = self.run_command(run_cmd, 'run')
         
         return {
-            'install': {
-                'stdout': install_result.stdout,
-                'stderr': install_result.stderr,
-                'returncode': install_result.returncode
-            },
-            'run': {
-                'stdout': run_result.stdout,
-                'stderr': run_result.stderr,
-                'returncode': run_result.returncode
-            }
+            'install': install_result,
+            'run': run_result
         }
     
     def run_python_package(self):
@@ -140,12 +203,7 @@ class SandboxRunner:
         
         # Install package in editable mode
         install_cmd = ['pip', 'install', '-e', str(self.package_path)]
-        install_result = subprocess.run(
-            install_cmd,
-            capture_output=True,
-            timeout=self.timeout,
-            text=True
-        )
+        install_result = self.run_command(install_cmd, 'install')
         
         # Try to import and run
         init_file = self.package_path / '__init__.py'
@@ -161,46 +219,27 @@ class SandboxRunner:
             else:
                 return {'error': 'No Python files found'}
         
-        run_result = subprocess.run(
-            run_cmd,
-            capture_output=True,
-            timeout=self.timeout,
-            text=True
-        )
+        run_result = self.run_command(run_cmd, 'run')
         
         return {
-            'install': {
-                'stdout': install_result.stdout,
-                'stderr': install_result.stderr,
-                'returncode': install_result.returncode
-            },
-            'run': {
-                'stdout': run_result.stdout,
-                'stderr': run_result.stderr,
-                'returncode': run_result.returncode
-            }
+            'install': install_result,
+            'run': run_result
         }
     
     def scan_obfuscation(self):
         """Scan package for code obfuscation before execution"""
         try:
-            result = subprocess.run(
-                ['python', '/sandbox/obfuscation_detector.py', str(self.package_path)],
-                capture_output=True,
-                timeout=10,
-                text=True
+            detector = ObfuscationDetector(
+                self.package_path,
+                cache_dir=os.environ.get('SANDBOX_OBFUSCATION_CACHE')
             )
+            obf_data = detector.scan_package()
+            
+            if self.store:
+                self.store.append('obfuscation', obf_data)
             
-            if result.returncode == 0 and result.stdout:
-                obf_data = json.loads(result.stdout)
-                
-                # Save obfuscation report
-                obf_file = self.results_dir / f'{self.execution_id}_obfuscation.json'
-                with open(obf_file, 'w') as f:
-                    json.dump(obf_data, f, indent=2)
-                
-                print(f"[Sandbox] Obfuscation scan: {obf_data['obfuscation_score']}/100 ({obf_data['threat_level']})")
-                return obf_data
+            print(f"[Sandbox] Obfuscation scan: {obf_data['obfuscation_score']}/100 ({obf_data['threat_level']})")
+            return obf_data
         except Exception as e:
             print(f"[Sandbox] Obfuscation scan failed: {e}")
         
@@ -210,12 +249,14 @@ class SandboxRunner:
         """Main execution flow with monitoring"""
         print(f"[Sandbox] Starting execution: {self.execution_id}")
         start_time = time.time()
+        self.store = ResultWriter(result_path(self.results_dir, self.execution_id))
         
         # Scan for obfuscation before execution
         obfuscation_result = self.scan_obfuscation()
         
         # Start monitors
-        monitors = self.setup_monitoring()
+        supervisor = self.setup_monitoring()
+        monitor_results = {'network': {}, 'files': {}}
         
         try:
             # Run package based on type
@@ -238,13 +279,17 @@ class SandboxRunner:
             }
         finally:
             # Stop monitors
-            self.stop_monitoring(monitors)
+            monitor_results = self.stop_monitoring(supervisor)
+        
+        if self.early_verdict:
+            execution_result['early_termination'] = self.early_verdict
         
         end_time = time.time()
         
         # Compile results
         result = {
             'execution_id': self.execution_id,
+            'package_name': self.package_name,
             'package_path': str(self.package_path),
             'package_type': self.package_type,
             'start_time': datetime.fromtimestamp(start_time).isoformat(),
@@ -253,22 +298,36 @@ class SandboxRunner:
             'execution': execution_result
         }
         
-        # Save results
-        result_file = self.results_dir / f'{self.execution_id}_result.json'
-        with open(result_file, 'w') as f:
-            json.dump(result, f, indent=2)
+        # Analyze straight from memory instead of re-reading the logs
+        analyzer = BehaviorAnalyzer(
+            self.execution_id,
+            execution_data=result,
+            network_data=monitor_results.get('network') or {},
+            file_data=monitor_results.get('files') or {},
+            obfuscation_data=obfuscation_result or {}
+        )
+        report = analyzer.generate_report(save=False)
+        analyzer.print_report(report)
         
-        # Save execution logs (stdout/stderr)
-        log_file = self.logs_dir / f'{self.execution_id}_execution.json'
-        with open(log_file, 'w') as f:
-            json.dump({
-                'execution_id': self.execution_id,
-                'execution': execution_result,
-                'timestamp': datetime.fromtimestamp(end_time).isoformat()
-            }, f, indent=2)
+        # One append-only file holds the captured output, the report and a
+        # small summary record that listings read on their own
+        self.store.append('result', result)
+        self.store.append('analysis', report)
+        summary = build_summary(report, result)
+        self.store.append('summary', summary)
+        self.store.close()
+        
+        catalog = ResultsCatalog(self.results_dir / CATALOG_NAME)
+        catalog.record(summary, self.store.path)
+        catalog.close()
+        
+        result['analysis'] = {
+            'risk_score': report['risk_score'],
+            'threat_level': report['threat_level'],
+            'verdict': report['verdict']
+        }
         
-        print(f"[Sandbox] Execution complete: {result_file}")
-        print(f"[Sandbox] Logs saved: {log_file}")
+        print(f"[Sandbox] Execution complete: {self.store.path}")
         return result
 
 
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Syscall Tracer
+Runs sandbox commands under strace and records exec, open, connect and DNS
+events into a compact binary log
+"""
+
+import codecs
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from network_monitor import is_suspicious_ip
+
+
+# Only these syscalls are traced; everything else runs untouched
+TRACED_SYSCALLS = [
+    'execve', 'execveat', 'open', 'openat', 'openat2',
+    'connect', 'sendto', 'sendmsg', 'sendmmsg',
+]
+
+# Credential stores a package has no business reading during install/run,
+# matched as whole path components ('/...' only from the root). .npmrc is
+# left out: the npm CLI reads it itself on every run.
+SENSITIVE_TRACE_PATTERNS = [
+    '.ssh', 'id_rsa', 'id_ed25519', 'id_ecdsa', '.aws',
+    '.pypirc', '.env', '.git-credentials', '.netrc', '.gnupg',
+    '.docker/config.json', '.kube/config', '/etc/shadow', '.bash_history',
+]
+
+# Spawning these from a package is a strong signal (plain shells are not:
+# npm runs every lifecycle script through sh -c)
+SUSPICIOUS_EXECUTABLES = {
+    'curl', 'wget', 'nc', 'ncat', 'netcat', 'socat', 'telnet', 'ssh', 'scp',
+    'base64', 'chmod', 'crontab', 'xmrig', 'nohup', 'openssl',
+}
+
+# Lookups the package managers themselves make
+KNOWN_REGISTRY_HOSTS = {
+    'registry.npmjs.org', 'registry.yarnpkg.com', 'pypi.org',
+    'files.pythonhosted.org', 'github.com', 'codeload.github.com',
+}
+
+# ---------------- binary log format ----------------
+# File header: magic + format version. Each record is a fixed header
+# (type, unix time, pid, int value, payload length) followed by a UTF-8
+# payload. value is the fd/return code for exec/open, the port for
+# connect and the query type for DNS.
+
+LOG_MAGIC = b'SCGT'
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct('<4sB')
+RECORD = struct.Struct('<BdIiH')
+MAX_PAYLOAD = 1024
+
+EVENT_EXEC = 1
+EVENT_OPEN = 2
+EVENT_OPEN_WRITE = 3
+EVENT_CONNECT = 4
+EVENT_DNS = 5
+
+EVENT_NAMES = {
+    EVENT_EXEC: 'exec',
+    EVENT_OPEN: 'open',
+    EVENT_OPEN_WRITE: 'open',
+    EVENT_CONNECT: 'connect',
+    EVENT_DNS: 'dns',
+}
+
+# ---------------- strace output parsing ----------------
+
+LINE_RE = re.compile(r'^(\d+)\s+(\d+\.\d+)\s+(\w+)\((.*)$')
+RESUMED_RE = re.compile(r'^(\d+)\s+\d+\.\d+\s+<\.\.\. (\w+) resumed>(.*)$')
+UNFINISHED = '<unfinished ...>'
+RESULT_RE = re.compile(r'\)\s+=\s+(-?\d+)')
+STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"')
+PORT_RE = re.compile(r'sin6?_port=htons\((\d+)\)')
+IPV4_RE = re.compile(r'inet_addr\("([^"]+)"\)')
+IPV6_RE = re.compile(r'inet_pton\(AF_INET6,\s*"([^"]+)"')
+FD_RE = re.compile(r'^(\d+),')
+WRITE_FLAGS = ('O_WRONLY', 'O_RDWR', 'O_CREAT', 'O_TRUNC', 'O_APPEND')
+DNS_PORT = 53
+
+
+def decode_strace_string(raw):
+    """Undo strace's escaping (-xx prints every byte as \\xHH)"""
+    try:
+        return codecs.escape_decode(raw.encode('latin-1'))[0]
+    except Exception:
+        return raw.encode('utf-8', 'replace')
+
+
+def parse_dns_query(payload):
+    """Return (name, qtype) for a DNS query packet, or None"""
+    if len(payload) < 17:
+        return None
+    flags = payload[2]
+    qdcount = int.from_bytes(payload[4:6], 'big')
+    if flags & 0x80 or qdcount < 1:  # responses and empty queries
+        return None
+
+    labels = []
+    pos = 12
+    while pos < len(payload):
+        length = payload[pos]
+        if length == 0:
+            break
+        if length > 63 or pos + 1 + length > len(payload):
+            return None
+        labels.append(payload[pos + 1:pos + 1 + length].decode('ascii', 'replace'))
+        pos += 1 + length
+    else:
+        return None
+
+    if not labels or pos + 3 > len(payload):
+        return None
+    qtype = int.from_bytes(payload[pos + 1:pos + 3], 'big')
+    return '.'.join(labels), qtype
+
+
+def is_local_address(ip):
+    """Loopback/unspecified addresses, including IPv4-mapped IPv6 forms"""
+    if ip.startswith('::ffff:'):
+        ip = ip[len('::ffff:'):]
+    return ip.startswith('127.') or ip in ('0.0.0.0', '::', '::1')
+
+
+def is_suspicious_connect(ip, port):
+    return port != DNS_PORT and not is_local_address(ip) and is_suspicious_ip(ip)
+
+
+def is_suspicious_exec(path):
+    return os.path.basename(path) in SUSPICIOUS_EXECUTABLES
+
+
+def is_registry_host(name):
+    name = name.lower().rstrip('.')
+    return name in KNOWN_REGISTRY_HOSTS
+
+
+def _path_parts(path):
+    return tuple(part for part in path.lower().split('/') if part)
+
+
+_SENSITIVE_PARTS = [(pattern.startswith('/'), _path_parts(pattern)) for pattern in SENSITIVE_TRACE_PATTERNS]
+
+
+def is_sensitive_path(path):
+    """Credential files and secret stores, as opposed to ordinary system reads"""
+    parts = _path_parts(path)
+    for rooted, pattern in _SENSITIVE_PARTS:
+        n = len(pattern)
+        if rooted:
+            if path.startswith('/') and parts[:n] == pattern:
+                return True
+        elif any(parts[i:i + n] == pattern for i in range(len(parts) - n + 1)):
+            return True
+    return False
+
+
+def parse_strace_line(line, dns_fds=None, pending=None):
+    """
+    Turn one `strace -f -ttt -xx` line into an event dict, or None.
+
+    dns_fds is a set of (pid, fd) pairs connected to port 53; it is updated
+    in place so later send* calls on those sockets are decoded as DNS.
+
+    A call another thread interrupted is split into an `<unfinished ...>`
+    head and a `<... x resumed>` tail carrying the result. pending (a dict,
+    updated in place) holds heads until their tail arrives; without it
+    split calls are skipped, since the head alone has no result.
+    """
+    line = line.rstrip('\n')
+    resumed = RESUMED_RE.match(line)
+    if resumed:
+        head = pending.pop((int(resumed.group(1)), resumed.group(2)), None) if pending is not None else None
+        return parse_strace_line(head + resumed.group(3), dns_fds) if head else None
+    match = LINE_RE.match(line)
+    if not match:
+        return None  # signals and exits
+    if line.endswith(UNFINISHED):
+        if pending is not None:
+            pending[(int(match.group(1)), match.group(3))] = line[:-len(UNFINISHED)].rstrip()
+        return None
+
+    pid = int(match.group(1))
+    timestamp = float(match.group(2))
+    syscall = match.group(3)
+    args = match.group(4)
+    result = RESULT_RE.search(args)
+    value = int(result.group(1)) if result else 0
+    if dns_fds is None:
+        dns_fds = set()
+
+    if syscall in ('execve', 'execveat'):
+        strings = [decode_strace_string(s).decode('utf-8', 'replace') for s in STRING_RE.findall(args)]
+        if not strings:
+            return None
+        return {
+            'type': 'exec', 'pid': pid, 'timestamp': timestamp, 'value': value,
+            'path': strings[0], 'argv': strings[1:],
+        }
+
+    if syscall in ('open', 'openat', 'openat2'):
+        strings = STRING_RE.findall(args)
+        if not strings:
+            return None
+        path = decode_strace_string(strings[0]).decode('utf-8', 'replace')
+        return {
+            'type': 'open', 'pid': pid, 'timestamp': timestamp, 'value': value,
+            'path': path, 'write': any(flag in args for flag in WRITE_FLAGS),
+            # A failed open (= -1 ENOENT, ...) read nothing
+            'sensitive': value >= 0 and is_sensitive_path(path),
+        }
+
+    if syscall == 'connect':
+        port = PORT_RE.search(args)
+        addr = IPV4_RE.search(args) or IPV6_RE.search(args)
+        if not port or not addr:
+            return None  # AF_UNIX and friends
+        port = int(port.group(1))
+        ip = addr.group(1)
+        fd = FD_RE.match(args)
+        if port == DNS_PORT and fd:
+            dns_fds.add((pid, int(fd.group(1))))
+        return {
+            'type': 'connect', 'pid': pid, 'timestamp': timestamp, 'value': port,
+            'ip': ip, 'port': port,
+            'suspicious': is_suspicious_connect(ip, port),
+        }
+
+    if syscall in ('sendto', 'sendmsg', 'sendmmsg'):
+        fd = FD_RE.match(args)
+        port = PORT_RE.search(args)
+        to_dns = (port and int(port.group(1)) == DNS_PORT) or (fd and (pid, int(fd.group(1))) in dns_fds)
+        if not to_dns:
+            return None
+        for raw in STRING_RE.findall(args):
+            query = parse_dns_query(decode_strace_string(raw))
+            if query:
+                return {
+                    'type': 'dns', 'pid': pid, 'timestamp': timestamp, 'value': query[1],
+                    'name': query[0], 'qtype': query[1],
+                }
+    return None
+
+
+# ---------------- log reading/writing ----------------
+
+def encode_event(event):
+    """Pack an event dict into one binary record"""
+    kind = event['type']
+    if kind == 'exec':
+        code = EVENT_EXEC
+        payload = event['path'] + '\0' + ' '.join(event.get('argv', []))
+    elif kind == 'open':
+        code = EVENT_OPEN_WRITE if event.get('write') else EVENT_OPEN
+        payload = event['path']
+    elif kind == 'connect':
+        code = EVENT_CONNECT
+        payload = event['ip']
+    elif kind == 'dns':
+        code = EVENT_DNS
+        payload = event['name']
+    else:
+        raise ValueError(f'Unknown trace event type: {kind}')
+
+    data = payload.encode('utf-8', 'replace')[:MAX_PAYLOAD]
+    return RECORD.pack(code, event['timestamp'], event['pid'], event['value'], len(data)) + data
+
+
+def decode_record(code, timestamp, pid, value, data):
+    """Rebuild the event dict for one binary record"""
+    payload = data.decode('utf-8', 'replace')
+    event = {'type': EVENT_NAMES.get(code, 'unknown'), 'pid': pid, 'timestamp': timestamp, 'value': value}
+    if code == EVENT_EXEC:
+        path, _, argv = payload.partition('\0')
+        event.update(path=path, argv=argv.split(' ') if argv else [])
+    elif code in (EVENT_OPEN, EVENT_OPEN_WRITE):
+        event.update(path=payload, write=code == EVENT_OPEN_WRITE, sensitive=value >= 0 and is_sensitive_path(payload))
+    elif code == EVENT_CONNECT:
+        event.update(
+            ip=payload, port=value,
+            suspicious=is_suspicious_connect(payload, value),
+        )
+    elif code == EVENT_DNS:
+        event.update(name=payload, qtype=value)
+    return event
+
+
+def read_trace_log(path):
+    """Load every event from a binary trace log ([] if it does not exist)"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return []
+
+    if len(data) < LOG_HEADER.size:
+        return []
+    magic, version = LOG_HEADER.unpack_from(data, 0)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f'Not a trace log (or unsupported version): {path}')
+
+    events = []
+    offset = LOG_HEADER.size
+    while offset + RECORD.size <= len(data):
+        code, timestamp, pid, value, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + length > len(data):
+            break  # truncated tail from an interrupted writer
+        events.append(decode_record(code, timestamp, pid, value, data[offset:offset + length]))
+        offset += length
+    return events
+
+
+# ---------------- tracer ----------------
+
+class SyscallTracer:
+    """Wraps sandbox commands in strace and streams their events to a binary log"""
+
+    def __init__(self, execution_id, bus=None, mode='strace', logs_dir='/sandbox/logs'):
+        """
+        Args:
+            execution_id: Sandbox execution being traced
+            bus: Optional EventBus that receives every event on 'syscall'
+            mode: 'strace' (ptrace every syscall stop) or 'seccomp' (strace
+                --seccomp-bpf, so untraced syscalls never leave the kernel)
+            logs_dir: Where {execution_id}_trace.bin is written
+        """
+        self.execution_id = execution_id
+        self.bus = bus
+        self.mode = mode
+        self.log_file = Path(logs_dir) / f'{execution_id}_trace.bin'
+        self.event_count = 0
+
+        self._fifo_dir = tempfile.mkdtemp(prefix='scg-trace-')
+        self._fifos = 0
+        self._readers = []
+        self._dns_fds = set()
+        self._lock = threading.Lock()
+        self._log = open(self.log_file, 'wb')
+        self._log.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+
+    @staticmethod
+    def available():
+        return shutil.which('strace') is not None
+
+    def wrap(self, cmd):
+        """Return cmd prefixed with strace, writing to a FIFO that is parsed live"""
+        self._fifos += 1
+        fifo = os.path.join(self._fifo_dir, f'trace{self._fifos}')
+        os.mkfifo(fifo)
+
+        reader = threading.Thread(target=self._read_fifo, args=(fifo,), daemon=True)
+        reader.start()
+        self._readers.append((reader, fifo))
+
+        strace = [
+            'strace', '-f', '-qq', '-ttt', '-xx', '-s', '256',
+            '-e', 'trace=' + ','.join(TRACED_SYSCALLS),
+            '-o', fifo,
+        ]
+        if self.mode == 'seccomp':
+            strace.append('--seccomp-bpf')
+        return strace + ['--'] + list(cmd)
+
+    def _read_fifo(self, fifo):
+        pending = {}
+        with open(fifo, 'r', encoding='latin-1') as stream:
+            for line in stream:
+                event = parse_strace_line(line, self._dns_fds, pending)
+                if event:
+                    self.record(event)
+
+    def record(self, event):
+        """Append an event to the log and publish it"""
+        with self._lock:
+            self._log.write(encode_event(event))
+            self.event_count += 1
+
+        if event['type'] == 'open' and event['sensitive']:
+            print(f"[SyscallTracer] ⚠️  SENSITIVE open: {event['path']}")
+        elif event['type'] == 'connect' and event['suspicious']:
+            print(f"[SyscallTracer] ⚠️  SUSPICIOUS connect: {event['ip']}:{event['port']}")
+
+        if self.bus:
+            published = dict(event)
+            published['timestamp'] = datetime.fromtimestamp(event['timestamp']).isoformat()
+            self.bus.publish('syscall', published)
+
+    def stop(self):
+        """Wait for the FIFO readers and close the log"""
+        for reader, fifo in self._readers:
+            reader.join(timeout=5)
+            if reader.is_alive():
+                # strace never opened this FIFO; open the write end to release the reader
+                try:
+                    os.close(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+                except OSError:
+                    pass
+                reader.join(timeout=1)
+
+        with self._lock:
+            self._log.close()
+        shutil.rmtree(self._fifo_dir, ignore_errors=True)
+        print(f"[SyscallTracer] {self.event_count} events saved: {self.log_file}")
+        return self.log_file
+
+
+def main():
+    """Dump a binary trace log as text"""
+    if len(sys.argv) < 2:
+        print("Usage: syscall_tracer.py <trace.bin>")
+        sys.exit(1)
+
+    for event in read_trace_log(sys.argv[1]):
+        when = datetime.fromtimestamp(event['timestamp']).strftime('%H:%M:%S.%f')[:-3]
+        detail = {
+            'exec': lambda e: ' '.join([e['path']] + e['argv'][1:]),
+            'open': lambda e: ('W ' if e['write'] else 'R ') + e['path'],
+            'connect': lambda e: f"{e['ip']}:{e['port']}",
+            'dns': lambda e: f"{e['name']} (type {e['qtype']})",
+        }.get(event['type'], lambda e: '')(event)
+        print(f"{when} {event['pid']:>7} {event['type']:<8} {detail}")
+
+
+if __name__ == '__main__':
+    main()
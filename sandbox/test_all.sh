@@ -53,17 +53,12 @@ echo -e "Packages tested: ${GREEN}$test_count${NC}\n"
 
 echo -e "${BLUE}Risk Assessment:${NC}\n"
 
-for analysis in "$SCRIPT_DIR/results"/*_analysis.json; do
-    [ ! -f "$analysis" ] && continue
+for result in "$SCRIPT_DIR/results"/*.scgr; do
+    [ ! -f "$result" ] && continue
     
-    pkg=$(basename "$analysis" | sed 's/_[0-9]*_analysis.json//')
-    if command -v jq &>/dev/null; then
-        risk=$(jq -r '.risk_score' "$analysis" 2>/dev/null || echo "?")
-        threat=$(jq -r '.threat_level' "$analysis" 2>/dev/null || echo "?")
-    else
-        risk=$(python3 -c "import json; print(json.load(open('$analysis')).get('risk_score', '?'))" 2>/dev/null || echo "?")
-        threat=$(python3 -c "import json; print(json.load(open('$analysis')).get('threat_level', '?'))" 2>/dev/null || echo "?")
-    fi
+    pkg=$(basename "$result" | sed 's/_[0-9]*\.scgr//')
+    risk=$(python3 "$SCRIPT_DIR/result_store.py" "$result" summary risk_score 2>/dev/null || echo "?")
+    threat=$(python3 "$SCRIPT_DIR/result_store.py" "$result" summary threat_level 2>/dev/null || echo "?")
     
     case "$threat" in
         CRITICAL) echo -e "${RED}🚨 $pkg: $risk/100 - CRITICAL${NC}" ;;
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Worker Pool
+Process pool where every task has its own deadline. A worker that overruns
+is killed and replaced, so one pathological input cannot stall a scan.
+"""
+
+import time
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+
+# Task outcomes
+OK = 'ok'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+
+
+def _serve(func, conn):
+    """Worker loop: run func(*args) for every message until told to stop"""
+    while True:
+        try:
+            args = conn.recv()
+        except (EOFError, OSError):
+            return
+        if args is None:
+            return
+        try:
+            conn.send((OK, func(*args)))
+        except Exception as e:
+            conn.send((ERROR, f'{type(e).__name__}: {e}'))
+
+
+class _Worker:
+    def __init__(self, ctx, func):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_serve, args=(func, child), daemon=True)
+        self.process.start()
+        child.close()
+        self.tag = None
+        self.deadline = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class TimeoutPool:
+    """Runs one function over many argument tuples with a per-task timeout"""
+
+    def __init__(self, func: Callable, workers: int = 1, timeout: Optional[float] = None):
+        """
+        Args:
+            func: Module-level function run in the workers
+            workers: Number of worker processes
+            timeout: Seconds a single task may run (None: no limit)
+        """
+        self.func = func
+        self.timeout = timeout
+        self.ctx = mp.get_context()
+        self.workers = [_Worker(self.ctx, func) for _ in range(max(workers, 1))]
+
+    def imap_unordered(self, tasks: Iterable[Tuple[Any, tuple]]) -> Iterator[Tuple[Any, str, Any]]:
+        """
+        Run (tag, args) tasks and yield (tag, outcome, result) as each finishes.
+
+        outcome is OK (result is the return value), ERROR (result is the
+        exception text) or TIMEOUT (result is None). Tasks are pulled from
+        the iterable only when a worker is free.
+        """
+        tasks = iter(tasks)
+        idle = list(self.workers)
+        busy = {}
+        exhausted = False
+
+        while True:
+            while idle and not exhausted:
+                try:
+                    tag, args = next(tasks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                worker = idle.pop()
+                worker.tag = tag
+                worker.deadline = time.monotonic() + self.timeout if self.timeout else None
+                worker.conn.send(args)
+                busy[worker.conn] = worker
+
+            if not busy:
+                return
+
+            deadlines = [w.deadline for w in busy.values() if w.deadline is not None]
+            wait_for = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            for conn in wait(list(busy), timeout=wait_for):
+                worker = busy.pop(conn)
+                tag = worker.tag
+                try:
+                    outcome, result = conn.recv()
+                except (EOFError, OSError):
+                    # Worker died mid-task (e.g. OOM-killed): replace it
+                    outcome, result = ERROR, 'worker exited'
+                    worker = self._replace(worker)
+                idle.append(worker)
+                yield tag, outcome, result
+
+            now = time.monotonic()
+            for conn, worker in list(busy.items()):
+                if worker.deadline is not None and worker.deadline <= now:
+                    del busy[conn]
+                    tag = worker.tag
+                    idle.append(self._replace(worker))
+                    yield tag, TIMEOUT, None
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.kill()
+        fresh = _Worker(self.ctx, self.func)
+        self.workers[self.workers.index(worker)] = fresh
+        return fresh
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
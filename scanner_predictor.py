@@ -1,36 +1,51 @@
 import re
+import csv
 import json
-import pickle
+import base64
 import hashlib
 import os
+import sys
+import time
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Dict, List, Tuple, Any
 
 import numpy as np
-import pandas as pd
 import tempfile
 import tarfile
 import zipfile
 import warnings
 warnings.filterwarnings('ignore')
 
+from code_stats import code_stats, raw_stats, merge_stats, finalize_stats, STAT_FEATURES
+
+# The JavaScript tokenizer lives with the sandbox's obfuscation detector
+sys.path.append(str(Path(__file__).parent / "sandbox"))
+from js_tokenizer import tokenize
+from install_scripts import analyze_install_scripts, FULL_SCAN, LIFECYCLE_SCRIPTS
+from lockfiles import build_dependency_graph, normalize_name, DependencyGraph
+from model_artifact import load_scoring_model
+from forest_engine import top_contributions
+from cascade import fast_path_probability
+
 # Resolve paths relative to this script's directory
 SCRIPT_DIR = Path(__file__).parent.resolve()
-# Try multiple locations for the model file
+# Try multiple locations for the model artifact (exported by model_artifact.py)
 MODEL_PATHS = [
-    SCRIPT_DIR / "data" / "security_model.pkl",
-    SCRIPT_DIR / "RandomForest" / "security_model.pkl",
-    Path("data") / "security_model.pkl",
-    Path("RandomForest") / "security_model.pkl",
+    SCRIPT_DIR / "data" / "security_model",
+    SCRIPT_DIR / "RandomForest" / "security_model",
+    Path("data") / "security_model",
+    Path("RandomForest") / "security_model",
 ]
 MODEL_PATH = None
 for path in MODEL_PATHS:
-    if path.exists():
+    if path.is_dir():
         MODEL_PATH = path
         break
 if MODEL_PATH is None:
     # Default to data directory for training
-    MODEL_PATH = SCRIPT_DIR / "data" / "security_model.pkl"
+    MODEL_PATH = SCRIPT_DIR / "data" / "security_model"
 
 FEATURE_COLS_PATH = SCRIPT_DIR / "data" / "feature_cols.json"
 
@@ -56,7 +71,13 @@ EXFIL_HINTS = ["webhook", "telegram", "discord", "pastebin", "upload", "exfil",
 KEYLOGGER_HINTS = ["keylogger", "pynput", "iohook", "getasynckeystate", "keyboard hook", "keypress"]
 BACKDOOR_HINTS = ["reverse shell", "nc -e", "bash -i", "bind shell", "socket.connect", "listen(", "accept(", "powershell -enc"]
 
-PY_IMPORT_RE = re.compile(r"^\s*(?:from\s+([a-zA-Z0-9_\.]+)\s+import|import\s+([a-zA-Z0-9_\.]+))")
+# One match per import statement over a whole file; group 2 may list several modules
+PY_IMPORT_RE = re.compile(
+    r"^[ \t]*(?:from[ \t]+([a-zA-Z0-9_\.]+)[ \t]+import|import[ \t]+([a-zA-Z0-9_\.]+(?:[ \t]+as[ \t]+\w+)?(?:[ \t]*,[ \t]*[a-zA-Z0-9_\.]+(?:[ \t]+as[ \t]+\w+)?)*))",
+    re.MULTILINE,
+)
+# Directories whose imports are not the project's own
+IMPORT_SKIP_DIRS = {"node_modules", "__pycache__", ".git", "venv", ".venv", "env", ".env", "site-packages", "build", "dist"}
 
 # ════════════════════════════════════════════════════════════════════════════════
 # PACKAGE EXTRACTION (for tar.gz, zip, etc.)
@@ -121,25 +142,101 @@ def extract_packed_package(package_path: str) -> Tuple[Path | None, bool]:
 CACHE_DIR = Path(".pkg_snapshots")
 CACHE_DIR.mkdir(exist_ok=True)
 
+# Feature rows keyed by (ecosystem, name, version, integrity) and scan mode; point every
+# scanner at one SCG_CACHE_DIR to scan each package version once fleet-wide
+FEATURE_CACHE_DIR = Path(os.environ.get("SCG_CACHE_DIR") or CACHE_DIR / "features")
+# Bump when feature extraction changes so cached rows are invalidated
+FEATURE_CACHE_VERSION = 3
+
+PackageKey = Tuple[str, str, str, str]
+
 TEXT_EXTS_NPM = {".js", ".mjs", ".cjs", ".ts", ".json", ".md", ".txt"}
 TEXT_EXTS_PY = {".py", ".txt", ".md", ".json", ".cfg", ".ini", ".toml"}
 TEXT_EXTS_PROJECT = {".py", ".js", ".mjs", ".cjs", ".ts", ".java", ".kt", ".gradle", ".kts", ".xml", ".json", ".yml", ".yaml", ".md", ".txt"}
+# Split into code and string literals before scanning
+JS_EXTS = {".js", ".mjs", ".cjs", ".ts"}
 
 def _hash_text(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8", errors="ignore")).hexdigest()
 
+def package_key(ecosystem: str, name: str, version: str | None, integrity: str | None) -> PackageKey:
+    return (ecosystem, normalize_name(ecosystem, name), version or "", integrity or "")
+
+Blob = Tuple[Path, int, str]   # (path, size, content hash)
+
+def _file_sha256(p: Path) -> Tuple[int, Any]:
+    """(size, sha256) of a file, hashed in chunks rather than held in memory"""
+    h = hashlib.sha256()
+    size = 0
+    with open(p, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+            size += len(chunk)
+    return size, h
+
+def hashed_files(pkg_dir: Path, exts: set) -> List[Blob]:
+    """The files a scan would read, hashed; only the analyzed ones are read again"""
+    blobs = []
+    for p in sorted(pkg_dir.rglob("*")):
+        if p.suffix.lower() not in exts or not p.is_file():
+            continue
+        try:
+            size, h = _file_sha256(p)
+        except Exception:
+            continue
+        blobs.append((p, size, h.hexdigest()))
+    return blobs
+
+def package_digest(pkg_dir: Path, blobs: List[Blob]) -> str:
+    """Content hash of a package's files, as an integrity string"""
+    h = hashlib.sha256()
+    for p, _, digest in blobs:
+        h.update(f"{p.relative_to(pkg_dir).as_posix()}\0{digest}\n".encode("utf-8", errors="ignore"))
+    return f"sha256-{h.hexdigest()}"
+
+def _feature_cache_path(key: PackageKey) -> Path:
+    # SCG_FULL_SCAN rows must not be served from install-closure scans, or vice versa
+    mode = "full" if FULL_SCAN else "closure"
+    return FEATURE_CACHE_DIR / f"{_hash_text('|'.join(key) + f'|v{FEATURE_CACHE_VERSION}|{mode}')}.json"
+
+def cached_row(key: PackageKey) -> Dict[str, Any] | None:
+    try:
+        entry = json.loads(_feature_cache_path(key).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    return entry["row"] if entry.get("key") == list(key) else None
+
+def store_row(key: PackageKey, row: Dict[str, Any]):
+    try:
+        FEATURE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _feature_cache_path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"key": list(key), "row": row}), encoding="utf-8")
+        tmp.replace(path)
+    except Exception:
+        pass
+
 def _read_text_file(p: Path, max_bytes=200_000) -> str:
     try:
-        data = p.read_bytes()[:max_bytes]
+        with open(p, "rb") as f:
+            data = f.read(max_bytes)
         return data.decode("utf-8", errors="ignore")
     except Exception:
         return ""
 
-def _collect_code_text(root: Path, exts: set, max_files=400) -> Tuple[str, int]:
+def _collect_code_text(root: Path, exts: set, max_files=400, files: List[Path] = None) -> Tuple[str, str, str, int]:
+    """
+    (code, strings, escaped, loc) of the matching files under root, or of
+    just `files`. JavaScript is tokenized: its code goes in `code` with
+    literals as placeholders, the decoded literal contents in `strings` and
+    the source of literals with escape sequences in `escaped`.
+    """
     blobs = []
+    strings = []
+    escaped = []
     loc = 0
     count = 0
-    for p in root.rglob("*"):
+    for p in (files if files is not None else root.rglob("*")):
         if count >= max_files:
             break
         if not p.is_file():
@@ -149,189 +246,320 @@ def _collect_code_text(root: Path, exts: set, max_files=400) -> Tuple[str, int]:
         text = _read_text_file(p)
         if not text:
             continue
-        blobs.append(text)
         loc += text.count("\n") + 1
         count += 1
-    return "\n".join(blobs), loc
-
-def _minified_indicator(code: str) -> int:
-    longest = max((len(line) for line in code.splitlines()), default=0)
-    return 1 if longest > 600 else 0
+        if p.suffix.lower() in JS_EXTS:
+            tokens = tokenize(text)
+            text = tokens["code"]
+            strings.extend(tokens["strings"])
+            escaped.extend(tokens["escaped"])
+        blobs.append(text)
+    return "\n".join(blobs), "\n".join(strings), "\n".join(escaped), loc
+
+# Content-hash dedup: each unique blob is analyzed once per run (and once
+# per SCG_CACHE_DIR), and every package containing it shares its counts.
+# In memory only the most recently used FILE_COUNTS_CACHE_SIZE are kept.
+FILE_COUNTS_CACHE_SIZE = 20_000
+MAX_FILE_BYTES = 200_000        # analyzed prefix of each file
+_file_counts_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+def _file_counts(p: Path, digest: str) -> Tuple[Dict[str, Any], bool]:
+    """(code_counts() of one file, whether it had to be read and analyzed now)"""
+    key = _hash_text(f"{digest}|{p.suffix.lower()}|v{FEATURE_CACHE_VERSION}")
+    counts = _file_counts_cache.get(key)
+    if counts is not None:
+        _file_counts_cache.move_to_end(key)
+        return counts, False
+    path = FEATURE_CACHE_DIR / "files" / f"{key}.json"
+    fresh = False
+    try:
+        counts = json.loads(path.read_text(encoding="utf-8"))
+        counts["stats"] = {k: np.array(v, dtype=np.int64) if isinstance(v, list) else v for k, v in counts["stats"].items()}
+    except Exception:
+        fresh = True
+        text = _read_text_file(p, MAX_FILE_BYTES)
+        if p.suffix.lower() in JS_EXTS:
+            tokens = tokenize(text)
+            counts = code_counts(tokens["code"], "\n".join(tokens["strings"]), "\n".join(tokens["escaped"]))
+        else:
+            counts = code_counts(text)
+        counts["loc"] = text.count("\n") + 1
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stats = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in counts["stats"].items()}
+            path.write_text(json.dumps({**counts, "stats": stats}), encoding="utf-8")
+        except Exception:
+            pass
+    _file_counts_cache[key] = counts
+    if len(_file_counts_cache) > FILE_COUNTS_CACHE_SIZE:
+        _file_counts_cache.popitem(last=False)
+    return counts, fresh
 
-def _obfuscation_score(code: str, base64_hits: int) -> float:
-    score = 0.05
-    lower = code.lower()
-    if "\\x" in code or "\\u" in code:
-        score += 0.25
-    if "atob(" in lower or "unescape(" in lower:
-        score += 0.20
-    if base64_hits >= 3:
-        score += 0.20
-    if base64_hits >= 10:
-        score += 0.25
-    return float(min(score, 0.98))
+def blob_features(blobs: List[Blob], max_files=400) -> Tuple[Dict[str, float], Dict[str, int]]:
+    """
+    Features of a set of files from their (deduplicated) per-file counts,
+    plus a tally of how many bytes were actually analyzed for them.
+    """
+    counts = None
+    tally = {"files": 0, "bytes": 0, "scanned_files": 0, "scanned_bytes": 0, "loc": 0}
+    for p, size, digest in blobs[:max_files]:
+        c, fresh = _file_counts(p, digest)
+        counts = c if counts is None else merge_counts(counts, c)
+        size = min(size, MAX_FILE_BYTES)
+        tally["loc"] += c["loc"]
+        tally["files"] += 1
+        tally["bytes"] += size
+        if fresh:
+            tally["scanned_files"] += 1
+            tally["scanned_bytes"] += size
+    return (finalize_counts(counts) if counts is not None else {}), tally
+
+def dedup_stats(rows: List[Dict]) -> Dict[str, float]:
+    """How much of the scanned code the content-hash dedup layer skipped"""
+    total = {"files": 0, "bytes": 0, "scanned_files": 0, "scanned_bytes": 0}
+    for r in rows:
+        for k, v in (r.get("blob_stats") or {}).items():
+            if k in total:
+                total[k] += v
+    total["dedup_ratio"] = round(1 - total["scanned_bytes"] / total["bytes"], 4) if total["bytes"] else 0.0
+    return total
 
 def _count_any(code_lower: str, hints: List[str]) -> int:
     return sum(code_lower.count(h.lower()) for h in hints)
 
-def scan_code_features(code: str) -> Dict[str, float]:
-    """Extract all 65 features matching the trained model"""
+def code_counts(code: str, strings: str = "", escaped: str = "") -> Dict[str, Any]:
+    """
+    Additive raw counts behind scan_code_features().
+
+    Call-site counts look at `code` only; URLs, keywords and other data
+    counts also look at `strings` (decoded literal contents split out of
+    tokenized JavaScript), so `"eval("` in a string is not a call. Escape
+    sequence counts look at `escaped`, the source of those literals, instead.
+    Counts of several files merge with merge_counts() and become features
+    in finalize_counts().
+    """
     lower = code.lower()
+    text = f"{code}\n{strings}" if strings else code
+    text_lower = text.lower()
+    raw = f"{code}\n{escaped}" if escaped else code
 
-    urls = URL_RE.findall(code)
-    external_urls_count = len(urls)
-    suspicious_domains = sum(1 for u in urls if any(x in u.lower() for x in SUSPICIOUS_URL_HINTS))
-
-    base64_hits = len(BASE64_RE.findall(code))
-    hex_strings = len(re.findall(r'0x[0-9a-fA-F]{8,}', code))
-
-    # Code execution
-    eval_calls = lower.count("eval(")
-    exec_calls = lower.count("exec(")
+    urls = URL_RE.findall(text)
     subprocess_calls = lower.count("subprocess.") + lower.count("popen")
     os_system_calls = lower.count("os.system") + lower.count("system(")
-    shell_commands = subprocess_calls + os_system_calls
-
-    # Network operations
-    http_requests = lower.count("http.request") + lower.count("requests.") + lower.count("axios.") + lower.count("fetch(")
-    socket_usage = 1 if "socket" in lower else 0
-    dns_lookups = lower.count("dns.") + lower.count("resolve(")
-    ip_addresses_hardcoded = len(re.findall(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b', code))
-
-    # File operations
-    file_read_ops = sum(lower.count(h) for h in ["open(", ".read(", "readfile", "fs.read"])
-    file_write_ops = sum(lower.count(h) for h in ["write(", "writefile", "fs.write", ".dump("])
-    file_delete_ops = lower.count("unlink") + lower.count("remove(") + lower.count("fs.rm")
-    temp_file_usage = 1 if "temp" in lower or "tmp" in lower else 0
-    sensitive_paths = sum(lower.count(p) for p in [".env", ".ssh", "id_rsa", "credentials", "password", ".aws"])
-
-    # Environment & credentials
-    env_var_access = sum(lower.count(h) for h in ["process.env", "os.environ", "getenv"])
-    credential_patterns = sum(lower.count(p) for p in ["password", "passwd", "credential"])
-    token_patterns = sum(lower.count(p) for p in ["token", "bearer", "jwt"])
-    password_patterns = sum(lower.count(p) for p in ["password=", "pwd=", "pass="])
-    api_key_patterns = sum(lower.count(p) for p in ["api_key", "apikey", "api-key"])
-
-    # Encryption & encoding
-    base64_imports = lower.count("base64") + lower.count("atob") + lower.count("btoa")
-    base64_decode_calls = lower.count("decode(") + lower.count("atob(")
-    fernet_usage = 1 if "fernet" in lower else 0
-    aes_usage = 1 if "aes" in lower else 0
-    rsa_usage = 1 if "rsa" in lower else 0
-    crypto_imports = lower.count("crypto") + lower.count("cipher")
-
-    # Obfuscation
-    minified_code = _minified_indicator(code)
-    obfuscation_score = _obfuscation_score(code, base64_hits)
-    unicode_obfuscation = 1 if re.search(r'\\u[0-9a-fA-F]{4}', code) else 0
-    string_concat_abuse = code.count(" + ") if code.count(" + ") > 20 else 0
-
-    # Malicious patterns
-    keylogger_patterns = 1 if any(h in lower for h in ["keylog", "keystroke", "keypress"]) else 0
-    screenshot_capture = 1 if any(h in lower for h in ["screenshot", "screen.capture"]) else 0
-    clipboard_access = 1 if "clipboard" in lower else 0
-    webcam_access = 1 if "webcam" in lower or "video" in lower else 0
-    microphone_access = 1 if "microphone" in lower or "audio.record" in lower else 0
-    reverse_shell = 1 if any(h in lower for h in ["reverse shell", "/bin/sh", "/bin/bash -i"]) else 0
-    backdoor_patterns = 1 if any(h in lower for h in ["backdoor", "reverse_tcp", "meterpreter"]) else 0
-    c2_server = 1 if any(h in lower for h in ["c2", "command and control", "beacon"]) else 0
-
-    # System modification
-    startup_modification = 1 if any(h in lower for h in ["autostart", "startup", "init.d"]) else 0
-    cron_job_creation = 1 if "cron" in lower else 0
-    registry_modification = 1 if "registry" in lower or "regedit" in lower else 0
+
+    return {
+        "external_urls": len(urls),
+        "suspicious_domains": sum(1 for u in urls if any(x in u.lower() for x in SUSPICIOUS_URL_HINTS)),
+        "base64_hits": len(BASE64_RE.findall(text)),
+        "hex_strings": len(re.findall(r'0x[0-9a-fA-F]{8,}', text)),
+
+        # Code execution
+        "eval_calls": lower.count("eval("),
+        "exec_calls": lower.count("exec("),
+        "subprocess_calls": subprocess_calls,
+        "os_system_calls": os_system_calls,
+
+        # Network operations
+        "http_requests": lower.count("http.request") + lower.count("requests.") + lower.count("axios.") + lower.count("fetch("),
+        "socket": text_lower.count("socket"),
+        "dns_lookups": lower.count("dns.") + lower.count("resolve("),
+        "ip_addresses": len(re.findall(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b', text)),
+
+        # File operations
+        "file_read_ops": sum(lower.count(h) for h in ["open(", ".read(", "readfile", "fs.read"]),
+        "file_write_ops": sum(lower.count(h) for h in ["write(", "writefile", "fs.write", ".dump("]),
+        "file_delete_ops": lower.count("unlink") + lower.count("remove(") + lower.count("fs.rm"),
+        "temp": text_lower.count("temp") + text_lower.count("tmp"),
+        "sensitive_paths": sum(text_lower.count(p) for p in [".env", ".ssh", "id_rsa", "credentials", "password", ".aws"]),
+
+        # Environment & credentials
+        "env_var_access": sum(lower.count(h) for h in ["process.env", "os.environ", "getenv"]),
+        "credential_patterns": sum(text_lower.count(p) for p in ["password", "passwd", "credential"]),
+        "token_patterns": sum(text_lower.count(p) for p in ["token", "bearer", "jwt"]),
+        "password_patterns": sum(text_lower.count(p) for p in ["password=", "pwd=", "pass="]),
+        "api_key_patterns": sum(text_lower.count(p) for p in ["api_key", "apikey", "api-key"]),
+
+        # Encryption & encoding
+        "base64_imports": text_lower.count("base64") + text_lower.count("atob") + text_lower.count("btoa"),
+        "base64_decode_calls": lower.count("decode(") + lower.count("atob("),
+        "fernet": text_lower.count("fernet"),
+        "aes": text_lower.count("aes"),
+        "rsa": text_lower.count("rsa"),
+        "crypto_imports": text_lower.count("crypto") + text_lower.count("cipher"),
+
+        # Obfuscation
+        "line_len_max": max((len(line) for line in code.splitlines()), default=0),
+        "escapes": raw.count("\\x") + raw.count("\\u"),
+        "decoder_calls": text_lower.count("atob(") + text_lower.count("unescape("),
+        "unicode_escapes": len(re.findall(r'\\u[0-9a-fA-F]{4}', raw)),
+        "concatenations": code.count(" + "),
+
+        # Malicious patterns
+        "keylogger": sum(text_lower.count(h) for h in ["keylog", "keystroke", "keypress"]),
+        "screenshot": sum(text_lower.count(h) for h in ["screenshot", "screen.capture"]),
+        "clipboard": text_lower.count("clipboard"),
+        "webcam": text_lower.count("webcam") + text_lower.count("video"),
+        "microphone": text_lower.count("microphone") + text_lower.count("audio.record"),
+        "reverse_shell": sum(text_lower.count(h) for h in ["reverse shell", "/bin/sh", "/bin/bash -i"]),
+        "backdoor": sum(text_lower.count(h) for h in ["backdoor", "reverse_tcp", "meterpreter"]),
+        "c2_server": sum(text_lower.count(h) for h in ["c2", "command and control", "beacon"]),
+
+        # System modification
+        "startup": sum(text_lower.count(h) for h in ["autostart", "startup", "init.d"]),
+        "cron": text_lower.count("cron"),
+        "registry": text_lower.count("registry") + text_lower.count("regedit"),
+
+        # Entropy / token statistics (see code_stats.py)
+        "stats": raw_stats(text),
+    }
+
+def merge_counts(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the raw counts of two texts (e.g. files of one package)"""
+    out = {}
+    for key, value in a.items():
+        if key == "stats":
+            out[key] = merge_stats(value, b[key])
+        elif key.endswith("_max"):
+            out[key] = max(value, b[key])
+        else:
+            out[key] = value + b[key]
+    return out
+
+def finalize_counts(c: Dict[str, Any]) -> Dict[str, float]:
+    """Model features from raw (possibly merged) counts"""
+    def flag(key):
+        return 1 if c[key] else 0
+
+    base64_hits = c["base64_hits"]
+    obfuscation_score = 0.05
+    if c["escapes"]:
+        obfuscation_score += 0.25
+    if c["decoder_calls"]:
+        obfuscation_score += 0.20
+    if base64_hits >= 3:
+        obfuscation_score += 0.20
+    if base64_hits >= 10:
+        obfuscation_score += 0.25
+    string_concat_abuse = c["concatenations"] if c["concatenations"] > 20 else 0
+    shell_commands = c["subprocess_calls"] + c["os_system_calls"]
 
     return {
         # Base64 & Encoding
-        "base64_imports": min(base64_imports, 10),
-        "base64_decode_calls": min(base64_decode_calls, 20),
+        "base64_imports": min(c["base64_imports"], 10),
+        "base64_decode_calls": min(c["base64_decode_calls"], 20),
         "base64_encoded_strings": min(base64_hits, 20),
         
         # Encryption
-        "fernet_usage": fernet_usage,
-        "aes_usage": aes_usage,
-        "rsa_usage": rsa_usage,
-        "crypto_imports": min(crypto_imports, 10),
+        "fernet_usage": flag("fernet"),
+        "aes_usage": flag("aes"),
+        "rsa_usage": flag("rsa"),
+        "crypto_imports": min(c["crypto_imports"], 10),
         
         # Network
-        "http_requests": min(http_requests, 30),
-        "socket_usage": socket_usage,
-        "dns_lookups": min(dns_lookups, 10),
-        "external_urls_count": min(external_urls_count, 20),
-        "ip_addresses_hardcoded": min(ip_addresses_hardcoded, 10),
-        "suspicious_domains": min(suspicious_domains, 10),
+        "http_requests": min(c["http_requests"], 30),
+        "socket_usage": flag("socket"),
+        "dns_lookups": min(c["dns_lookups"], 10),
+        "external_urls_count": min(c["external_urls"], 20),
+        "ip_addresses_hardcoded": min(c["ip_addresses"], 10),
+        "suspicious_domains": min(c["suspicious_domains"], 10),
         
         # File operations
-        "file_read_operations": min(file_read_ops, 50),
-        "file_write_operations": min(file_write_ops, 50),
-        "file_delete_operations": min(file_delete_ops, 20),
-        "temp_file_usage": temp_file_usage,
-        "sensitive_paths_accessed": min(sensitive_paths, 10),
+        "file_read_operations": min(c["file_read_ops"], 50),
+        "file_write_operations": min(c["file_write_ops"], 50),
+        "file_delete_operations": min(c["file_delete_ops"], 20),
+        "temp_file_usage": flag("temp"),
+        "sensitive_paths_accessed": min(c["sensitive_paths"], 10),
         
         # Code execution
-        "eval_calls": min(eval_calls, 20),
-        "exec_calls": min(exec_calls, 20),
-        "subprocess_calls": min(subprocess_calls, 20),
-        "os_system_calls": min(os_system_calls, 20),
+        "eval_calls": min(c["eval_calls"], 20),
+        "exec_calls": min(c["exec_calls"], 20),
+        "subprocess_calls": min(c["subprocess_calls"], 20),
+        "os_system_calls": min(c["os_system_calls"], 20),
         "shell_commands": min(shell_commands, 20),
         
         # Obfuscation
-        "obfuscation_score": float(obfuscation_score),
-        "minified_code": minified_code,
-        "hex_encoded_strings": min(hex_strings, 20),
-        "unicode_obfuscation": unicode_obfuscation,
+        "obfuscation_score": float(min(obfuscation_score, 0.98)),
+        "minified_code": 1 if c["line_len_max"] > 600 else 0,
+        "hex_encoded_strings": min(c["hex_strings"], 20),
+        "unicode_obfuscation": flag("unicode_escapes"),
         "string_concatenation_abuse": min(string_concat_abuse, 50),
         
         # Environment & credentials
-        "env_var_access": min(env_var_access, 10),
-        "credential_patterns": min(credential_patterns, 20),
-        "token_patterns": min(token_patterns, 20),
-        "password_patterns": min(password_patterns, 20),
-        "api_key_patterns": min(api_key_patterns, 20),
+        "env_var_access": min(c["env_var_access"], 10),
+        "credential_patterns": min(c["credential_patterns"], 20),
+        "token_patterns": min(c["token_patterns"], 20),
+        "password_patterns": min(c["password_patterns"], 20),
+        "api_key_patterns": min(c["api_key_patterns"], 20),
         
         # Malicious behaviors
-        "keylogger_patterns": keylogger_patterns,
-        "screenshot_capture": screenshot_capture,
-        "clipboard_access": clipboard_access,
-        "webcam_access": webcam_access,
-        "microphone_access": microphone_access,
-        "reverse_shell_patterns": reverse_shell,
-        "backdoor_patterns": backdoor_patterns,
-        "c2_server_patterns": c2_server,
+        "keylogger_patterns": flag("keylogger"),
+        "screenshot_capture": flag("screenshot"),
+        "clipboard_access": flag("clipboard"),
+        "webcam_access": flag("webcam"),
+        "microphone_access": flag("microphone"),
+        "reverse_shell_patterns": flag("reverse_shell"),
+        "backdoor_patterns": flag("backdoor"),
+        "c2_server_patterns": flag("c2_server"),
         
         # System modification
-        "startup_modification": startup_modification,
-        "cron_job_creation": cron_job_creation,
-        "registry_modification": registry_modification,
+        "startup_modification": flag("startup"),
+        "cron_job_creation": flag("cron"),
+        "registry_modification": flag("registry"),
+
+        # Entropy / token statistics (see code_stats.py)
+        **finalize_stats(c["stats"]),
     }
 
-def snapshot_and_diff(pkg_key: str, loc_now: int, code_text: str) -> Dict[str, float]:
-    snap_path = CACHE_DIR / f"{pkg_key}.json"
-    cur_hash = _hash_text(code_text[:500000])
+def scan_code_features(code: str, strings: str = "", escaped: str = "") -> Dict[str, float]:
+    """Extract all 65 features matching the trained model, plus code statistics."""
+    return finalize_counts(code_counts(code, strings, escaped))
+
+def snapshot_and_diff(pkg_key: PackageKey, loc_now: int) -> Dict[str, float]:
+    """
+    Record this package version's snapshot and diff it against the most
+    recently recorded other version of the same package. Each version keeps
+    its own snapshot, so scanning two versions never overwrites either.
+    """
+    ecosystem, name, version, integrity = pkg_key
+    snap_dir = FEATURE_CACHE_DIR / "snapshots" / ecosystem / name.replace("/", "+")
+    snap_path = snap_dir / f"{_hash_text(version + '|' + integrity)[:32]}.json"
+    # The integrity is already a hash of the package's content
+    cur_hash = integrity
     cur_loc = int(loc_now)
 
     added = 0
     removed = 0
     ratio = 0.0
 
-    if snap_path.exists():
-        try:
-            prev = json.loads(snap_path.read_text(encoding="utf-8"))
-            prev_loc = int(prev.get("loc", 0))
-            prev_hash = prev.get("hash", "")
-            if prev_hash and prev_hash != cur_hash:
-                delta = cur_loc - prev_loc
-                if delta >= 0:
-                    added = delta
-                else:
-                    removed = abs(delta)
-                denom = max(cur_loc + prev_loc, 1)
-                ratio = float((added + removed) / denom)
-        except Exception:
-            pass
+    prev = None
+    try:
+        for p in snap_dir.glob("*.json"):
+            if p == snap_path:
+                continue
+            snap = json.loads(p.read_text(encoding="utf-8"))
+            if prev is None or snap.get("recorded", 0) > prev.get("recorded", 0):
+                prev = snap
+    except Exception:
+        pass
+
+    if prev:
+        prev_loc = int(prev.get("loc", 0))
+        prev_hash = prev.get("hash", "")
+        if prev_hash and prev_hash != cur_hash:
+            delta = cur_loc - prev_loc
+            if delta >= 0:
+                added = delta
+            else:
+                removed = abs(delta)
+            denom = max(cur_loc + prev_loc, 1)
+            ratio = float((added + removed) / denom)
 
     try:
-        snap_path.write_text(json.dumps({"hash": cur_hash, "loc": cur_loc}), encoding="utf-8")
+        snap_dir.mkdir(parents=True, exist_ok=True)
+        snap_path.write_text(json.dumps({
+            "version": version, "integrity": integrity,
+            "hash": cur_hash, "loc": cur_loc, "recorded": time.time(),
+        }), encoding="utf-8")
     except Exception:
         pass
 
@@ -369,54 +597,93 @@ def parse_requirements_txt(project_dir: Path) -> List[str]:
             pkgs.add(name.lower())
     return sorted(pkgs)
 
-def scan_python_imports(project_dir: Path, max_files=400) -> List[str]:
+def _file_imports(p: Path) -> set:
+    """Top-level module names imported by one file (relative imports skipped)"""
+    try:
+        text = p.read_text(encoding="utf-8", errors="ignore")
+    except Exception:
+        return set()
     found = set()
-    stdlib = {
-        "os","sys","re","json","math","time","pathlib","typing","logging","random",
-        "itertools","collections","subprocess","threading","asyncio","datetime"
-    }
-    count = 0
-
-    for p in project_dir.rglob("*.py"):
-        if count >= max_files:
-            break
-        count += 1
+    for m in PY_IMPORT_RE.finditer(text):
+        if m.group(1):
+            found.add(m.group(1).split(".")[0])
+        else:
+            found.update(part.split()[0].split(".")[0] for part in m.group(2).split(","))
+    found.discard("")
+    return found
+
+def _import_distributions(project_dir: Path) -> Dict[str, List[str]]:
+    """Import name -> distributions, from the project's venv RECORDs or else this interpreter"""
+    mapping: Dict[str, List[str]] = {}
+    for dist in list_pypi_distributions(project_dir):
+        for rel, _ in dist["files"]:
+            top = Path(rel).parts[0]
+            top = top[:-3] if top.endswith(".py") else top
+            if top.isidentifier() and dist["name"] not in mapping.setdefault(top, []):
+                mapping[top].append(dist["name"])
+    if not mapping:
         try:
-            text = p.read_text(encoding="utf-8", errors="ignore")
+            from importlib.metadata import packages_distributions
+            mapping = packages_distributions()
         except Exception:
-            continue
+            pass
+    return mapping
 
-        for line in text.splitlines():
-            m = PY_IMPORT_RE.match(line)
-            if not m:
-                continue
-            mod = (m.group(1) or m.group(2) or "").strip()
-            if not mod:
-                continue
-            base = mod.split(".")[0].lower()
-            if base in stdlib:
-                continue
-            found.add(base)
+def scan_python_imports(project_dir: Path, max_files: int = None, workers: int = 8) -> List[str]:
+    """
+    Distributions the project's Python files import. Every file is read
+    (threads overlap the I/O), standard-library and first-party modules are
+    dropped, and import names are mapped to distribution names.
+    """
+    files = []
+    local = set()
+    for root, dirs, names in os.walk(project_dir):
+        dirs[:] = [d for d in dirs if d not in IMPORT_SKIP_DIRS and not d.startswith(".")]
+        if "__init__.py" in names:
+            local.add(Path(root).name)
+        for n in names:
+            if n.endswith(".py"):
+                files.append(Path(root) / n)
+                local.add(n[:-3])
+    if max_files is not None:
+        files = files[:max_files]
 
-    return sorted(found)
+    found = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for imports in pool.map(_file_imports, files):
+            found |= imports
+
+    found -= set(sys.stdlib_module_names) | local
+    mapping = _import_distributions(project_dir)
+    dists = set()
+    for name in found:
+        dists.update(normalize_name("pypi", d) for d in mapping.get(name) or [name])
+    return sorted(dists)
 
 # ---------------- npm scanning (deep if node_modules exists) ----------------
 def list_npm_installed(project_dir: Path) -> List[Tuple[str, Path]]:
-    node_modules = project_dir / "node_modules"
-    if not node_modules.exists():
-        return []
+    """Every package under node_modules, nested ones included, once per (name, version)"""
     pkgs = []
-    for p in node_modules.iterdir():
-        if not p.is_dir():
-            continue
-        if p.name.startswith("."):
+    seen = set()
+    pending = [project_dir / "node_modules"]
+    while pending:
+        node_modules = pending.pop()
+        if not node_modules.is_dir():
             continue
-        if p.name.startswith("@"):
-            for sp in p.iterdir():
-                if sp.is_dir():
-                    pkgs.append((f"{p.name}/{sp.name}".lower(), sp))
-        else:
-            pkgs.append((p.name.lower(), p))
+        dirs = []
+        for p in sorted(node_modules.iterdir()):
+            if not p.is_dir() or p.name.startswith("."):
+                continue
+            if p.name.startswith("@"):
+                dirs.extend((f"{p.name}/{sp.name}".lower(), sp) for sp in sorted(p.iterdir()) if sp.is_dir())
+            else:
+                dirs.append((p.name.lower(), p))
+        for name, p in dirs:
+            key = (name, npm_pkg_meta(p).get("version"))
+            if key not in seen:
+                seen.add(key)
+                pkgs.append((name, p))
+            pending.append(p / "node_modules")
     return pkgs
 
 def npm_pkg_meta(pkg_dir: Path) -> Dict:
@@ -439,6 +706,46 @@ def find_site_packages(project_dir: Path) -> List[Path]:
         candidates.extend(list((venv / "lib").glob("python*/site-packages")))  # Linux/Mac
     return [p for p in candidates if p.exists()]
 
+def _record_hash(digest: bytes) -> str:
+    """A sha256 digest in RECORD notation (sha256=<urlsafe base64, unpadded>)"""
+    return "sha256=" + base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+def list_pypi_distributions(project_dir: Path) -> List[Dict[str, Any]]:
+    """
+    Installed distributions read from *.dist-info: name and version from
+    METADATA, and from RECORD the exact files each one owns inside
+    site-packages with their recorded hashes. Single-module distributions
+    and import names that differ from the distribution name come out right.
+    """
+    dists = []
+    seen = set()
+    for site in find_site_packages(project_dir):
+        for info in sorted(site.glob("*.dist-info")):
+            meta = _read_text_file(info / "METADATA")
+            name = next((line.split(":", 1)[1].strip() for line in meta.splitlines() if line.startswith("Name:")), None)
+            if not name or normalize_name("pypi", name) in seen:
+                continue
+            seen.add(normalize_name("pypi", name))
+            files = []
+            try:
+                with open(info / "RECORD", newline="", encoding="utf-8", errors="ignore") as f:
+                    for entry in csv.reader(f):
+                        if not entry or entry[0].startswith(("/", "..")) or entry[0].startswith(info.name + "/"):
+                            continue
+                        if "__pycache__/" in entry[0]:
+                            continue
+                        files.append((entry[0], entry[1] if len(entry) > 1 else ""))
+            except Exception:
+                pass
+            dists.append({
+                "name": normalize_name("pypi", name),
+                "version": next((line.split(":", 1)[1].strip() for line in meta.splitlines() if line.startswith("Version:")), None),
+                "dependencies_count": sum(1 for line in meta.splitlines() if line.lower().startswith("requires-dist:")),
+                "site": str(site),
+                "files": files,
+            })
+    return dists
+
 def list_pypi_installed(project_dir: Path) -> List[Tuple[str, Path]]:
     sites = find_site_packages(project_dir)
     if not sites:
@@ -465,11 +772,21 @@ def list_pypi_installed(project_dir: Path) -> List[Tuple[str, Path]]:
     return out
 
 # ---------------- feature row ----------------
+def _version_fields(row: Dict[str, Any], version: str):
+    version_parts = (version or "").split(".")
+    if len(version_parts) >= 3:
+        row["version_major"] = int(version_parts[0]) if version_parts[0].isdigit() else 0
+        row["version_minor"] = int(version_parts[1]) if version_parts[1].isdigit() else 0
+        row["version_patch"] = int(version_parts[2].split("-")[0]) if version_parts[2].split("-")[0].isdigit() else 0
+        row["is_prerelease"] = 1 if "-" in version or "beta" in version.lower() or "alpha" in version.lower() else 0
+
 def base_row(package_name: str, ecosystem: str) -> Dict[str, Any]:
     """Initialize row with all 65 features matching trained model"""
     return {
         "package_name": package_name,
         "ecosystem": ecosystem,
+        "version": None,
+        "integrity": None,
         
         # Package metadata (8 features)
         "downloads_count": 0,
@@ -562,24 +879,51 @@ def base_row(package_name: str, ecosystem: str) -> Dict[str, Any]:
         "known_vulnerability_count": 0,
         "cve_references": 0,
         
+        # Code statistics (15 features, see code_stats.py)
+        **{name: 0.0 for name in STAT_FEATURES},
+        
         # helper: whether we had deep package code available
         "scan_depth": "declared",
     }
 
-def build_npm_row(name: str, pkg_dir: Path) -> Dict[str, Any]:
-    row = base_row(name, "npm")
-    row["scan_depth"] = "installed"
+def apply_install_stage(row: Dict[str, Any], pkg_dir: Path, meta: Dict) -> List[Path] | None:
+    """
+    Run the install-time fast path on an npm package and record it in row.
+    Returns the closure files to scan when its verdict is conclusive
+    (MALICIOUS), or None when the whole package has to be scanned.
+    """
+    stage = analyze_install_scripts(pkg_dir, meta)
+    row["has_install_scripts"] = 1 if stage["install_time"] else 0
+    row["has_postinstall_hook"] = 1 if "postinstall" in stage["scripts"] else 0
+    row["install_verdict"] = stage["verdict"]
+    row["install_reasons"] = stage["reasons"]
+    if not stage["conclusive"] or FULL_SCAN:
+        return None
+    row["scan_depth"] = "install-closure"
+    return [pkg_dir / f for f in stage["files"]]
 
-    meta = npm_pkg_meta(pkg_dir)
+def with_version_diff(row: Dict[str, Any], key: PackageKey) -> Dict[str, Any]:
+    """
+    Fill code_lines_added/removed/code_change_ratio against the last other
+    version scanned. Applied after store_row: it depends on scan history,
+    not on the package alone, so it is never served from the row cache.
+    """
+    row.update(snapshot_and_diff(key, (row.get("blob_stats") or {}).get("loc", 0)))
+    return row
+
+def _from_cache(cached: Dict[str, Any], name: str) -> Dict[str, Any]:
+    """A cached row under this scan's name; none of its code was analyzed now"""
+    stats = dict(cached.get("blob_stats") or {}, scanned_files=0, scanned_bytes=0)
+    return {**cached, "package_name": name, "blob_stats": stats}
+
+def npm_metadata_row(name: str, pkg_dir: Path, meta: Dict) -> Dict[str, Any]:
+    """Row from package.json and the package's file names, no code read"""
+    row = base_row(name, "npm")
+    row["scan_depth"] = "metadata"
+    row["version"] = meta.get("version") or None
 
     # Extract version
-    version = meta.get("version", "0.0.0")
-    version_parts = version.split(".")
-    if len(version_parts) >= 3:
-        row["version_major"] = int(version_parts[0]) if version_parts[0].isdigit() else 0
-        row["version_minor"] = int(version_parts[1]) if version_parts[1].isdigit() else 0
-        row["version_patch"] = int(version_parts[2].split("-")[0]) if version_parts[2].split("-")[0].isdigit() else 0
-        row["is_prerelease"] = 1 if "-" in version or "beta" in version.lower() or "alpha" in version.lower() else 0
+    _version_fields(row, meta.get("version", "0.0.0"))
 
     # Maintainers
     maintainers = meta.get("maintainers")
@@ -597,36 +941,61 @@ def build_npm_row(name: str, pkg_dir: Path) -> Dict[str, Any]:
     row["has_changelog"] = 1 if (pkg_dir / "CHANGELOG.md").exists() or (pkg_dir / "CHANGELOG").exists() else 0
     row["documentation_score"] = (row["has_readme"] + row["has_license"] + row["has_tests"]) / 3.0
 
-    # Scan code
-    code_text, loc = _collect_code_text(pkg_dir, TEXT_EXTS_NPM)
-    if code_text:
-        row.update(scan_code_features(code_text))
-
+    # Lifecycle hooks, as declared (apply_install_stage analyzes them)
+    scripts = meta.get("scripts") if isinstance(meta.get("scripts"), dict) else {}
+    row["has_install_scripts"] = 1 if any(isinstance(scripts.get(s), str) for s in LIFECYCLE_SCRIPTS) else 0
+    row["has_postinstall_hook"] = 1 if isinstance(scripts.get("postinstall"), str) else 0
     return row
 
-def build_pypi_row(name: str, pkg_dir: Path) -> Dict[str, Any]:
-    row = base_row(name, "pypi")
+def _fast_path(row: Dict[str, Any]) -> bool:
+    """Settle a metadata row through the cascade's first stage when it is confidently safe"""
+    p = fast_path_probability(row)
+    if p is None:
+        return False
+    row["cascade_probability"] = p
+    return True
+
+def build_npm_row(name: str, pkg_dir: Path, cascade: bool = True) -> Dict[str, Any]:
+    meta = npm_pkg_meta(pkg_dir)
+    row = npm_metadata_row(name, pkg_dir, meta)
+    if cascade and _fast_path(row):
+        return row
+
+    blobs = hashed_files(pkg_dir, TEXT_EXTS_NPM)
+    key = package_key("npm", name, meta.get("version"), package_digest(pkg_dir, blobs))
+    cached = cached_row(key)
+    if cached is not None:
+        return with_version_diff(_from_cache(cached, name), key)
+
     row["scan_depth"] = "installed"
+    row["version"], row["integrity"] = key[2] or None, key[3]
 
+    # Scan code
+    closure = apply_install_stage(row, pkg_dir, meta)
+    if closure is not None:
+        closure = set(closure)
+        blobs = [b for b in blobs if b[0] in closure]
+    features, row["blob_stats"] = blob_features(blobs)
+    row.update(features)
+
+    store_row(key, row)
+    return with_version_diff(row, key)
+
+def build_pypi_row(name: str, pkg_dir: Path, cascade: bool = True) -> Dict[str, Any]:
     # try parse metadata from dist-info if exists
     site = pkg_dir.parent
     dist_infos = list(site.glob(f"{name.replace('-', '_')}*.dist-info"))
-    if dist_infos:
-        meta_file = dist_infos[0] / "METADATA"
-        if meta_file.exists():
-            txt = _read_text_file(meta_file)
-            row["dependencies_count"] = int(sum(1 for line in txt.splitlines() if line.lower().startswith("requires-dist:")))
-            
-            # Extract version from metadata
-            for line in txt.splitlines():
-                if line.startswith("Version:"):
-                    version = line.split(":", 1)[1].strip()
-                    version_parts = version.split(".")
-                    if len(version_parts) >= 3:
-                        row["version_major"] = int(version_parts[0]) if version_parts[0].isdigit() else 0
-                        row["version_minor"] = int(version_parts[1]) if version_parts[1].isdigit() else 0
-                        row["version_patch"] = int(version_parts[2].split("-")[0]) if version_parts[2].split("-")[0].isdigit() else 0
-                    break
+    txt = ""
+    if dist_infos and (dist_infos[0] / "METADATA").exists():
+        txt = _read_text_file(dist_infos[0] / "METADATA")
+    version = next((line.split(":", 1)[1].strip() for line in txt.splitlines() if line.startswith("Version:")), None)
+
+    row = base_row(name, "pypi")
+    row["scan_depth"] = "metadata"
+    row["version"] = version
+    if txt:
+        row["dependencies_count"] = int(sum(1 for line in txt.splitlines() if line.lower().startswith("requires-dist:")))
+        _version_fields(row, version or "")
 
     # Check for documentation files
     row["has_readme"] = 1 if (pkg_dir / "README.md").exists() or (pkg_dir / "README.rst").exists() else 0
@@ -634,127 +1003,251 @@ def build_pypi_row(name: str, pkg_dir: Path) -> Dict[str, Any]:
     row["has_tests"] = 1 if (pkg_dir / "tests").exists() or (pkg_dir / "test").exists() else 0
     row["has_changelog"] = 1 if (pkg_dir / "CHANGELOG.md").exists() or (pkg_dir / "CHANGES.txt").exists() else 0
     row["documentation_score"] = (row["has_readme"] + row["has_license"] + row["has_tests"]) / 3.0
+    if cascade and _fast_path(row):
+        return row
+
+    blobs = hashed_files(pkg_dir, TEXT_EXTS_PY)
+    key = package_key("pypi", name, version, package_digest(pkg_dir, blobs))
+    cached = cached_row(key)
+    if cached is not None:
+        return with_version_diff(_from_cache(cached, name), key)
+
+    row["scan_depth"] = "installed"
+    row["integrity"] = key[3]
 
     # Scan code
-    code_text, loc = _collect_code_text(pkg_dir, TEXT_EXTS_PY)
-    if code_text:
-        row.update(scan_code_features(code_text))
+    features, row["blob_stats"] = blob_features(blobs)
+    row.update(features)
+
+    store_row(key, row)
+    return with_version_diff(row, key)
 
+def build_pypi_dist_row(dist: Dict[str, Any], cascade: bool = True) -> Dict[str, Any]:
+    """
+    Feature row of one distribution from list_pypi_distributions(), reading
+    only the files it owns. Every file is hashed and checked against RECORD;
+    files whose content was already scanned anywhere (e.g. unchanged between
+    two versions) reuse their cached counts.
+    """
+    site = Path(dist["site"])
+    row = base_row(dist["name"], "pypi")
+    row["scan_depth"] = "metadata"
+    row["version"] = dist["version"]
+    row["dependencies_count"] = int(dist["dependencies_count"])
+    _version_fields(row, dist["version"] or "")
+
+    names = {Path(rel).name for rel, _ in dist["files"]}
+    parts = {part for rel, _ in dist["files"] for part in Path(rel).parts[:-1]}
+    row["has_readme"] = 1 if names & {"README.md", "README.rst"} else 0
+    row["has_license"] = 1 if names & {"LICENSE", "LICENSE.txt"} else 0
+    row["has_tests"] = 1 if parts & {"tests", "test"} else 0
+    row["has_changelog"] = 1 if names & {"CHANGELOG.md", "CHANGES.txt"} else 0
+    row["documentation_score"] = (row["has_readme"] + row["has_license"] + row["has_tests"]) / 3.0
+    if cascade and _fast_path(row):
+        return row
+
+    owned = []
+    mismatches = 0
+    hashes = []
+    for rel, recorded in dist["files"]:
+        p = site / rel
+        if p.suffix.lower() not in TEXT_EXTS_PY:
+            continue
+        try:
+            size, h = _file_sha256(p)
+        except Exception:
+            continue
+        actual = _record_hash(h.digest())
+        if recorded and recorded != actual:
+            mismatches += 1
+        owned.append((p, size, actual))
+        hashes.append(f"{rel}={actual}")
+
+    integrity = "sha256-" + _hash_text("\n".join(sorted(hashes)))
+    key = package_key("pypi", dist["name"], dist["version"], integrity)
+    cached = cached_row(key)
+    if cached is not None:
+        return with_version_diff(_from_cache(cached, dist["name"]), key)
+
+    row["scan_depth"] = "installed"
+    row["integrity"] = integrity
+    # Files edited after installation no longer match their RECORD hash
+    row["record_mismatches"] = mismatches
+
+    # Scan code
+    features, row["blob_stats"] = blob_features(owned)
+    row.update(features)
+
+    store_row(key, row)
+    return with_version_diff(row, key)
+
+# ---------------- lockfile dependency graph ----------------
+def _installed_npm_dir(project: Path, node: Dict) -> Path | None:
+    """Installed copy of exactly this package version, if there is one"""
+    candidates = [project / p for p in node["paths"]]
+    candidates.append(project / "node_modules" / node["name"])
+    candidates.append(project / "node_modules" / ".pnpm" / f"{node['name'].replace('/', '+')}@{node['version']}" / "node_modules" / node["name"])
+    for d in candidates:
+        if (d / "package.json").exists() and npm_pkg_meta(d).get("version") == node["version"]:
+            return d
+    return None
+
+def _scan_graph_node(task: Tuple[Dict, Any]) -> Dict[str, Any]:
+    """Feature row for one unique package version (runs in a worker process)"""
+    node, pkg_dir = task
+    if isinstance(pkg_dir, dict):
+        row = build_pypi_dist_row(pkg_dir)
+    elif pkg_dir and node["ecosystem"] == "npm":
+        row = build_npm_row(node["name"], Path(pkg_dir))
+    elif pkg_dir and node["ecosystem"] == "pypi":
+        row = build_pypi_row(node["name"], Path(pkg_dir))
+    else:
+        row = base_row(node["name"], node["ecosystem"])
+        row["scan_depth"] = "locked"
+        row["integrity"] = node["integrity"]
+        _version_fields(row, node["version"])
+    row["version"] = node["version"] or row.get("version")
+    row["occurrences"] = node["occurrences"]
     return row
 
+def scan_dependency_graph(project: Path, graph: DependencyGraph, workers: int = None) -> List[Dict]:
+    """
+    Scan every unique package version in the graph exactly once, however
+    often it appears in the tree, spreading the packages over processes.
+    """
+    pypi_dists = {}
+    pypi_dirs = {}
+    if "pypi" in graph.ecosystems():
+        pypi_dists = {d["name"]: d for d in list_pypi_distributions(project)}
+        pypi_dirs = {normalize_name("pypi", n): d for n, d in list_pypi_installed(project)}
+    tasks = []
+    for node in graph.unique():
+        if node["ecosystem"] == "npm":
+            pkg_dir = _installed_npm_dir(project, node)
+            tasks.append((node, str(pkg_dir) if pkg_dir else None))
+        elif node["name"] in pypi_dists and pypi_dists[node["name"]]["version"] == node["version"]:
+            tasks.append((node, pypi_dists[node["name"]]))
+        else:
+            pkg_dir = pypi_dirs.get(node["name"])
+            tasks.append((node, str(pkg_dir) if pkg_dir else None))
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        return [_scan_graph_node(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_scan_graph_node, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
 # ---------------- project-level scan (works on any upload) ----------------
 def scan_project_source_for_risks(project_dir: Path) -> Dict[str, float]:
-    code_text, _ = _collect_code_text(project_dir, TEXT_EXTS_PROJECT, max_files=500)
+    code_text, strings, escaped, _ = _collect_code_text(project_dir, TEXT_EXTS_PROJECT, max_files=500)
     if not code_text:
         return {}
-    return scan_code_features(code_text)
+    return scan_code_features(code_text, strings, escaped)
 
 # ---------------- prediction ----------------
+_model_cache: Dict[str, Any] = {}
+
 def load_model():
+    """Scoring artifacts (compiled forest + metadata), loaded once per process"""
+    if _model_cache:
+        return _model_cache
     # Check if model exists, if not provide a helpful error
-    if MODEL_PATH is None or not MODEL_PATH.exists():
-        error_msg = f"Model file not found at: {MODEL_PATH}\n"
+    if MODEL_PATH is None or not MODEL_PATH.is_dir():
+        error_msg = f"Model artifact not found at: {MODEL_PATH}\n"
         error_msg += "Searched locations:\n"
         for path in MODEL_PATHS:
             error_msg += f"  - {path} {'(exists)' if path.exists() else '(not found)'}\n"
-        error_msg += "\nPlease run train_model.py to generate the model or copy it to data/ or RandomForest/ directory."
+        error_msg += "\nPlease run train_model.py (or python model_artifact.py <security_model.pkl>) to export the model artifact to data/ or RandomForest/ directory."
         raise FileNotFoundError(error_msg)
     
-    with open(MODEL_PATH, "rb") as f:
-        return pickle.load(f)
-
-def encode_ecosystem(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["eco_is_npm"] = (df["ecosystem"].astype(str).str.lower() == "npm").astype(int)
-    df["eco_is_pypi"] = (df["ecosystem"].astype(str).str.lower() == "pypi").astype(int)
-    return df
-
-def explain_row_binary_first(row_dict: Dict, explanations: Dict[str, str], top_k=5) -> List[str]:
-    priority = [
-        "has_postinstall_hook",
-        "remote_code_download",
-        "shell_command_exec",
-        "data_exfiltration_patterns",
-        "keylogger_patterns",
-        "backdoor_patterns",
-        "suspicious_urls",
-        "env_var_access",
-        "eval_usage",
-        "exec_usage",
-        "base64_encoding",
-        "minified_code",
-        "obfuscation_score",
-        "external_urls_count",
+    art = load_scoring_model(MODEL_PATH)
+    # Rows are built from base_row, so it must cover every model column
+    art["schema"].require(base_row("", ""))
+    _model_cache.update(art)
+    return _model_cache
+
+def explain_rows(contrib: np.ndarray, columns: List[str], explanations: Dict[str, str], top_k=5) -> List[List[Tuple[str, float]]]:
+    """
+    (feature, contribution) of every row's top_k features by tree-path
+    contribution towards MALICIOUS (ForestEngine.contributions), largest
+    first; features pulling towards SAFE are left out.
+    """
+    top, values = top_contributions(contrib, top_k)
+    return [
+        [(columns[j], v) for j, v in zip(cols, vals) if v > 0]
+        for cols, vals in zip(top.tolist(), values.tolist())
     ]
 
-    reasons = []
-    for f in priority:
-        v = row_dict.get(f, 0)
-        if isinstance(v, (int, float)) and v:
-            if f in explanations:
-                reasons.append(explanations[f])
-        if len(reasons) >= top_k:
-            break
-    return reasons[:top_k]
+# Extracted values echoed back with each prediction
+OUTPUT_FEATURES = (
+    "dependency_count",
+    "maintainer_changes",
+    "code_lines_added", "code_lines_removed", "code_change_ratio",
+    "has_install_scripts", "has_postinstall_hook",
+    "external_urls_count", "suspicious_urls",
+    "env_var_access",
+    "eval_usage", "exec_usage", "base64_encoding",
+    "shell_command_exec", "remote_code_download",
+    "data_exfiltration_patterns", "keylogger_patterns", "backdoor_patterns",
+    "minified_code", "obfuscation_score",
+    "record_mismatches",
+)
 
 def predict_rows(rows: List[Dict], threshold_safe=0.25, threshold_mal=0.50) -> List[Dict]:
+    """
+    Label extracted rows, most likely malicious first. Rows go straight into
+    one float64 matrix (FeatureSchema.vectorize); labels, confidences and the
+    output order are computed for the whole batch before any result dict.
+    Reasons come from each row's own tree-path contributions, computed in
+    the same walk as its probability.
+    Rows the cascade's first stage settled (cascade.py) are SAFE unscored.
+    """
     art = load_model()
-    model = art["model"]
-    scaler = art["scaler"]
-    feature_cols = art.get("feature_cols") or art.get("feature_columns", [])
+    engine = art["engine"]
     explanations = art.get("feature_explanations", {})
 
     if not rows:
         return []
 
-    df = pd.DataFrame(rows)
-    df = encode_ecosystem(df)
-
-    X = pd.DataFrame(
-        [{c: r.get(c, 0) for c in feature_cols} for r in df.to_dict(orient="records")],
-        columns=feature_cols
-    ).fillna(0)
-
-    Xs = scaler.transform(X)
-    proba = model.predict_proba(Xs)[:, 1]
+    # Rows the cascade settled from metadata keep their stage-one probability
+    fast = np.array(["cascade_probability" in r for r in rows])
+    proba = np.empty(len(rows))
+    top = [[] for _ in rows]
+    if fast.any():
+        proba[fast] = [r["cascade_probability"] for r in rows if "cascade_probability" in r]
+    if not fast.all():
+        scored = np.flatnonzero(~fast)
+        proba[scored], _, contrib = engine.contributions(art["schema"].vectorize([rows[i] for i in scored]))
+        for i, features in zip(scored.tolist(), explain_rows(contrib, art["schema"].columns, explanations)):
+            top[i] = features
+    labels = np.where(proba >= threshold_mal, "MALICIOUS", np.where(proba <= threshold_safe, "SAFE", "SUSPICIOUS"))
+    labels[fast] = "SAFE"
+    confidence = np.maximum(proba, 1 - proba)
+    # Stable, so equal probabilities keep scan order
+    order = np.argsort(-proba, kind="stable")
 
     out = []
-    recs = df.to_dict(orient="records")
-    for r, p in zip(recs, proba):
-        p = float(p)
-
-        if p >= threshold_mal:
+    for i, p, label, conf in zip(order.tolist(), proba[order].tolist(), labels[order].tolist(), confidence[order].tolist()):
+        r = rows[i]
+        reasons = [explanations[f] for f, _ in top[i] if f in explanations]
+        if r.get("install_verdict") == "MALICIOUS":
+            # Conclusive install-time evidence outranks the model
             label = "MALICIOUS"
-        elif p <= threshold_safe:
-            label = "SAFE"
-        else:
-            label = "SUSPICIOUS"
-
-        reasons = explain_row_binary_first(r, explanations, top_k=5)
+            reasons = list(r["install_reasons"]) + reasons
 
         out.append({
             "package_name": r.get("package_name"),
             "ecosystem": r.get("ecosystem"),
+            "version": r.get("version"),
+            "integrity": r.get("integrity"),
             "scan_depth": r.get("scan_depth", "declared"),
             "label": label,
             "malicious_probability": p,
-            "confidence": max(p, 1 - p),
+            "confidence": conf,
             "top_reasons": reasons,
-            "features": {k: r.get(k) for k in [
-                "dependency_count",
-                "maintainer_changes",
-                "code_lines_added", "code_lines_removed", "code_change_ratio",
-                "has_install_scripts", "has_postinstall_hook",
-                "external_urls_count", "suspicious_urls",
-                "env_var_access",
-                "eval_usage", "exec_usage", "base64_encoding",
-                "shell_command_exec", "remote_code_download",
-                "data_exfiltration_patterns", "keylogger_patterns", "backdoor_patterns",
-                "minified_code", "obfuscation_score",
-            ] if k in r}
+            "contributions": [{"feature": f, "contribution": c} for f, c in top[i]],
+            "features": {k: r[k] for k in OUTPUT_FEATURES if k in r},
         })
-
-    out.sort(key=lambda x: x["malicious_probability"], reverse=True)
     return out
 
 # ---------------- main scan pipeline ----------------
@@ -768,21 +1261,26 @@ def scan_project(project_dir: str) -> Tuple[List[Dict], Dict[str, float]]:
     has_node_modules = (project / "node_modules").exists()
     has_site_packages = (project / "site-packages").exists() or (project / "lib").exists()
     
-    is_standalone_package = (has_pkg_json or has_setup_py) and not (has_node_modules or has_site_packages)
+    # A lockfile (other than a bare requirements.txt) marks a project, not a package
+    graph = build_dependency_graph(project)
+    has_lockfile = any(Path(src).name != "requirements.txt" for src in graph.sources)
+
+    # The project's own source gets a row whenever nothing is installed, lockfile or not
+    has_own_source = (has_pkg_json or has_setup_py) and not (has_node_modules or has_site_packages)
+    is_standalone_package = has_own_source and not has_lockfile
     
-    # If it's a standalone package (source-only, no dependencies), analyze it directly
-    if is_standalone_package:
+    # If it's a standalone package (or an uninstalled locked project), analyze its source directly
+    if has_own_source:
         # Determine package name and ecosystem
         pkg_name = 'unknown'
         ecosystem = 'unknown'
+        version = None
         
         if has_pkg_json:
             ecosystem = 'npm'
-            try:
-                meta = json.loads((project / "package.json").read_text(encoding="utf-8"))
-                pkg_name = meta.get('name', project.name)
-            except:
-                pkg_name = project.name
+            meta = npm_pkg_meta(project)
+            pkg_name = meta.get('name', project.name)
+            version = meta.get('version')
         elif has_setup_py:
             ecosystem = 'pypi'
             pkg_name = project.name
@@ -790,32 +1288,58 @@ def scan_project(project_dir: str) -> Tuple[List[Dict], Dict[str, float]]:
         # Create base row with all 65 features
         row = base_row(pkg_name, ecosystem)
         row['scan_depth'] = 'source'
+        row['version'] = version
         
         # Extract code features using scan_code_features
-        code_features = scan_project_source_for_risks(project)
+        closure = apply_install_stage(row, project, meta) if ecosystem == 'npm' else None
+        if closure is not None:
+            code_text, strings, escaped, _ = _collect_code_text(project, TEXT_EXTS_PROJECT, files=closure)
+            code_features = scan_code_features(code_text, strings, escaped) if code_text else {}
+        else:
+            code_features = scan_project_source_for_risks(project)
         row.update(code_features)
         
         rows.append(row)
     
-    # If not a standalone package, scan for installed dependencies (original logic)
-    if not rows:
+    # If not a standalone package, scan the locked dependency graph, then
+    # whatever is installed that the graph does not cover (transitive deps a
+    # requirements file leaves out, packages installed by hand), falling back
+    # to declared dependencies for ecosystems with neither
+    if not is_standalone_package:
+        locked = graph.ecosystems()
+        if graph:
+            rows.extend(scan_dependency_graph(project, graph))
+
         # Deep scan installed npm
-        npm_installed = list_npm_installed(project)
+        npm_installed = [
+            (name, pkg_dir) for name, pkg_dir in list_npm_installed(project)
+            if ("npm", normalize_name("npm", name), npm_pkg_meta(pkg_dir).get("version") or "") not in graph.packages
+        ]
         for name, pkg_dir in npm_installed:
             rows.append(build_npm_row(name, pkg_dir))
 
         # Fallback npm declared deps
-        if not npm_installed:
+        if not npm_installed and "npm" not in locked:
             for name in parse_package_json_deps(project):
                 rows.append(base_row(name, "npm"))
 
-        # Deep scan installed pypi
-        pypi_installed = list_pypi_installed(project)
+        # Deep scan installed pypi: distributions by their RECORD, then any
+        # legacy (egg-info) package directories no RECORD accounts for
+        all_dists = list_pypi_distributions(project)
+        pypi_dists = [d for d in all_dists if ("pypi", normalize_name("pypi", d["name"]), d["version"] or "") not in graph.packages]
+        for dist in pypi_dists:
+            rows.append(build_pypi_dist_row(dist))
+        owned = {Path(rel).parts[0] for d in all_dists for rel, _ in d["files"]}
+        locked_names = {key[1] for key in graph.packages if key[0] == "pypi"}
+        pypi_installed = [
+            (n, d) for n, d in list_pypi_installed(project)
+            if d.name not in owned and normalize_name("pypi", n) not in locked_names
+        ]
         for name, pkg_dir in pypi_installed:
             rows.append(build_pypi_row(name, pkg_dir))
 
         # Fallback pypi requirements/imports
-        if not pypi_installed:
+        if not (pypi_dists or pypi_installed) and "pypi" not in locked:
             reqs = parse_requirements_txt(project)
             if reqs:
                 for name in reqs:
@@ -842,11 +1366,11 @@ def scan_and_predict(project_dir: str) -> Dict:
     try:
         rows, project_risks = scan_project(str(project_to_scan))
 
-        # If we only had declared deps, apply project-level risk signals to them
+        # If we only had declared or locked deps, apply project-level risk signals to them
         # (so ML gets some non-zero signals even when packages aren't installed)
         if project_risks:
             for r in rows:
-                if r.get("scan_depth") == "declared":
+                if r.get("scan_depth") in ("declared", "locked"):
                     for k, v in project_risks.items():
                         # only fill if currently 0
                         if k in r and (r[k] == 0 or r[k] == 0.0):
@@ -865,6 +1389,7 @@ def scan_and_predict(project_dir: str) -> Dict:
             "packages_scanned": len(results),
             "summary": summary,
             "project_risk_signals": project_risks,
+            "dedup": dedup_stats(rows),
             "results": results
         }
     finally:
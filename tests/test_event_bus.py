@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Event bus: channel and wildcard delivery, bounded history
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sandbox"))
+
+from event_bus import EventBus
+
+
+def test_publish_reaches_channel_and_wildcard_subscribers():
+    bus = EventBus()
+    seen, everything = [], []
+    bus.subscribe("file", lambda channel, event: seen.append(event))
+    bus.subscribe(EventBus.ALL, lambda channel, event: everything.append((channel, event)))
+
+    def broken(channel, event):
+        raise RuntimeError("subscriber bug")
+    bus.subscribe("file", broken)
+
+    bus.publish("file", {"path": "/tmp/x"})
+    bus.publish("network", {"host": "x.tk"})
+    # A failing subscriber does not stop delivery to the others
+    assert seen == [{"path": "/tmp/x"}]
+    assert everything == [("file", {"path": "/tmp/x"}), ("network", {"host": "x.tk"})]
+
+
+def test_history_is_bounded():
+    bus = EventBus(history=3)
+    for i in range(10):
+        bus.publish("stdout", i)
+    assert bus.events("stdout") == [7, 8, 9]
+    assert bus.events("file") == []
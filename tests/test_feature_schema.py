@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+The feature schema maps extractor rows onto model columns, or fails loudly
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from feature_schema import FeatureSchema, SchemaError
+
+COLUMNS = ["dependencies_count", "eval_calls", "obfuscation_score", "eco_is_npm", "eco_is_pypi"]
+
+
+def test_vectorize_aliases_and_ecosystem():
+    schema = FeatureSchema(COLUMNS)
+    rows = [
+        {"ecosystem": "npm", "dependency_count": 3, "eval_usage": 2, "package_name": "a"},
+        # The model column wins over its legacy alias
+        {"ecosystem": "PyPI", "eval_usage": 9, "eval_calls": 1, "obfuscation_score": 0.5},
+        {},
+    ]
+    X = schema.vectorize(rows)
+    np.testing.assert_array_equal(X, [
+        [3, 2, 0, 1, 0],
+        [0, 1, 0.5, 0, 1],
+        [0, 0, 0, 0, 0],
+    ])
+
+    out = np.full((3, len(COLUMNS)), 7.0)
+    assert schema.vectorize(rows, out=out) is out
+    np.testing.assert_array_equal(out, X)
+
+
+def test_drift_is_loud():
+    schema = FeatureSchema(COLUMNS)
+    with pytest.raises(SchemaError, match="eval_calls='yes'"):
+        schema.vectorize([{"eval_calls": "yes"}])
+    with pytest.raises(SchemaError, match="obfuscation_score"):
+        schema.require({"ecosystem", "dependency_count", "eval_usage"})
+    with pytest.raises(SchemaError, match="Duplicate"):
+        FeatureSchema(["a", "b", "a"])
+
+    saved = schema.to_dict()
+    assert FeatureSchema.from_dict(saved).columns == COLUMNS
+    with pytest.raises(SchemaError, match="fingerprint"):
+        FeatureSchema.from_dict({**saved, "columns": COLUMNS[::-1]})
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+The compiled forest must score exactly like the sklearn model it came from
+"""
+
+import sys
+import pickle
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from forest_engine import ForestEngine, top_contributions
+
+MODEL_PKL = ROOT / "data" / "security_model.pkl"
+
+
+def _load_pickle():
+    pytest.importorskip("sklearn")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with open(MODEL_PKL, "rb") as f:
+            return pickle.load(f)
+
+
+def _sample_rows(n_features, n=500):
+    rng = np.random.RandomState(7)
+    X = rng.randn(n, n_features) * 3
+    X[: n // 2] = np.abs(np.round(X[: n // 2]))   # count-like features
+    return X
+
+
+def test_matches_sklearn_predict_proba():
+    data = _load_pickle()
+    model, scaler = data["model"], data["scaler"]
+    engine = ForestEngine.from_sklearn(model, scaler)
+
+    X = _sample_rows(model.n_features_in_)
+    expected = model.predict_proba(scaler.transform(X))
+
+    np.testing.assert_allclose(engine.predict_proba(X), expected, rtol=0, atol=1e-12)
+    # Single rows take the 1-D path
+    for x in X[:20]:
+        np.testing.assert_allclose(engine.predict_proba(x), model.predict_proba(scaler.transform([x])), atol=1e-12)
+    assert (engine.predict(X) == model.predict(scaler.transform(X))).all()
+
+
+def test_folded_scaler_matches_on_training_csv():
+    pd = pytest.importorskip("pandas")
+    data = _load_pickle()
+    model, scaler = data["model"], data["scaler"]
+    engine = ForestEngine.from_sklearn(model, scaler)
+
+    X = pd.read_csv(ROOT / "data" / "security_packages_dataset.csv")
+    X = X.reindex(columns=data["feature_columns"]).fillna(0).to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(engine.predict_proba(X), model.predict_proba(scaler.transform(X)))
+
+
+def test_folded_thresholds_are_exact_at_the_boundary():
+    data = _load_pickle()
+    model, scaler = data["model"], data["scaler"]
+    engine = ForestEngine.from_sklearn(model, scaler)
+
+    # Each split's raw threshold and its float64 neighbours, on one base row
+    nodes = np.flatnonzero(np.isfinite(engine.threshold))[::7]
+    rows = np.zeros((3 * len(nodes), model.n_features_in_))
+    for j, node in enumerate(nodes):
+        t = engine.threshold[node]
+        rows[3 * j: 3 * j + 3, engine.feature[node]] = [t, np.nextafter(t, np.inf), np.nextafter(t, -np.inf)]
+    np.testing.assert_array_equal(engine.predict_proba(rows), model.predict_proba(scaler.transform(rows)))
+
+
+def _saabas_reference(model, X_scaled):
+    """Per-row tree-path contributions, one decision path at a time"""
+    contrib = np.zeros(X_scaled.shape)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, 1] / tree.value[:, 0, :].sum(axis=1)
+        for i, path in enumerate(estimator.decision_path(X_scaled)):
+            nodes = path.indices
+            for parent, child in zip(nodes[:-1], nodes[1:]):
+                contrib[i, tree.feature[parent]] += value[child] - value[parent]
+    return contrib / len(model.estimators_)
+
+
+def test_contributions_match_tree_paths_and_sum_to_the_probability():
+    data = _load_pickle()
+    model, scaler = data["model"], data["scaler"]
+    engine = ForestEngine.from_sklearn(model, scaler)
+
+    X = _sample_rows(model.n_features_in_, n=40)
+    proba, bias, contrib = engine.contributions(X)
+    np.testing.assert_array_equal(proba, engine.predict_proba(X)[:, 1])
+    np.testing.assert_allclose(bias + contrib.sum(axis=1), proba, atol=1e-12)
+    np.testing.assert_allclose(contrib, _saabas_reference(model, scaler.transform(X)), atol=1e-12)
+    # Single rows take the 1-D path
+    single = engine.contributions(X[3])
+    np.testing.assert_array_equal(single[0], proba[3:4])
+    np.testing.assert_allclose(single[2], contrib[3:4], atol=1e-12)
+
+    top, values = top_contributions(contrib, k=5)
+    assert top.shape == (40, 5)
+    np.testing.assert_array_equal(values, -np.sort(-contrib, axis=1)[:, :5])
+    np.testing.assert_array_equal(np.take_along_axis(contrib, top, axis=1), values)
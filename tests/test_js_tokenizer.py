@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+JavaScript tokenizer: literals, comments and regexes are split out of the code
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sandbox"))
+
+from js_tokenizer import tokenize, call_counts, indirect_calls, required_modules
+
+
+def test_regex_versus_division():
+    t = tokenize("a = b / c / d; r = /x\\/y/g.test(s); return /ab+c/.test(x)")
+    assert t["code"] == "a = b / c / d; r = /_/.test(s); return /_/.test(x)"
+    assert t["regexes"] == 2
+    # A closing paren means division
+    assert tokenize("f(x) / 2 / y")["regexes"] == 0
+
+
+def test_nested_template_substitutions():
+    t = tokenize("x = `a${ {k: `in${1 + 2}`}.k }b`; eval(y)")
+    assert t["strings"] == ["a", "in", "", "b"]
+    assert "{k:" in t["code"] and "1 + 2" in t["code"]
+    assert call_counts(t)["eval"] == 1
+
+
+def test_comments_and_strings_hide_nothing_and_invent_nothing():
+    t = tokenize('// eval(x)\n/* exec(y) */ run("http://a/*b*/", "eval(z)")')
+    assert t["comments"] == 2 and t["strings"] == ["http://a/*b*/", "eval(z)"]
+    assert call_counts(t)["eval"] == 0 and call_counts(t)["child_process"] == 0
+
+
+def test_escapes_are_decoded_and_kept_apart():
+    t = tokenize('let s = "l1\\nl2\\x41"; let u = "plain"')
+    assert t["strings"] == ["l1\nl2A", "plain"]
+    assert t["escaped"] == ["l1\\nl2\\x41"]
+
+
+def test_computed_calls_and_requires():
+    t = tokenize("window['ev' + 'al'](p); global[\"exec\"](q); obj['toString']()")
+    assert indirect_calls(t) == ["eval", "exec"]
+    counts = call_counts(t)
+    assert counts["eval"] == 1 and counts["child_process"] == 1
+    assert required_modules(tokenize("require('child_process'); import('./x')")) == ["child_process", "./x"]
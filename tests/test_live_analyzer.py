@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Live analyzer: install noise is not scored, the run stage can end a detonation early
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sandbox"))
+
+from event_bus import EventBus
+from live_analyzer import LiveBehaviorAnalyzer
+
+
+def _connect(ip, port):
+    return {"type": "connect", "pid": 1, "timestamp": 0.0, "value": port, "ip": ip, "port": port, "suspicious": False}
+
+
+def _analyzer(bus):
+    verdicts = []
+    return LiveBehaviorAnalyzer(bus, kill_threshold=70, on_verdict=verdicts.append), verdicts
+
+
+def test_install_output_and_registry_fetches_are_not_scored():
+    bus = EventBus()
+    live, verdicts = _analyzer(bus)
+    bus.publish("stage", {"stage": "install"})
+    bus.publish("syscall", {"type": "dns", "name": "pypi.org", "pid": 1, "timestamp": 0.0, "value": 1})
+    bus.publish("syscall", _connect("151.101.0.223", 443))
+    for line in ("Collecting tokenizers\n", "  Created wheel in /tmp/pip-ephem-wheel-cache-x\n"):
+        bus.publish("stdout", {"stage": "install", "line": line})
+    assert live.risk_score == 0 and not verdicts
+
+    # Resolving anything else makes install-time connects count again
+    bus.publish("syscall", {"type": "dns", "name": "x.tk", "pid": 1, "timestamp": 0.0, "value": 1})
+    bus.publish("syscall", _connect("203.0.113.9", 443))
+    assert set(live.indicators) == {"dns_lookup", "network_activity"}
+
+
+def test_run_stage_crosses_the_kill_threshold_once():
+    bus = EventBus()
+    live, verdicts = _analyzer(bus)
+    bus.publish("stage", {"stage": "run"})
+    bus.publish("syscall", _connect("151.101.0.223", 443))
+    bus.publish("stdout", {"stage": "run", "line": "Stealing credentials...\n"})
+    assert live.risk_score == 50 and not verdicts
+    bus.publish("stdout", {"stage": "run", "line": "data exfiltrated to: 45.9.148.3\n"})
+    bus.publish("file", {"path": "/root/.ssh/id_rsa", "suspicious": True})
+    assert len(verdicts) == 1 and verdicts[0]["verdict"] == "MALICIOUS"
+    assert verdicts[0]["risk_score"] >= 70
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Lockfile parsers: every format yields one node per package version and its edges
+"""
+
+import sys
+import json
+import textwrap
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from lockfiles import build_dependency_graph
+
+
+def _write(d: Path, name: str, text: str):
+    (d / name).parent.mkdir(parents=True, exist_ok=True)
+    (d / name).write_text(textwrap.dedent(text).lstrip())
+
+
+def _versions(graph, ecosystem="npm"):
+    return {n["name"]: n["version"] for n in graph.unique(ecosystem)}
+
+
+def _edges(graph):
+    return {(p[1], c[1]) for p, children in graph.edges.items() for c in children}
+
+
+def _roots(graph):
+    return {k[1] for k in graph.roots}
+
+
+def test_package_lock_v2_v3(tmp_path):
+    _write(tmp_path, "package-lock.json", json.dumps({"name": "app", "lockfileVersion": 3, "packages": {
+        "": {"name": "app", "dependencies": {"a": "^1.0.0"}, "devDependencies": {"d": "^1"}},
+        "node_modules/a": {"version": "1.0.0", "integrity": "sha512-a", "dependencies": {"b": "^2"}},
+        "node_modules/b": {"version": "2.0.0"},
+        # A nested copy of another version, and the same version twice
+        "node_modules/a/node_modules/b": {"version": "3.0.0"},
+        "node_modules/d": {"version": "1.0.0", "dev": True, "dependencies": {"b": "^2"}},
+        "node_modules/d/node_modules/c": {"version": "1.0.0"},
+        "node_modules/e/node_modules/c": {"version": "1.0.0"},
+        "node_modules/ws": {"link": True, "resolved": "packages/ws"},
+    }}))
+    graph = build_dependency_graph(tmp_path)
+    assert sorted((n["name"], n["version"]) for n in graph.unique()) == [
+        ("a", "1.0.0"), ("b", "2.0.0"), ("b", "3.0.0"), ("c", "1.0.0"), ("d", "1.0.0"),
+    ]
+    assert graph.packages[("npm", "c", "1.0.0")]["occurrences"] == 2
+    assert graph.packages[("npm", "a", "1.0.0")]["integrity"] == "sha512-a"
+    assert graph.packages[("npm", "d", "1.0.0")]["dev"]
+    # a resolves the nested b@3, d the hoisted b@2
+    assert ("npm", "b", "3.0.0") in graph.edges[("npm", "a", "1.0.0")]
+    assert ("npm", "b", "2.0.0") in graph.edges[("npm", "d", "1.0.0")]
+    assert _roots(graph) == {"a", "d"}
+
+
+def test_package_lock_v1_and_hidden_lockfile(tmp_path):
+    v1 = tmp_path / "v1"
+    _write(v1, "package-lock.json", json.dumps({"lockfileVersion": 1, "dependencies": {
+        "a": {"version": "1.0.0", "requires": {"b": "^2"}, "dependencies": {"b": {"version": "3.0.0"}}},
+        "b": {"version": "2.0.0", "dev": True},
+    }}))
+    graph = build_dependency_graph(v1)
+    assert sorted((n["name"], n["version"]) for n in graph.unique()) == [("a", "1.0.0"), ("b", "2.0.0"), ("b", "3.0.0")]
+    assert ("npm", "b", "3.0.0") in graph.edges[("npm", "a", "1.0.0")]
+    assert _roots(graph) == {"a", "b"}
+
+    hidden = tmp_path / "hidden"
+    _write(hidden, "node_modules/.package-lock.json", json.dumps({"lockfileVersion": 3, "packages": {
+        "node_modules/a": {"version": "1.0.0", "dependencies": {"b": "*"}},
+        "node_modules/b": {"version": "2.0.0"},
+    }}))
+    graph = build_dependency_graph(hidden)
+    assert _versions(graph) == {"a": "1.0.0", "b": "2.0.0"}
+    assert _roots(graph) == {"a", "b"} and _edges(graph) == {("a", "b")}
+
+
+def test_yarn_classic_and_berry(tmp_path):
+    classic = tmp_path / "classic"
+    _write(classic, "package.json", json.dumps({"dependencies": {"a": "^1.0.0"}}))
+    _write(classic, "yarn.lock", '''
+        # yarn lockfile v1
+
+
+        a@^1.0.0, a@^1.0.1:
+          version "1.0.1"
+          resolved "https://registry.yarnpkg.com/a/-/a-1.0.1.tgz"
+          integrity sha512-a
+          dependencies:
+            "@s/b" "~2.0.0"
+
+        "@s/b@~2.0.0":
+          version "2.0.3"
+    ''')
+    graph = build_dependency_graph(classic)
+    assert _versions(graph) == {"a": "1.0.1", "@s/b": "2.0.3"}
+    assert graph.packages[("npm", "a", "1.0.1")]["integrity"] == "sha512-a"
+    assert _edges(graph) == {("a", "@s/b")} and _roots(graph) == {"a"}
+
+    berry = tmp_path / "berry"
+    _write(berry, "package.json", json.dumps({"dependencies": {"a": "^1.0.0"}}))
+    _write(berry, "yarn.lock", '''
+        __metadata:
+          version: 6
+
+        "a@npm:^1.0.0":
+          version: 1.2.0
+          resolution: "a@npm:1.2.0"
+          dependencies:
+            b: "npm:^2.0.0"
+          checksum: abc123
+
+        "b@npm:^2.0.0":
+          version: 2.1.0
+          resolution: "b@npm:2.1.0"
+
+        "app@workspace:.":
+          version: 0.0.0-use.local
+    ''')
+    graph = build_dependency_graph(berry)
+    assert _versions(graph) == {"a": "1.2.0", "b": "2.1.0"}
+    assert graph.packages[("npm", "a", "1.2.0")]["integrity"] == "abc123"
+    assert _edges(graph) == {("a", "b")} and _roots(graph) == {"a"}
+
+
+PNPM_LOCKS = {
+    "v5": '''
+        lockfileVersion: 5.4
+        dependencies:
+          a: 1.0.0
+        packages:
+          /a/1.0.0:
+            resolution: {integrity: sha512-a}
+            dependencies:
+              b: 2.0.0_c@1.0.0
+          /b/2.0.0_c@1.0.0:
+            resolution: {integrity: sha512-b}
+            dev: false
+    ''',
+    "v6": '''
+        lockfileVersion: '6.0'
+        importers:
+          .:
+            dependencies:
+              a:
+                specifier: ^1.0.0
+                version: 1.0.0
+        packages:
+          /a@1.0.0:
+            resolution: {integrity: sha512-a}
+            dependencies:
+              b: 2.0.0(c@1.0.0)
+          /b@2.0.0(c@1.0.0):
+            resolution: {integrity: sha512-b}
+    ''',
+    "v9": '''
+        lockfileVersion: '9.0'
+        importers:
+          .:
+            dependencies:
+              a:
+                specifier: ^1.0.0
+                version: 1.0.0
+        packages:
+          a@1.0.0:
+            resolution: {integrity: sha512-a}
+          b@2.0.0:
+            resolution: {integrity: sha512-b}
+        snapshots:
+          a@1.0.0:
+            dependencies:
+              b: 2.0.0(c@1.0.0)
+          b@2.0.0(c@1.0.0): {}
+    ''',
+}
+
+
+@pytest.mark.parametrize("version", sorted(PNPM_LOCKS))
+def test_pnpm(tmp_path, version):
+    pytest.importorskip("yaml")
+    _write(tmp_path, "pnpm-lock.yaml", PNPM_LOCKS[version])
+    graph = build_dependency_graph(tmp_path)
+    assert _versions(graph) == {"a": "1.0.0", "b": "2.0.0"}
+    assert graph.packages[("npm", "b", "2.0.0")]["integrity"] == "sha512-b"
+    assert _edges(graph) == {("a", "b")} and _roots(graph) == {"a"}
+
+
+def test_poetry(tmp_path):
+    _write(tmp_path, "pyproject.toml", '''
+        [tool.poetry.dependencies]
+        python = "^3.11"
+        Requests = "^2.31"
+    ''')
+    _write(tmp_path, "poetry.lock", '''
+        [[package]]
+        name = "requests"
+        version = "2.31.0"
+        category = "main"
+        files = [{file = "requests-2.31.0.tar.gz", hash = "sha256:aaa"}]
+
+        [package.dependencies]
+        charset-normalizer = ">=2,<4"
+
+        [[package]]
+        name = "charset_normalizer"
+        version = "3.3.2"
+        category = "dev"
+        files = []
+    ''')
+    graph = build_dependency_graph(tmp_path)
+    assert _versions(graph, "pypi") == {"requests": "2.31.0", "charset-normalizer": "3.3.2"}
+    assert graph.packages[("pypi", "requests", "2.31.0")]["integrity"] == "sha256:aaa"
+    assert graph.packages[("pypi", "charset-normalizer", "3.3.2")]["dev"]
+    assert _edges(graph) == {("requests", "charset-normalizer")} and _roots(graph) == {"requests"}
+
+
+def test_requirements_hashes_includes_and_pinning(tmp_path):
+    _write(tmp_path, "requirements.txt", '''
+        # pip-compile output
+        -r base.txt
+        requests[socks]==2.31.0 \\
+            --hash=sha256:aaa \\
+            --hash=sha256:bbb
+        --index-url https://pypi.org/simple
+    ''')
+    _write(tmp_path, "base.txt", "Flask_Cors===4.0.0  # pinned\n")
+    graph = build_dependency_graph(tmp_path)
+    assert graph.sources == [str(tmp_path / "requirements.txt")]
+    assert _versions(graph, "pypi") == {"requests": "2.31.0", "flask-cors": "4.0.0"}
+    assert graph.packages[("pypi", "requests", "2.31.0")]["integrity"] == "sha256:aaa"
+    assert _roots(graph) == {"requests", "flask-cors"}
+
+    # One unpinned requirement: the file locks nothing
+    _write(tmp_path, "base.txt", "flask-cors>=4\n")
+    graph = build_dependency_graph(tmp_path)
+    assert not graph and graph.sources == [] and not graph.roots
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Model artifacts load without unpickling and score like the pickle they came from
+"""
+
+import sys
+import json
+import pickle
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from model_artifact import ArtifactError, export_model, load_artifact, load_scoring_model
+
+MODEL_PKL = ROOT / "data" / "security_model.pkl"
+
+
+@pytest.fixture
+def exported(tmp_path):
+    pytest.importorskip("sklearn")
+    pkl = tmp_path / "security_model.pkl"
+    pkl.write_bytes(MODEL_PKL.read_bytes())
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        export_model(pkl)
+        with open(pkl, "rb") as f:
+            data = pickle.load(f)
+    return pkl, data
+
+
+def test_round_trip_is_memory_mapped(exported):
+    pkl, data = exported
+    art = load_scoring_model(pkl)
+    assert "model" not in art       # served from the artifact, not the pickle
+    assert art["feature_columns"] == data["feature_columns"]
+    # A view of the mapping, not a copy
+    assert isinstance(art["engine"].threshold.base, np.memmap)
+
+    X = np.random.RandomState(3).randn(50, data["model"].n_features_in_) * 3
+    expected = data["model"].predict_proba(data["scaler"].transform(X))
+    np.testing.assert_array_equal(art["engine"].predict_proba(X), expected)
+
+
+def test_missing_or_stale_artifact_is_never_unpickled(exported, tmp_path):
+    pkl, _ = exported
+    with open(pkl, "ab") as f:
+        f.write(b"\0")      # retrained model: the artifact no longer matches
+    with pytest.raises(ArtifactError):
+        load_scoring_model(pkl)
+    with pytest.raises(ArtifactError):
+        load_scoring_model(pkl.with_suffix(""))
+
+    # A pickle that was never exported is not loaded either
+    bare = tmp_path / "bare" / "security_model.pkl"
+    bare.parent.mkdir()
+    bare.write_bytes(MODEL_PKL.read_bytes())
+    with pytest.raises(ArtifactError):
+        load_scoring_model(bare)
+
+
+def test_tampered_array_is_rejected(exported):
+    pkl, _ = exported
+    artifact = pkl.with_suffix("")
+    threshold = np.load(artifact / "threshold.npy")
+    threshold[0] += 1
+    np.save(artifact / "threshold.npy", threshold)
+    with pytest.raises(ArtifactError):
+        load_artifact(artifact)
+
+
+def test_unknown_version_is_rejected(exported):
+    pkl, _ = exported
+    manifest = pkl.with_suffix("") / "manifest.json"
+    data = json.loads(manifest.read_text())
+    data["version"] += 1
+    manifest.write_text(json.dumps(data))
+    with pytest.raises(ArtifactError):
+        load_artifact(pkl.with_suffix(""))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Obfuscation detector: files the analyzer fails on are reported, small packages skip the pool
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sandbox"))
+
+import obfuscation_detector
+from obfuscation_detector import ObfuscationDetector, analyze_javascript
+
+
+def _fragile(content):
+    if "CRASH" in content:
+        raise RecursionError("maximum recursion depth exceeded")
+    return analyze_javascript(content)
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    monkeypatch.setitem(obfuscation_detector.ANALYZERS, "javascript", _fragile)
+    monkeypatch.setattr(ObfuscationDetector, "_memory_cache", {})
+    (tmp_path / "index.js").write_text("module.exports = 1")
+    (tmp_path / "payload.js").write_text("/* CRASH */ eval(x)")
+    return tmp_path
+
+
+def _errors(detector):
+    return {r["file"]: r for r in detector.scan_iter() if any(f["type"] == "analysis_error" for f in r["findings"])}
+
+
+def test_small_package_is_analyzed_in_process(package, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("pool started for a two-file package")
+    monkeypatch.setattr(obfuscation_detector, "TimeoutPool", no_pool)
+
+    errors = _errors(ObfuscationDetector(package, workers=2))
+    assert set(errors) == {"payload.js"} and errors["payload.js"]["score"] > 0
+
+
+def test_worker_errors_are_reported(package, monkeypatch):
+    monkeypatch.setattr(obfuscation_detector, "IN_PROCESS_FILES", 0)
+    detector = ObfuscationDetector(package, workers=1, timeout=5)
+    errors = _errors(detector)
+    assert set(errors) == {"payload.js"}
+    assert "RecursionError" in errors["payload.js"]["findings"][0]["message"]
+    report = ObfuscationDetector(package, workers=1, timeout=5).scan_package()
+    assert any(f["type"] == "analysis_error" and f["file"] == "payload.js" for f in report["findings"])
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Result store: records round-trip through the writer, reader and index
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sandbox"))
+
+from result_store import ResultWriter, ResultReader, read_record, result_path, FOOTER_SIZE
+
+
+def test_records_round_trip_and_reopen(tmp_path):
+    path = result_path(tmp_path, "pkg_1")
+    stdout = "x" * 10_000   # compressed above COMPRESS_ABOVE
+    with ResultWriter(path) as w:
+        w.append("summary", {"execution_id": "pkg_1", "risk_score": 10})
+        w.append("result", {"stdout": stdout})
+
+    assert read_record(path, "summary") == {"execution_id": "pkg_1", "risk_score": 10}
+    assert read_record(path, "result")["stdout"] == stdout
+    assert read_record(path, "network") is None
+
+    # Re-opening appends; the latest record of a kind wins and the rest stay readable
+    with ResultWriter(path) as w:
+        w.append("summary", {"execution_id": "pkg_1", "risk_score": 90})
+    reader = ResultReader(path)
+    assert set(reader.index()) == {"summary", "result"}
+    assert reader.summary()["risk_score"] == 90 and reader.read("result")["stdout"] == stdout
+
+
+def test_unclosed_or_foreign_files(tmp_path):
+    path = result_path(tmp_path, "torn")
+    with ResultWriter(path) as w:
+        w.append("summary", {"risk_score": 5})
+    # Lose the footer (a crash before close): the index is rebuilt by scanning
+    data = path.read_bytes()
+    path.write_bytes(data[:-FOOTER_SIZE - 3])
+    assert read_record(path, "summary") == {"risk_score": 5}
+
+    (tmp_path / "other.scgr").write_bytes(b"{}")
+    assert read_record(tmp_path / "other.scgr", "summary") is None
+    assert read_record(tmp_path / "missing.scgr", "summary") is None
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Results catalog: filters, keyset pagination, retention and file cleanup
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sandbox"))
+
+from results_catalog import ResultsCatalog, CATALOG_NAME
+from result_store import ResultWriter, result_path
+from sandbox_controller import SandboxController
+
+DAY = 86400
+
+
+def _record(catalog, results_dir, execution_id, package, created_at, risk=0, verdict="SAFE"):
+    summary = {"execution_id": execution_id, "package_name": package, "risk_score": risk, "verdict": verdict}
+    path = result_path(results_dir, execution_id)
+    with ResultWriter(path) as w:
+        w.append("summary", summary)
+    catalog.record(summary, path, created_at=created_at)
+    return path
+
+
+def test_keyset_pages_and_filters(tmp_path):
+    catalog = ResultsCatalog(tmp_path / CATALOG_NAME)
+    # Two runs share a timestamp: the execution_id breaks the tie
+    for i, created in enumerate([100, 200, 200, 300, 400]):
+        _record(catalog, tmp_path, f"run{i}", "a" if i % 2 else "b", created, risk=i * 25,
+                verdict="MALICIOUS" if i >= 3 else "SAFE")
+
+    pages, before = [], None
+    while True:
+        page = catalog.query(limit=2, before=before)
+        if not page:
+            break
+        pages.append([r["execution_id"] for r in page])
+        before = page[-1]
+    assert pages == [["run4", "run3"], ["run2", "run1"], ["run0"]]
+
+    assert [r["execution_id"] for r in catalog.query(package="a")] == ["run3", "run1"]
+    assert catalog.count(verdict="MALICIOUS") == 2
+    assert catalog.count(since=200, until=400, min_risk=50) == 2
+    assert catalog.get("run3")["summary"]["risk_score"] == 75
+
+
+def test_retention_and_cleanup_of_uncatalogued_files(tmp_path):
+    controller = SandboxController(str(tmp_path))
+    now = time.time()
+    old = _record(controller.catalog, controller.results_dir, "pkg_old", "pkg", now - 30 * DAY)
+    new = [_record(controller.catalog, controller.results_dir, f"pkg_{i}", "pkg", now - i) for i in range(3)]
+    trace = controller.logs_dir / "pkg_old_trace.bin"
+    trace.write_bytes(b"SCGT")
+
+    # Legacy JSON logs and unrecorded runs are swept by age
+    legacy = [controller.results_dir / "pkg_1700000000_analysis.json", controller.logs_dir / "pkg_1700000000_network.json"]
+    stray = controller.results_dir / "lost.scgr"
+    recent = controller.logs_dir / "pkg_now_files.json"
+    for f in legacy + [stray, recent]:
+        f.write_text("{}")
+    for f in legacy + [stray, new[2]]:
+        os.utime(f, (now - 30 * DAY, now - 30 * DAY))
+
+    removed = controller.cleanup_old_results(days=7, keep_per_package=2)
+    # pkg_old by age, pkg_2 beyond the newest two (its old mtime does not matter)
+    assert removed == 6
+    assert not old.exists() and not trace.exists() and not new[2].exists()
+    assert not any(f.exists() for f in legacy + [stray])
+    assert new[0].exists() and new[1].exists() and recent.exists()
+    assert [r["execution_id"] for r in controller.catalog.query()] == ["pkg_0", "pkg_1"]
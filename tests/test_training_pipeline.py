@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Cached feature matrix and warm-start growth of the training pipeline
+"""
+
+import sys
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import training_pipeline
+from training_pipeline import feature_matrix, run
+
+DATASET = ROOT / "data" / "security_packages_dataset.csv"
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.setattr(training_pipeline, "MATRIX_CACHE_DIR", tmp_path / "cache")
+    lines = DATASET.read_text(encoding="utf-8").splitlines(keepends=True)
+    csv_path = tmp_path / "dataset.csv"
+    csv_path.write_text("".join(lines[:301]), encoding="utf-8")
+    return csv_path, lines[301:]
+
+
+def test_appended_rows_match_a_full_parse(dataset, tmp_path, monkeypatch):
+    csv_path, rest = dataset
+    X, y, columns = feature_matrix(csv_path, None)
+    assert X.shape == (300, len(columns)) and isinstance(X, np.memmap)
+
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.writelines(rest)
+    X, y, _ = feature_matrix(csv_path)
+
+    monkeypatch.setattr(training_pipeline, "MATRIX_CACHE_DIR", tmp_path / "fresh")
+    X_full, y_full, _ = feature_matrix(csv_path)
+    assert len(X) == 300 + len(rest)
+    np.testing.assert_array_equal(X, X_full)
+    np.testing.assert_array_equal(y, y_full)
+
+
+def test_grow_adds_trees_and_keeps_the_old_ones(dataset, tmp_path):
+    pytest.importorskip("sklearn")
+    csv_path, rest = dataset
+    out = tmp_path / "model.pkl"
+    first = run(csv_path, out, trees=20, folds=0)
+    old_trees = list(first["model"].estimators_)
+
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.writelines(rest)
+    grown = run(csv_path, out, grow=True, folds=0)
+    assert grown["dataset"]["rows"] == 300 + len(rest)
+    assert len(grown["model"].estimators_) > len(old_trees)
+    for old, kept in zip(old_trees, grown["model"].estimators_):
+        np.testing.assert_array_equal(old.tree_.threshold, kept.tree_.threshold)
+
+    with open(out, "rb") as f:
+        assert pickle.load(f)["dataset"] == grown["dataset"]
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tuning harness: search space, Pareto frontier and the recall-target pick
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tune_model import configurations, parse_grid, pareto_frontier, cheapest_meeting
+
+
+def _result(trees, auc, recall, latency):
+    return {"config": {"n_estimators": trees}, "roc_auc": auc, "recall": recall, "latency_us": latency}
+
+
+def test_grid_and_random_search():
+    grid = parse_grid(["n_estimators=10,40", "max_depth=4,None", "min_samples_leaf=1"])
+    configs = configurations(grid)
+    assert len(configs) == 4 and {"n_estimators": 40, "max_depth": None, "min_samples_leaf": 1} in configs
+    sampled = configurations(grid, sample=2, seed=1)
+    assert len(sampled) == 2 and all(c in configs for c in sampled)
+    assert sampled == configurations(grid, sample=2, seed=1)
+    with pytest.raises(ValueError):
+        parse_grid(["max_depth"])
+
+
+def test_frontier_and_cheapest_meeting_recall():
+    results = [
+        _result(300, 0.990, 0.97, 400),
+        _result(150, 0.990, 0.96, 200),   # as good as 300 trees, twice as fast
+        _result(40, 0.980, 0.93, 60),
+        _result(20, 0.970, 0.95, 80),     # slower and worse than 40: dominated
+        _result(10, 0.950, 0.90, 30),
+    ]
+    assert [r["config"]["n_estimators"] for r in pareto_frontier(results)] == [10, 40, 150]
+    assert cheapest_meeting(results, 0.95)["config"]["n_estimators"] == 20
+    assert cheapest_meeting(results, 0.99) is None
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Worker pool: results keep their tags through errors, timeouts and crashes
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sandbox"))
+
+from worker_pool import TimeoutPool, OK, ERROR, TIMEOUT
+
+
+def _task(kind):
+    if kind == "crash":
+        os._exit(1)
+    if kind == "hang":
+        time.sleep(30)
+    if kind == "raise":
+        raise ValueError("bad input")
+    return kind.upper()
+
+
+def test_every_task_reports_under_its_own_tag():
+    tasks = [(k, (k,)) for k in ("a", "crash", "b", "raise", "hang", "c")]
+    with TimeoutPool(_task, workers=2, timeout=2) as pool:
+        results = {tag: (outcome, result) for tag, outcome, result in pool.imap_unordered(tasks)}
+
+    assert set(results) == {"a", "crash", "b", "raise", "hang", "c"}
+    assert results["crash"] == (ERROR, "worker exited")
+    assert results["raise"] == (ERROR, "ValueError: bad input")
+    assert results["hang"] == (TIMEOUT, None)
+    # The replacement workers keep serving the rest of the queue
+    assert all(results[k] == (OK, k.upper()) for k in ("a", "b", "c"))
@@ -1,16 +1,21 @@
 import json
 import pickle
-import pandas as pd
+from pathlib import Path
 
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, roc_auc_score
 
+from model_artifact import export_model
+from feature_schema import FeatureSchema, ALIASES
+from training_pipeline import csv_columns, feature_matrix, parallel_cv_scores
+
 DATASET_CSV = "data/security_packages_dataset.csv"
 OUT_MODEL = "data/security_model.pkl"
 
-# Features expected in your CSV (only those that exist will be used)
+# Features expected in your CSV (only those that exist will be used).
+# Legacy names are trained under their model column name (feature_schema.ALIASES)
 FEATURES = [
     "downloads_count", "age_days",
     "maintainer_changes",
@@ -52,23 +57,22 @@ FEATURE_EXPLANATIONS = {
 }
 
 def main():
-    df = pd.read_csv(DATASET_CSV)
+    header = csv_columns(DATASET_CSV)
 
     required = ["package_name", "ecosystem", "is_malicious"]
     for c in required:
-        if c not in df.columns:
+        if c not in header:
             raise ValueError(f"Missing required column: {c}")
 
-    # One-hot ecosystem (stable for prediction)
-    df["eco_is_npm"] = (df["ecosystem"].astype(str).str.lower() == "npm").astype(int)
-    df["eco_is_pypi"] = (df["ecosystem"].astype(str).str.lower() == "pypi").astype(int)
-
-    y = df["is_malicious"].astype(int)
-
-    usable = [c for c in FEATURES if c in df.columns]
-    X = df[usable + ["eco_is_npm", "eco_is_pypi"]].copy().fillna(0)
+    wanted = list(dict.fromkeys(ALIASES.get(c, c) for c in FEATURES))
+    usable = [c for c in wanted if c in header]
+    skipped = [c for c in wanted if c not in header]
+    if skipped:
+        print(f"⚠️  Not in {DATASET_CSV}, skipped: {', '.join(skipped)}")
 
-    feature_cols = list(X.columns)
+    # Cached, memory-mapped matrix; the ecosystem one-hot columns are derived
+    X, y, feature_cols = feature_matrix(DATASET_CSV, usable + ["eco_is_npm", "eco_is_pypi"])
+    schema = FeatureSchema(feature_cols)
 
     scaler = StandardScaler()
     Xs = scaler.fit_transform(X)
@@ -92,13 +96,14 @@ def main():
     print(classification_report(y_test, pred, target_names=["SAFE", "MALICIOUS"]))
     print("ROC-AUC:", roc_auc_score(y_test, proba))
 
-    cv = cross_val_score(model, Xs, y, cv=5, scoring="accuracy")
+    cv = parallel_cv_scores(model, Xs, y, folds=5)
     print("CV accuracy:", [f"{s:.2%}" for s in cv], "Mean:", f"{cv.mean():.2%}")
 
     artifacts = {
         "model": model,
         "scaler": scaler,
-        "feature_cols": feature_cols,
+        "feature_columns": feature_cols,
+        "feature_schema": schema.to_dict(),
         "feature_explanations": FEATURE_EXPLANATIONS,
     }
 
@@ -109,6 +114,7 @@ def main():
         json.dump(feature_cols, f, indent=2)
 
     print(f"✅ Saved model -> {OUT_MODEL}")
+    print(f"✅ Exported model artifact -> {export_model(Path(OUT_MODEL))}")
     print(f"✅ Feature count used -> {len(feature_cols)}")
 
 if __name__ == "__main__":
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Training Pipeline
+Trains the scoring forest from the labelled dataset CSV (or a directory of
+dataset_builder.py shards) without re-reading it every time:
+
+  * the CSV is parsed once into a float64 feature matrix and label vector,
+    cached as .npy files and memory-mapped on later runs. Rows appended to
+    the CSV since the last run are parsed on their own and appended.
+  * cross-validation folds run in parallel processes (one single-threaded
+    forest per fold) and share the memory-mapped matrix.
+  * --grow adds trees to the existing model for the rows appended since it
+    was trained (warm start); existing trees and the scaler are kept, so
+    the weekly retrain is the new trees and CV, not a full rebuild.
+
+    python training_pipeline.py [--csv data/security_packages_dataset.csv]
+                                [--out data/security_model.pkl] [--grow]
+                                [--trees 150] [--cv 5]
+"""
+
+import io
+import os
+import csv
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Sequence, Tuple
+
+import numpy as np
+
+from feature_schema import FeatureSchema, ECOSYSTEM_COLUMNS
+from model_artifact import export_model
+
+LABEL = "is_malicious"
+# Dataset columns that are not model features
+NON_FEATURES = ("package_name", "version", "ecosystem", LABEL)
+
+MATRIX_CACHE_DIR = Path(os.environ.get("SCG_MATRIX_CACHE_DIR") or Path(".pkg_snapshots") / "matrices")
+# Bump when parsing changes so cached matrices are rebuilt
+MATRIX_CACHE_VERSION = 1
+
+# Forest settings of RandomForest/train_model.py
+FOREST_PARAMS = {"max_depth": 15, "min_samples_split": 3, "min_samples_leaf": 1, "random_state": 42}
+
+
+# ---------------- feature matrix ----------------
+def csv_columns(csv_path: Path) -> List[str]:
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+
+def _sha256_prefix(path: Path, nbytes: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while nbytes > 0:
+            chunk = f.read(min(1 << 20, nbytes))
+            if not chunk:
+                break
+            h.update(chunk)
+            nbytes -= len(chunk)
+    return h.hexdigest()
+
+
+def _parse_rows(text: str, header: List[str], columns: List[str], skip_header: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """CSV text -> (X, y); empty cells are 0, as fillna(0) did"""
+    pos = {c: j for j, c in enumerate(header)}
+    eco = pos.get("ecosystem")
+    getters = []
+    for c in columns:
+        if c in pos:
+            getters.append((pos[c], None))
+        elif c in ECOSYSTEM_COLUMNS and eco is not None:
+            getters.append((eco, ECOSYSTEM_COLUMNS[c]))
+        else:
+            raise ValueError(f"Dataset has no column {c!r}")
+
+    reader = csv.reader(io.StringIO(text))
+    if skip_header:
+        next(reader, None)
+    records = [r for r in reader if r]
+    X = np.zeros((len(records), len(columns)), dtype=np.float64)
+    y = np.zeros(len(records), dtype=np.int8)
+    label = pos[LABEL]
+    for i, r in enumerate(records):
+        X[i] = [
+            (r[j].strip().lower() == eco_name) if eco_name else (float(r[j]) if r[j] else 0.0)
+            for j, eco_name in getters
+        ]
+        y[i] = int(float(r[label]))
+    return X, y
+
+
+def feature_matrix(csv_path: Path, columns: Sequence[str] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    (X, y, columns) for the dataset CSV, memory-mapped from the matrix cache.
+    `columns` defaults to every dataset column except NON_FEATURES; eco_is_*
+    columns are derived from "ecosystem" when the CSV lacks them.
+    """
+    csv_path = Path(csv_path).resolve()
+    header = csv_columns(csv_path)
+    columns = list(columns) if columns is not None else [c for c in header if c not in NON_FEATURES]
+
+    key = hashlib.sha256(f"{csv_path}\n{json.dumps(columns)}".encode()).hexdigest()[:16]
+    cache = MATRIX_CACHE_DIR / f"{csv_path.stem}-{key}"
+    meta_path = cache / "meta.json"
+    size = csv_path.stat().st_size
+
+    meta = None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != MATRIX_CACHE_VERSION or meta.get("header") != header:
+            meta = None
+    except (OSError, ValueError):
+        pass
+
+    start = 0
+    X_old = y_old = None
+    if meta and meta["bytes"] <= size and _sha256_prefix(csv_path, meta["bytes"]) == meta["prefix_sha256"]:
+        if meta["bytes"] == size:
+            X = np.load(cache / "X.npy", mmap_mode="r")
+            y = np.load(cache / "y.npy", mmap_mode="r")
+            return X, y, columns
+        if meta["ends_newline"]:
+            # Only rows were appended: parse just the tail
+            start = meta["bytes"]
+            X_old = np.load(cache / "X.npy")
+            y_old = np.load(cache / "y.npy")
+
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        data = f.read()
+    X, y = _parse_rows(data.decode("utf-8"), header, columns, skip_header=not start)
+    if X_old is not None:
+        print(f"[Pipeline] {len(X)} rows appended to {csv_path.name}")
+        X, y = np.concatenate([X_old, X]), np.concatenate([y_old, y])
+
+    cache.mkdir(parents=True, exist_ok=True)
+    for name, array in (("X", X), ("y", y)):
+        tmp = cache / f"{name}.tmp.npy"
+        np.save(tmp, array, allow_pickle=False)
+        tmp.replace(cache / f"{name}.npy")
+    meta = {
+        "version": MATRIX_CACHE_VERSION,
+        "header": header,
+        "columns": columns,
+        "rows": len(X),
+        "bytes": start + len(data),
+        "prefix_sha256": _sha256_prefix(csv_path, start + len(data)),
+        # Appending to a file without a final newline extends its last row
+        "ends_newline": data.endswith(b"\n"),
+    }
+    tmp = cache / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    tmp.replace(meta_path)
+    return np.load(cache / "X.npy", mmap_mode="r"), np.load(cache / "y.npy", mmap_mode="r"), columns
+
+
+def load_training_data(path: Path, columns: Sequence[str] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """(X, y, columns) from a dataset CSV or a directory of dataset_builder.py shards"""
+    path = Path(path)
+    if path.is_dir():
+        from dataset_builder import load_dataset
+        return load_dataset(path, columns)
+    return feature_matrix(path, columns)
+
+
+# ---------------- cross-validation ----------------
+def parallel_cv_scores(model, X, y, folds: int = 5, scoring: str = "accuracy", workers: int = None) -> np.ndarray:
+    """cross_val_score with folds in parallel processes, one single-threaded forest each"""
+    from sklearn.base import clone
+    from sklearn.model_selection import cross_val_score
+
+    workers = workers or min(folds, os.cpu_count() or 1)
+    model = clone(model)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)
+    return cross_val_score(model, X, y, cv=folds, scoring=scoring, n_jobs=workers)
+
+
+def cv_metrics(model, X, y, folds: int = 5, workers: int = None) -> Dict[str, float]:
+    """Model metrics as the trainers store them, from parallel cross-validation"""
+    from sklearn.base import clone
+    from sklearn.model_selection import cross_validate
+
+    workers = workers or min(folds, os.cpu_count() or 1)
+    model = clone(model)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)
+    scores = cross_validate(
+        model, X, y, cv=folds, n_jobs=workers,
+        scoring={"accuracy": "accuracy", "precision": "precision", "recall": "recall", "f1_score": "f1", "roc_auc": "roc_auc"},
+    )
+    metrics = {k: float(scores[f"test_{k}"].mean()) for k in ("accuracy", "precision", "recall", "f1_score", "roc_auc")}
+    metrics["cv_mean"] = metrics["accuracy"]
+    metrics["cv_std"] = float(scores["test_accuracy"].std())
+    return metrics
+
+
+# ---------------- training ----------------
+def train_forest(X, y, trees: int = 150, params: Dict[str, Any] = None):
+    """Fresh scaler and forest on every row; `params` override FOREST_PARAMS"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=trees, n_jobs=-1, **{**FOREST_PARAMS, **(params or {})})
+    model.fit(scaler.transform(X), y)
+    return model, scaler
+
+
+def grow_forest(model, scaler, X, y, trees: int):
+    """
+    Add `trees` trees fitted on every row (old and appended); the existing
+    trees and the scaler are reused as they are, since the trees' split
+    thresholds live in the scaler's space.
+    """
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees, n_jobs=-1)
+    model.fit(scaler.transform(X), y)
+    model.set_params(warm_start=False)
+    return model
+
+
+def _dataset_record(path: Path, rows: int) -> Dict[str, Any]:
+    """What a model was trained on, so --grow can tell appended rows apart"""
+    if path.is_dir():
+        from dataset_builder import shard_names
+        return {"rows": rows, "shards": shard_names(path)}
+    size = path.stat().st_size
+    return {"rows": rows, "bytes": size, "sha256": _sha256_prefix(path, size)}
+
+
+def _only_appended(trained: Dict[str, Any], path: Path) -> bool:
+    if "shards" in trained:
+        # dataset_builder shards are append-only
+        from dataset_builder import shard_names
+        return path.is_dir() and shard_names(path)[:len(trained["shards"])] == trained["shards"]
+    return path.is_file() and _sha256_prefix(path, trained["bytes"]) == trained["sha256"]
+
+
+def run(csv_path: Path, out_path: Path, grow: bool = False, trees: int = 150, folds: int = 5,
+        params: Dict[str, Any] = None) -> Dict[str, Any]:
+    start = time.perf_counter()
+    previous = None
+    if out_path.exists():
+        with open(out_path, "rb") as f:
+            previous = pickle.load(f)
+
+    columns = None
+    if grow and previous is not None:
+        # Growing keeps the model's own column order
+        columns = FeatureSchema.from_model(previous).columns
+    X, y, columns = load_training_data(csv_path, columns)
+    print(f"[Pipeline] {len(X)} rows x {len(columns)} features ({time.perf_counter() - start:.2f}s)")
+    record = _dataset_record(csv_path, len(X))
+
+    trained = (previous or {}).get("dataset")
+    if grow and trained and not _only_appended(trained, csv_path):
+        print(f"[Pipeline] {csv_path} changed beyond appended rows; training from scratch")
+        trained = None
+    if grow and trained:
+        new_rows = len(X) - trained["rows"]
+        if new_rows <= 0:
+            print(f"[Pipeline] No rows appended since {out_path} was trained; nothing to grow")
+            return previous
+        # New trees in proportion to the new data, at least a handful
+        added = max(10, round(len(previous["model"].estimators_) * new_rows / len(X)))
+        model = grow_forest(previous["model"], previous["scaler"], X, y, added)
+        scaler = previous["scaler"]
+        print(f"[Pipeline] Grew forest by {added} trees for {new_rows} new rows ({time.perf_counter() - start:.2f}s)")
+    else:
+        if grow and previous is not None and "dataset" not in previous:
+            print(f"[Pipeline] {out_path} has no training record to grow from; training from scratch")
+        model, scaler = train_forest(X, y, trees, params)
+        print(f"[Pipeline] Trained {trees} trees ({time.perf_counter() - start:.2f}s)")
+
+    metrics = (previous or {}).get("metrics", {})
+    if folds > 1:
+        # Raw matrix: a forest splits the same with or without the scaler
+        metrics = cv_metrics(model, X, y, folds)
+        print(f"[Pipeline] {folds}-fold CV accuracy {metrics['cv_mean']:.2%} (+/- {metrics['cv_std'] * 2:.2%}) "
+              f"({time.perf_counter() - start:.2f}s)")
+
+    model_data = {
+        "model": model,
+        "scaler": scaler,
+        "feature_columns": columns,
+        "feature_schema": FeatureSchema(columns).to_dict(),
+        # Explanations are curated by hand in the trainers; carried over
+        "feature_explanations": (previous or {}).get("feature_explanations", {}),
+        "metrics": metrics,
+        "dataset": record,
+    }
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(model_data, f)
+    tmp.replace(out_path)
+    print(f"[Pipeline] Saved {out_path}, artifact {export_model(out_path)} ({time.perf_counter() - start:.2f}s)")
+    return model_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or grow the scoring forest from the dataset CSV")
+    parser.add_argument("--csv", default="data/security_packages_dataset.csv")
+    parser.add_argument("--out", default="data/security_model.pkl")
+    parser.add_argument("--grow", action="store_true", help="add trees for rows appended since the model was trained")
+    parser.add_argument("--trees", type=int, default=150)
+    parser.add_argument("--cv", type=int, default=5, help="cross-validation folds (0 to skip)")
+    args = parser.parse_args()
+
+    run(Path(args.csv), Path(args.out), grow=args.grow, trees=args.trees, folds=args.cv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Supply Chain Guardian - Hyperparameter Tuning
+Grid or random search over the forest's hyperparameters. Every configuration
+is cross-validated in a process pool (one single-threaded forest per
+worker). Its compiled engine is then timed on single-row scoring, the
+scanner's hot path. Results are cached per dataset and configuration, so
+reruns and widened grids only evaluate what is new.
+
+Reports the ROC-AUC versus latency Pareto frontier and the cheapest
+configuration that meets --min-recall; --out trains and saves that one.
+
+    python tune_model.py [--csv data/security_packages_dataset.csv]
+        [--grid n_estimators=20,40,80,150,300 max_depth=8,12,15,None]
+        [--random 20] [--min-recall 0.95] [--out data/security_model.pkl]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import itertools
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+
+from forest_engine import ForestEngine
+from model_artifact import save_artifact, load_artifact
+from training_pipeline import load_training_data, FOREST_PARAMS, run
+
+TUNING_CACHE_DIR = Path(os.environ.get("SCG_TUNING_CACHE_DIR") or Path(".pkg_snapshots") / "tuning")
+# Bump when evaluation changes so cached results are recomputed
+TUNING_VERSION = 1
+
+DEFAULT_GRID = {
+    "n_estimators": [20, 40, 80, 150, 300],
+    "max_depth": [8, 12, 15, None],
+    "min_samples_leaf": [1, 3, 5],
+}
+
+# Loaded once per worker process (see _init_worker)
+_data: Dict[str, Any] = {}
+
+
+# ---------------- search space ----------------
+def _parse_value(text: str):
+    if text == "None":
+        return None
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_grid(specs: Sequence[str]) -> Dict[str, List[Any]]:
+    """["max_depth=8,None", ...] -> {"max_depth": [8, None], ...} over DEFAULT_GRID"""
+    grid = dict(DEFAULT_GRID)
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not values:
+            raise ValueError(f"Grid entry {spec!r} is not name=v1,v2,...")
+        grid[name] = [_parse_value(v) for v in values.split(",")]
+    return grid
+
+
+def configurations(grid: Dict[str, List[Any]], sample: int = None, seed: int = 42) -> List[Dict[str, Any]]:
+    """Every combination of the grid, or `sample` of them drawn at random"""
+    names = sorted(grid)
+    configs = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    if sample is not None and sample < len(configs):
+        configs = random.Random(seed).sample(configs, sample)
+    return configs
+
+
+def dataset_fingerprint(X: np.ndarray, y: np.ndarray) -> str:
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(X).tobytes())
+    h.update(np.ascontiguousarray(y).tobytes())
+    return h.hexdigest()
+
+
+def _cache_path(fingerprint: str, config: Dict[str, Any], folds: int, threshold: float) -> Path:
+    key = json.dumps({"config": config, "folds": folds, "threshold": threshold, "v": TUNING_VERSION}, sort_keys=True)
+    return TUNING_CACHE_DIR / fingerprint[:16] / f"{hashlib.sha256(key.encode()).hexdigest()[:20]}.json"
+
+
+# ---------------- evaluation ----------------
+def _init_worker(path: str, columns: List[str]):
+    X, y, _ = load_training_data(Path(path), columns)
+    _data.update(X=X, y=y)
+
+
+def _evaluate(task) -> Dict[str, Any]:
+    """Out-of-fold metrics of one configuration (runs in a worker process)"""
+    config, folds, threshold, seed = task
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.metrics import roc_auc_score, accuracy_score, precision_score, recall_score
+
+    X, y = _data["X"], _data["y"]
+    proba = np.zeros(len(y))
+    start = time.perf_counter()
+    model = None
+    for train, test in StratifiedKFold(folds, shuffle=True, random_state=seed).split(X, y):
+        # Raw features: the scaler does not change a forest's splits
+        model = RandomForestClassifier(n_jobs=1, **{**FOREST_PARAMS, **config})
+        model.fit(X[train], y[train])
+        proba[test] = model.predict_proba(X[test])[:, 1]
+    pred = (proba >= threshold).astype(int)
+    engine = ForestEngine.from_sklearn(model)
+    return {
+        "config": config,
+        "roc_auc": float(roc_auc_score(y, proba)),
+        "accuracy": float(accuracy_score(y, pred)),
+        "precision": float(precision_score(y, pred, zero_division=0)),
+        "recall": float(recall_score(y, pred)),
+        "fit_seconds": (time.perf_counter() - start) / folds,
+        "nodes": int(len(engine.feature)),
+        "depth": engine.depth,
+        "engine": engine,
+    }
+
+
+def _best_of(fn, repeat: int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure_latency(engine: ForestEngine, X: np.ndarray, rows: int = 200) -> Dict[str, float]:
+    """Mean single-row scoring time and per-row time in a 1000-row batch, in µs (best of 3)"""
+    sample = np.asarray(X[:rows], dtype=np.float64)
+    batch = np.resize(sample, (1000, sample.shape[1]))
+    engine.predict_proba(sample[0])
+    return {
+        "latency_us": _best_of(lambda: [engine.predict_proba(x) for x in sample]) * 1e6 / len(sample),
+        "batch_us_per_row": _best_of(lambda: engine.predict_proba(batch)) * 1e6 / len(batch),
+    }
+
+
+def _store(cached: Path, result: Dict[str, Any]):
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_suffix(".tmp")
+    tmp.write_text(json.dumps(result), encoding="utf-8")
+    tmp.replace(cached)
+
+
+def evaluate(path: Path, configs: List[Dict[str, Any]], folds: int = 5, threshold: float = 0.5,
+             workers: int = None, seed: int = 42, columns: Sequence[str] = None) -> List[Dict[str, Any]]:
+    """Metrics and latency of every configuration, from the cache where possible"""
+    X, y, columns = load_training_data(path, columns)
+    fingerprint = dataset_fingerprint(X, y)
+    results, todo = [], []
+    for config in configs:
+        cached = _cache_path(fingerprint, config, folds, threshold)
+        if cached.exists():
+            results.append(json.loads(cached.read_text(encoding="utf-8")))
+        else:
+            todo.append(config)
+    print(f"[Tune] {len(configs)} configurations: {len(results)} cached, {len(todo)} to evaluate")
+
+    if todo:
+        tasks = [(config, folds, threshold, seed) for config in todo]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(path), columns)) as pool:
+            for i, result in enumerate(pool.map(_evaluate, tasks), 1):
+                # Cached as soon as it is known; the engine waits beside it to be timed
+                cached = _cache_path(fingerprint, result["config"], folds, threshold)
+                save_artifact(result.pop("engine"), cached.with_suffix(""), {})
+                _store(cached, result)
+                results.append(result)
+                print(f"[Tune] {i}/{len(todo)} {_describe(result['config'])}: "
+                      f"ROC-AUC {result['roc_auc']:.4f}, recall {result['recall']:.3f} ({time.perf_counter() - start:.1f}s)")
+
+    # Timed after the pool is gone, one at a time, so nothing competes for the CPU
+    for result in results:
+        if "latency_us" not in result:
+            cached = _cache_path(fingerprint, result["config"], folds, threshold)
+            result.update(measure_latency(load_artifact(cached.with_suffix(""))["engine"], X))
+            _store(cached, result)
+    return results
+
+
+# ---------------- reporting ----------------
+def pareto_frontier(results: List[Dict[str, Any]], metric: str = "roc_auc") -> List[Dict[str, Any]]:
+    """Results no other result beats on both `metric` (higher) and latency (lower), fastest first"""
+    frontier = []
+    best = -np.inf
+    for r in sorted(results, key=lambda r: (r["latency_us"], -r[metric])):
+        if r[metric] > best:
+            frontier.append(r)
+            best = r[metric]
+    return frontier
+
+
+def cheapest_meeting(results: List[Dict[str, Any]], min_recall: float) -> Dict[str, Any] | None:
+    """Lowest-latency configuration with recall >= min_recall (ties: better ROC-AUC)"""
+    ok = [r for r in results if r["recall"] >= min_recall]
+    return min(ok, key=lambda r: (r["latency_us"], -r["roc_auc"])) if ok else None
+
+
+def _describe(config: Dict[str, Any]) -> str:
+    return " ".join(f"{k}={v}" for k, v in sorted(config.items()))
+
+
+def report(results: List[Dict[str, Any]], min_recall: float = None) -> Dict[str, Any] | None:
+    frontier = pareto_frontier(results)
+    print(f"\n📈 ROC-AUC vs single-row latency, Pareto frontier ({len(frontier)} of {len(results)}):")
+    print(f"   {'latency':>9}  {'batch':>8}  {'ROC-AUC':>7}  {'recall':>6}  {'prec':>6}  {'nodes':>6}  config")
+    for r in frontier:
+        print(f"   {r['latency_us']:7.0f}µs  {r['batch_us_per_row']:6.2f}µs  {r['roc_auc']:.4f}  "
+              f"{r['recall']:.3f}  {r['precision']:.3f}  {r['nodes']:6d}  {_describe(r['config'])}")
+
+    if min_recall is None:
+        return None
+    chosen = cheapest_meeting(results, min_recall)
+    if chosen is None:
+        print(f"\n❌ No configuration reaches recall {min_recall:.3f}")
+    else:
+        print(f"\n✅ Cheapest with recall >= {min_recall:.3f}: {_describe(chosen['config'])} "
+              f"({chosen['latency_us']:.0f} µs, ROC-AUC {chosen['roc_auc']:.4f}, recall {chosen['recall']:.3f})")
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search forest hyperparameters; report the ROC-AUC/latency frontier")
+    parser.add_argument("--csv", default="data/security_packages_dataset.csv", help="dataset CSV or dataset_builder.py directory")
+    parser.add_argument("--grid", nargs="*", default=[], help="name=v1,v2,... entries replacing DEFAULT_GRID's")
+    parser.add_argument("--random", type=int, default=None, help="evaluate this many random configurations of the grid")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.5, help="probability counted as malicious for recall/precision")
+    parser.add_argument("--min-recall", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="train the chosen configuration on all rows and save it here")
+    args = parser.parse_args()
+
+    configs = configurations(parse_grid(args.grid), args.random, args.seed)
+    results = evaluate(Path(args.csv), configs, args.folds, args.threshold, args.workers, args.seed)
+    chosen = report(results, args.min_recall)
+
+    if args.out:
+        if chosen is None:
+            print("--out needs a configuration meeting --min-recall")
+            return 1
+        params = dict(chosen["config"])
+        run(Path(args.csv), Path(args.out), trees=params.pop("n_estimators", 150), folds=args.folds, params=params)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
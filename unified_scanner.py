@@ -9,12 +9,21 @@ import sys
 import tempfile
 import tarfile
 import zipfile
-import pickle
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
 
-import pandas as pd
 import warnings
+
+from code_stats import raw_stats, merge_stats, empty_stats, finalize_stats
+from model_artifact import load_scoring_model
+
+# The JavaScript tokenizer lives with the sandbox's obfuscation detector
+sys.path.append(str(Path(__file__).parent / "sandbox"))
+from js_tokenizer import tokenize
+from install_scripts import analyze_install_scripts, FULL_SCAN
+
+# Split into code and string literals before matching call patterns
+JS_EXTENSIONS = {'.js', '.mjs', '.cjs', '.ts'}
 warnings.filterwarnings('ignore')
 
 # ════════════════════════════════════════════════════════════════════════════════
@@ -24,19 +33,18 @@ warnings.filterwarnings('ignore')
 def load_model():
     """Load pre-trained security model."""
     model_paths = [
-        Path(__file__).parent / "data" / "security_model.pkl",
-        Path(__file__).parent / "RandomForest" / "security_model.pkl",
+        Path(__file__).parent / "data" / "security_model",
+        Path(__file__).parent / "RandomForest" / "security_model",
     ]
     
     for path in model_paths:
-        if path.exists():
+        if path.is_dir():
             try:
-                with open(path, 'rb') as f:
-                    return pickle.load(f)
+                return load_scoring_model(path)
             except Exception as e:
                 print(f"Warning: Failed to load model from {path}: {e}", file=sys.stderr)
     
-    raise FileNotFoundError("Could not find security_model.pkl in current or RandomForest directory")
+    raise FileNotFoundError("Could not find a security_model artifact in data or RandomForest directory; export it with model_artifact.py")
 
 
 # ════════════════════════════════════════════════════════════════════════════════
@@ -117,12 +125,18 @@ def read_file_safe(path: Path, max_size: int = 1_000_000) -> str:
         return ""
 
 
-def scan_file_for_patterns(content: str) -> Dict[str, int]:
-    """Scan file content for security-relevant patterns."""
+def scan_file_for_patterns(content: str, strings: str = "") -> Dict[str, int]:
+    """
+    Scan file content for security-relevant patterns.
+
+    Calls are matched in `content`; URLs, base64 blobs and backdoor strings
+    are also matched in `strings`, the literal contents of tokenized JavaScript.
+    """
     import re
     
+    data = f"{content}\n{strings}" if strings else content
     patterns = {
-        'base64_strings': len(re.findall(r'[A-Za-z0-9+/]{40,}={0,2}', content)),
+        'base64_strings': len(re.findall(r'[A-Za-z0-9+/]{40,}={0,2}', data)),
         'eval_usage': len(re.findall(r'eval\s*\(', content, re.IGNORECASE)),
         'exec_usage': len(re.findall(r'exec\s*\(', content, re.IGNORECASE)),
         'shell_command_exec': len(re.findall(r'(shell_exec|system|exec|passthru|proc_open)\s*\(', content, re.IGNORECASE)),
@@ -131,16 +145,16 @@ def scan_file_for_patterns(content: str) -> Dict[str, int]:
         'aes_usage': len(re.findall(r'(AES\.new|from.*Crypto\.Cipher)', content)),
         'rsa_usage': len(re.findall(r'RSA\.(generate|import)', content)),
         'network_calls': len(re.findall(r'(requests\.|urllib\.|fetch\s*\(|axios\.)', content)),
-        'external_urls': len(re.findall(r'https?://[^\s\'"<>]+', content)),
+        'external_urls': len(re.findall(r'https?://[^\s\'"<>]+', data)),
         'suspicious_urls': len(re.findall(
             r'(pastebin\.com|discord\.gg|bit\.ly|ngrok\.io|webhook\.site)',
-            content,
+            data,
             re.IGNORECASE
         )),
         'file_operations': len(re.findall(r'(open\(|fs\.(read|write)|readFile|writeFile)\s*\(', content)),
         'backdoor_patterns': len(re.findall(
             r'(nc\s+-l|reverse\s+shell|telnet|ssh.*-R|\$\(whoami\))',
-            content,
+            data,
             re.IGNORECASE
         )),
     }
@@ -148,19 +162,21 @@ def scan_file_for_patterns(content: str) -> Dict[str, int]:
     return patterns
 
 
-def get_obfuscation_score(content: str) -> float:
-    """Calculate obfuscation score (0.0-1.0)."""
+def get_obfuscation_score(content: str, stats: Dict[str, Any] = None) -> float:
+    """Calculate obfuscation score (0.0-1.0) from the file's raw code statistics."""
     if not content:
         return 0.0
+    if stats is None:
+        stats = raw_stats(content)
     
     # Check for minification indicators
-    avg_line_length = sum(len(line) for line in content.split('\n')) / max(len(content.split('\n')), 1)
+    avg_line_length = stats['line_len_sum'] / max(stats['lines'], 1)
     has_many_long_lines = avg_line_length > 200
     
     # Check for variable name patterns
     import re
-    single_letter_vars = len(re.findall(r'\b[a-z]\b', content))
-    total_words = len(re.findall(r'\b\w+\b', content))
+    single_letter_vars = stats['single_lower_words']
+    total_words = stats['words']
     
     hex_strings = len(re.findall(r'0x[0-9a-fA-F]+', content))
     
@@ -173,14 +189,14 @@ def get_obfuscation_score(content: str) -> float:
         score += 0.2
     
     # Minified code indicators
-    if content.count('\n') < len(content) / 200:
+    if stats['lines'] - 1 < stats['bytes'] / 200:
         score += 0.2
     
     return min(score, 1.0)
 
 
-def scan_directory_recursively(directory: Path, extensions: List[str]) -> Dict[str, Any]:
-    """Recursively scan directory for patterns."""
+def scan_directory_recursively(directory: Path, extensions: List[str], files: List[Path] = None) -> Dict[str, Any]:
+    """Recursively scan directory (or just `files` in it) for patterns."""
     aggregated = {
         'base64_strings': 0,
         'eval_usage': 0,
@@ -198,8 +214,9 @@ def scan_directory_recursively(directory: Path, extensions: List[str]) -> Dict[s
         'obfuscation_score': 0.0,
         'files_scanned': 0,
     }
+    package_stats = empty_stats()
     
-    for file_path in directory.rglob('*'):
+    for file_path in (files if files is not None else directory.rglob('*')):
         if not file_path.is_file():
             continue
         
@@ -218,15 +235,24 @@ def scan_directory_recursively(directory: Path, extensions: List[str]) -> Dict[s
         if not content or content.startswith('<FILE TOO LARGE'):
             continue
         
-        patterns = scan_file_for_patterns(content)
+        if file_path.suffix in JS_EXTENSIONS:
+            tokens = tokenize(content)
+            patterns = scan_file_for_patterns(tokens['code'], '\n'.join(tokens['strings']))
+        else:
+            patterns = scan_file_for_patterns(content)
         for key, val in patterns.items():
             if key in aggregated and isinstance(aggregated[key], int):
                 aggregated[key] += val
         
-        obf = get_obfuscation_score(content)
+        stats = raw_stats(content)
+        package_stats = merge_stats(package_stats, stats)
+        
+        obf = get_obfuscation_score(content, stats)
         aggregated['obfuscation_score'] = max(aggregated['obfuscation_score'], obf)
         aggregated['files_scanned'] += 1
     
+    # Entropy / token statistics over every scanned file
+    aggregated.update(finalize_stats(package_stats))
     return aggregated
 
 
@@ -251,6 +277,7 @@ def detect_package_type(path: Path) -> str:
 def extract_npm_features(path: Path) -> Dict[str, Any]:
     """Extract npm package features."""
     features = {"ecosystem": "npm", "package_name": "unknown"}
+    pkg = {}
     
     pkg_json_path = path / "package.json"
     if pkg_json_path.exists():
@@ -259,14 +286,24 @@ def extract_npm_features(path: Path) -> Dict[str, Any]:
                 pkg = json.load(f)
             features['package_name'] = pkg.get('name', 'unknown')
             features['version'] = pkg.get('version', '0.0.0')
-            features['has_postinstall_hook'] = '1' if 'postinstall' in pkg.get('scripts', {}) else '0'
-            features['has_preinstall_hook'] = '1' if 'preinstall' in pkg.get('scripts', {}) else '0'
+            features['has_postinstall_hook'] = int('postinstall' in pkg.get('scripts', {}))
+            features['has_preinstall_hook'] = int('preinstall' in pkg.get('scripts', {}))
         except:
             pass
     
+    # Install-time fast path: a conclusive (MALICIOUS) verdict on the
+    # lifecycle-script closure replaces the full scan
+    stage = analyze_install_scripts(path, pkg if isinstance(pkg, dict) else {})
+    features['install_verdict'] = stage['verdict']
+    features['install_reasons'] = stage['reasons']
+    
     # Scan JS files
     js_extensions = ['.js', '.ts', '.jsx', '.tsx']
-    patterns = scan_directory_recursively(path, js_extensions)
+    if stage['conclusive'] and not FULL_SCAN:
+        features['scan_depth'] = 'install-closure'
+        patterns = scan_directory_recursively(path, js_extensions, files=[path / f for f in stage['files']])
+    else:
+        patterns = scan_directory_recursively(path, js_extensions)
     features.update(patterns)
     
     return features
@@ -332,17 +369,18 @@ def extract_features(package_path: str) -> Dict[str, Any]:
 
 def predict_risk(model_data: Dict, features: Dict[str, Any]) -> Tuple[str, float]:
     """Predict package risk level using trained model."""
-    model = model_data['model']
-    scaler = model_data['scaler']
-    feature_cols = model_data.get('feature_cols') or model_data.get('feature_columns', [])
-    
-    # Build feature vector
-    X = pd.DataFrame([{col: features.get(col, 0) for col in feature_cols}])
-    X = X.fillna(0)
-    
-    # Scale and predict
-    X_scaled = scaler.transform(X)
-    proba = model.predict_proba(X_scaled)[0]
+    engine = model_data['engine']
+    schema = model_data['schema']
+    
+    # This scanner extracts code patterns only; say once which columns default to 0
+    if 'defaulted' not in model_data:
+        model_data['defaulted'] = schema.missing(features)
+        if model_data['defaulted']:
+            print(f"[Scanner] {len(model_data['defaulted'])}/{len(schema)} model features not extracted, scored as 0: "
+                  f"{', '.join(model_data['defaulted'])}", file=sys.stderr)
+    
+    # Predict on raw features: the scaler is folded into the compiled forest
+    proba = engine.predict_proba(schema.vectorize([features]))[0]
     malicious_prob = proba[1]
     
     # Classify
@@ -370,6 +408,9 @@ def analyze_package(package_path: str) -> Dict[str, Any]:
     
     # Predict risk
     label, malicious_prob = predict_risk(model_data, features)
+    if features.get('install_verdict') == 'MALICIOUS':
+        # Conclusive install-time evidence outranks the model
+        label = "MALICIOUS"
     
     # Build result
     result = {